@@ -0,0 +1,240 @@
+"""
+Reproducible inference benchmark
+================================
+Times the repo's three inference entry points on fixed inputs taken from
+`data/images/val` (the first N images in sorted order; the video case uses a
+clip built from those same images):
+
+* image  - `inference.predict_single`: decode, predict, draw, encode
+* video  - `inference_mp4.annotate_video` on the generated clip
+* gui    - `gui.annotate_frame` (predict, class filter, plot) on decoded frames
+
+all on the model loaded from `--weights` / `--backend`, over a sweep of
+image size, batch size and thread count (applied to whichever backend is
+loaded, see `Predictor.set_threads`). Every configuration is warmed up and
+then timed `--repeats` times; the median run is kept.
+
+Stages are decode, preprocess, inference, postprocess (ultralytics' own
+`result.speed`), draw and encode, in ms per image/frame. Each entry point
+reports only the stages it can time on their own (the video pipeline, for
+one, times the predict call as a whole and draws while encoding); the
+others are left out of the results rather than reported as 0.
+
+    python benchmark.py --weights best.pt --out bench/run.json
+    python benchmark.py --compare bench/before.json bench/after.json --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+import cv2
+
+from model_loader import BACKENDS
+
+# ───────────────────────── Constants ──────────────────────────
+DEFAULT_WEIGHTS = Path("best.pt")
+IMAGE_DIR       = Path("data/images/val")
+NUM_IMAGES      = 16
+VIDEO_SIZE      = (1280, 720)   # frames of the generated clip are resized to this
+VIDEO_FPS       = 10
+IMG_SIZES       = (320, 480, 640)
+BATCH_SIZES     = (1, 4)
+THREAD_COUNTS   = (1, os.cpu_count() or 1)
+REPEATS         = 3
+ENTRIES         = ("image", "video", "gui")
+STAGES          = ("decode", "preprocess", "inference", "postprocess", "draw", "encode")
+REGRESSION_THRESHOLD = 0.10      # relative slowdown flagged by --compare
+
+# ───────────────────────── Inputs ─────────────────────────────
+
+def fixed_images(n=NUM_IMAGES, image_dir=IMAGE_DIR):
+    paths = sorted(p for p in image_dir.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    return paths[:n]
+
+
+def build_clip(paths, out_path, size=VIDEO_SIZE, fps=VIDEO_FPS):
+    """Write the fixed images as a short clip so the video entry point has a deterministic input."""
+    out = cv2.VideoWriter(str(out_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for path in paths:
+        out.write(cv2.resize(cv2.imread(str(path)), size))
+    out.release()
+    return out_path
+
+
+def _add_speed(stages, results):
+    for result in results:
+        for stage in ("preprocess", "inference", "postprocess"):
+            stages[stage] += (result.speed or {}).get(stage, 0.0)
+
+# ───────────────────────── Entry points ───────────────────────
+
+def bench_image(model, paths, imgsz):
+    """inference.predict_single per image, with its own decode / draw / encode timings (batch does not apply)."""
+    from inference import predict_single
+    stages = dict.fromkeys(STAGES, 0.0)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        for path in paths:
+            timings = {}
+            result = predict_single(model, path, Path(tmp) / "result.jpg", timings, imgsz=imgsz)
+            _add_speed(stages, [result])
+            for stage in ("decode", "draw", "encode"):
+                stages[stage] += 1000 * timings[stage]
+    return {k: v / len(paths) for k, v in stages.items()}
+
+
+def bench_video(model, clip, imgsz, batch):
+    """inference_mp4.annotate_video with its own decode / infer / draw+encode timings."""
+    import inference_mp4
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {}
+        _, frames = inference_mp4.annotate_video(model, clip, Path(tmp) / "out.mp4", batch_size=batch,
+                                                 imgsz=imgsz, timings=timings)
+    frames = max(frames, 1)
+    # --- the whole predict call is reported as inference; draw is included in encode ---
+    return {"decode": 1000 * timings["decode"] / frames, "inference": 1000 * timings["infer"] / frames,
+            "encode": 1000 * timings["encode"] / frames}
+
+
+def bench_gui(model, paths, imgsz):
+    """gui.annotate_frame on already-decoded frames, with the model under test injected (batch does not apply).
+
+    Filtering and plotting happen inside the call; the time outside
+    ultralytics' own stages is reported as draw.
+    """
+    import gui
+    from detections import ClassIndex
+    frames = [cv2.imread(str(p)) for p in paths]
+    stages = dict.fromkeys(("preprocess", "inference", "postprocess", "draw"), 0.0)
+    saved = gui.model, gui.class_index, dict(gui.PREDICT_KWARGS)
+    gui.model, gui.class_index = model, ClassIndex(model.names)  # --- ensure_model() returns it as loaded ---
+    gui.PREDICT_KWARGS.update(imgsz=imgsz, verbose=False)
+    visible = list(gui.class_index.name_to_id)
+    try:
+        for frame in frames:
+            t0 = time.perf_counter()
+            _, result = gui.annotate_frame(frame, visible)
+            elapsed = 1000 * (time.perf_counter() - t0)
+            _add_speed(stages, [result])
+            stages["draw"] += max(elapsed - sum((result.speed or {}).values()), 0.0)
+    finally:
+        gui.model, gui.class_index = saved[0], saved[1]
+        gui.PREDICT_KWARGS.clear()
+        gui.PREDICT_KWARGS.update(saved[2])
+    return {k: v / len(frames) for k, v in stages.items()}
+
+# ───────────────────────── Sweep ──────────────────────────────
+
+def run_suite(weights, backend="torch", entries=ENTRIES, imgszs=IMG_SIZES, batches=BATCH_SIZES, threads=THREAD_COUNTS,
+              repeats=REPEATS, num_images=NUM_IMAGES):
+    import torch
+    from model_loader import load_model
+
+    paths = fixed_images(num_images)
+    if not paths:
+        sys.exit(f"No images found in {IMAGE_DIR}")
+    model = load_model(weights, backend)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = build_clip(paths, Path(tmp) / "bench_clip.mp4")
+        runners = {"image": lambda s, b: bench_image(model, paths, s),
+                   "video": lambda s, b: bench_video(model, clip, s, b),
+                   "gui": lambda s, b: bench_gui(model, paths, s)}
+        for n_threads in threads:
+            model.set_threads(n_threads)
+            for entry in entries:
+                for imgsz in imgszs:
+                    for batch in (batches if entry == "video" else (1,)):
+                        runners[entry](imgsz, batch)  # warm-up
+                        runs = [runners[entry](imgsz, batch) for _ in range(repeats)]
+                        stages = {k: statistics.median(r[k] for r in runs) for k in STAGES if k in runs[0]}
+                        total = sum(stages.values())
+                        rows.append({"entry": entry, "imgsz": imgsz, "batch": batch, "threads": n_threads,
+                                     "stages_ms": stages, "total_ms": total, "fps": 1000 / total if total else 0.0})
+                        print(f"{entry:<6} imgsz={imgsz:<4} batch={batch:<2} threads={n_threads:<3} "
+                              f"{total:8.1f} ms  " + " ".join(f"{k}={v:.1f}" for k, v in stages.items()))
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "weights": str(weights),
+        "backend": model.backend,
+        "inputs": [p.name for p in paths],
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count(), "torch": torch.__version__, "opencv": cv2.__version__},
+        "results": rows,
+    }
+
+# ───────────────────────── Compare ────────────────────────────
+
+def _key(row):
+    return row["entry"], row["imgsz"], row["batch"], row["threads"]
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """Print per-configuration deltas; returns the list of regressions (relative slowdown > threshold)."""
+    old_rows = {_key(r): r for r in old["results"]}
+    regressions = []
+    for row in new["results"]:
+        base = old_rows.get(_key(row))
+        if base is None:
+            continue
+        for metric in ("total_ms",) + tuple(f"stages_ms.{s}" for s in STAGES):
+            if metric == "total_ms":
+                before, after = base["total_ms"], row["total_ms"]
+            else:
+                stage = metric.split(".", 1)[1]
+                if stage not in base["stages_ms"] or stage not in row["stages_ms"]:
+                    continue  # --- not measured by this entry point (in one of the runs) ---
+                before, after = base["stages_ms"][stage], row["stages_ms"][stage]
+            if before <= 0.05:  # sub-0.05 ms stages are noise
+                continue
+            change = (after - before) / before
+            flag = change > threshold
+            if flag:
+                regressions.append((_key(row), metric, before, after, change))
+            if metric == "total_ms" or flag:
+                marker = "REGRESSION" if flag else ""
+                print(f"{str(_key(row)):<32} {metric:<24} {before:8.1f} -> {after:8.1f} ms  {change:+7.1%} {marker}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inference entry points.")
+    parser.add_argument("--weights", default=str(DEFAULT_WEIGHTS))
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--entries", nargs="+", choices=ENTRIES, default=list(ENTRIES))
+    parser.add_argument("--imgsz", nargs="+", type=int, default=list(IMG_SIZES))
+    parser.add_argument("--batch", nargs="+", type=int, default=list(BATCH_SIZES))
+    parser.add_argument("--threads", nargs="+", type=int, default=list(THREAD_COUNTS))
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--images", type=int, default=NUM_IMAGES)
+    parser.add_argument("--out", default=None, help="results JSON (default bench/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        old, new = (json.loads(Path(p).read_text()) for p in args.compare)
+        regressions = compare(old, new, args.threshold)
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    report = run_suite(args.weights, args.backend, args.entries, args.imgsz, args.batch, args.threads, args.repeats, args.images)
+    out = Path(args.out or f"bench/{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Packed, memory-mapped dataset shard
+===================================
+Decoding the val JPEGs again for every evaluation costs more CPU than the
+model on small batches. `build_shard` decodes them once into a directory:
+
+    images.npy         (N, S, S, 3) uint8, letterboxed to S = imgsz (BGR, pad 114 like ultralytics)
+    letterbox.npy      (N, 5) float32: original h, w, scale, pad x, pad y
+    labels.npy         (M, 5) float32: class, cx, cy, w, h, normalised to the *letterboxed* image
+    label_offsets.npy  (N + 1,) int64: labels of image i are labels[offsets[i]:offsets[i + 1]]
+    meta.json          imgsz, image paths and the source signature
+
+`ShardReader` memory-maps the arrays, so batches are views into the page
+cache: no decode, no copy. `open_shard` rebuilds only when the source
+images or labels changed (paths, sizes or mtimes).
+
+    python dataset_cache.py data/val.txt --out data/cache/val_640
+    python evaluate.py --weights best.pt --cache data/cache/val_640
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
+import cv2
+import numpy as np
+
+from inference import iter_decoded, iter_image_paths
+from label_stats import label_path_for, read_label_file
+
+# ───────────────────────── Constants ──────────────────────────
+DEFAULT_LIST = Path("data/val.txt")
+DEFAULT_OUT  = Path("data/cache/val_640")
+IMG_SIZE     = 640
+PAD_VALUE    = 114
+WORKERS      = 8
+FILES        = ("images.npy", "letterbox.npy", "labels.npy", "label_offsets.npy")
+
+# ───────────────────────── Build ──────────────────────────────
+
+def letterbox(image, size, out):
+    """Resize `image` keeping aspect ratio and pad it into `out` (size x size); returns (scale, pad_x, pad_y)."""
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    out[:] = PAD_VALUE
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return scale, pad_x, pad_y
+
+
+def source_signature(paths):
+    """Hash of every image's and label's (path, size, mtime): changes whenever a source file does."""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        for p in (path, label_path_for(path)):
+            try:
+                st = os.stat(p)
+                h.update(f"{p}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+            except FileNotFoundError:
+                h.update(f"{p}\0-\n".encode())
+    return h.hexdigest()
+
+
+def _letterboxed_labels(label_path, h, w, scale, pad_x, pad_y, size):
+    values = read_label_file(label_path)
+    values[:, 1] = (values[:, 1] * w * scale + pad_x) / size
+    values[:, 2] = (values[:, 2] * h * scale + pad_y) / size
+    values[:, 3] = values[:, 3] * w * scale / size
+    values[:, 4] = values[:, 4] * h * scale / size
+    return values
+
+
+def build_shard(sources=(DEFAULT_LIST,), out_dir=DEFAULT_OUT, imgsz=IMG_SIZE, workers=WORKERS):
+    """Decode, letterbox and pack every image in `sources` into `out_dir`; returns the number of images."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = [str(p) for p in iter_image_paths(sources)]
+    signature = source_signature(paths)
+
+    # --- write under temporary names; meta.json is written last, so a half-built shard is never used ---
+    (out_dir / "meta.json").unlink(missing_ok=True)
+    images = np.lib.format.open_memmap(out_dir / "images.tmp.npy", mode="w+", dtype=np.uint8,
+                                       shape=(len(paths), imgsz, imgsz, 3))
+    boxes = np.zeros((len(paths), 5), np.float32)
+    labels, kept = [], []
+    start = time.perf_counter()
+    for path, image in iter_decoded(paths, workers):
+        if image is None:
+            print(f"Warning: could not read {path}")
+            continue
+        i = len(kept)
+        h, w = image.shape[:2]
+        scale, pad_x, pad_y = letterbox(image, imgsz, images[i])
+        boxes[i] = (h, w, scale, pad_x, pad_y)
+        labels.append(_letterboxed_labels(label_path_for(path), h, w, scale, pad_x, pad_y, imgsz))
+        kept.append(path)
+    images.flush()
+    del images
+    n = len(kept)
+
+    offsets = np.zeros(n + 1, np.int64)
+    offsets[1:] = np.cumsum([len(l) for l in labels])
+    if n < len(paths):  # --- unreadable images: shrink the packed tensor to the images actually stored ---
+        packed = np.load(out_dir / "images.tmp.npy", mmap_mode="r")
+        trimmed = np.lib.format.open_memmap(out_dir / "images.trim.npy", mode="w+", dtype=np.uint8,
+                                            shape=(n, imgsz, imgsz, 3))
+        trimmed[:] = packed[:n]
+        trimmed.flush()
+        del packed, trimmed
+        os.replace(out_dir / "images.trim.npy", out_dir / "images.tmp.npy")
+    os.replace(out_dir / "images.tmp.npy", out_dir / "images.npy")
+    np.save(out_dir / "letterbox.npy", boxes[:n])
+    np.save(out_dir / "labels.npy", np.concatenate(labels) if labels else np.zeros((0, 5), np.float32))
+    np.save(out_dir / "label_offsets.npy", offsets)
+    meta = {"imgsz": imgsz, "signature": signature, "sources": [str(s) for s in sources], "paths": kept,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    (out_dir / "meta.json").write_text(json.dumps(meta))
+    print(f"Packed {n} images into {out_dir} in {time.perf_counter() - start:.1f}s "
+          f"({n * imgsz * imgsz * 3 / 1e6:.0f} MB)")
+    return n
+
+# ───────────────────────── Read ───────────────────────────────
+
+class ShardReader:
+    """Zero-copy access to a packed shard; every array is a read-only memory map."""
+
+    def __init__(self, shard_dir):
+        shard_dir = Path(shard_dir)
+        self.meta = json.loads((shard_dir / "meta.json").read_text())
+        self.paths = self.meta["paths"]
+        self.imgsz = self.meta["imgsz"]
+        self.images = np.load(shard_dir / "images.npy", mmap_mode="r")
+        self.letterbox = np.load(shard_dir / "letterbox.npy", mmap_mode="r")
+        self.labels = np.load(shard_dir / "labels.npy", mmap_mode="r")
+        self.offsets = np.load(shard_dir / "label_offsets.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.paths)
+
+    def image(self, i):
+        return self.images[i]
+
+    def labels_for(self, i):
+        """(K, 5) class, cx, cy, w, h rows of image i, normalised to the letterboxed image."""
+        return self.labels[self.offsets[i]:self.offsets[i + 1]]
+
+    def batches(self, batch_size=16):
+        """Yield (paths, images (B, S, S, 3) view, [labels per image]) over the shard, in order."""
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            yield (self.paths[start:stop], self.images[start:stop],
+                   [self.labels_for(i) for i in range(start, stop)])
+
+
+def shard_is_current(shard_dir, sources, imgsz=IMG_SIZE):
+    meta_path = Path(shard_dir) / "meta.json"
+    if not meta_path.exists() or not all((Path(shard_dir) / f).exists() for f in FILES):
+        return False
+    meta = json.loads(meta_path.read_text())
+    paths = [str(p) for p in iter_image_paths(sources)]
+    return meta["imgsz"] == imgsz and meta["signature"] == source_signature(paths)
+
+
+def open_shard(sources=(DEFAULT_LIST,), shard_dir=DEFAULT_OUT, imgsz=IMG_SIZE, workers=WORKERS):
+    """ShardReader for `sources`, (re)building the shard first only if its source files changed."""
+    if not shard_is_current(shard_dir, sources, imgsz):
+        build_shard(sources, shard_dir, imgsz, workers)
+    return ShardReader(shard_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack images + YOLO labels into a memory-mapped shard.")
+    parser.add_argument("sources", nargs="*", default=[str(DEFAULT_LIST)], help="list files / image dirs")
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the sources are unchanged")
+    args = parser.parse_args(argv)
+    if args.force or not shard_is_current(args.out, args.sources, args.imgsz):
+        build_shard(args.sources, args.out, args.imgsz, args.workers)
+    else:
+        print(f"{args.out} is up to date")
+    reader = ShardReader(args.out)
+    print(f"{len(reader)} images, {len(reader.labels)} labels, {reader.images.shape[1]} px")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Tensor-level helpers for YOLO results
+=====================================
+Everything that used to loop over `result.boxes` box by box (class filtering,
+class-name extraction, per-class counts, confidence thresholds) goes through
+here instead: each result's class/confidence columns are copied to numpy once
+and all decisions are made with array masks.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+
+# class_ids / confs are aligned numpy arrays; counts maps class name -> number of boxes
+DetectionSummary = namedtuple("DetectionSummary", ["class_ids", "confs", "counts"])
+
+
+def _to_numpy(x):
+    return x.cpu().numpy() if hasattr(x, "cpu") else np.asarray(x)
+
+
+def box_arrays(result):
+    """(xyxy, conf, cls) of a result as numpy arrays, one host copy each."""
+    boxes = result.boxes if result is not None else None
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+    return _to_numpy(boxes.xyxy), _to_numpy(boxes.conf), _to_numpy(boxes.cls).astype(np.int64)
+
+
+def make_result(frame, names, xyxy, conf, cls):
+    """Wrap numpy boxes for `frame` in an ultralytics Results so plot()/draw code works unchanged."""
+    import torch  # --- deferred: importing this module stays cheap for the GUI ---
+    from ultralytics.engine.results import Results
+    data = np.concatenate([xyxy, conf[:, None], cls[:, None]], axis=1).astype(np.float32)
+    return Results(frame, path="", names=names, boxes=torch.from_numpy(data.reshape(-1, 6)))
+
+
+class ClassIndex:
+    """Precomputed class name <-> id lookups for a model's `names`."""
+
+    def __init__(self, names):
+        self.names = dict(enumerate(names)) if isinstance(names, (list, tuple)) else dict(names)
+        self.name_to_id = {name: cls_id for cls_id, name in self.names.items()}
+        self.num_classes = max(self.names, default=-1) + 1
+        self._ids_for = lru_cache(maxsize=64)(self._lookup_ids)
+
+    def _lookup_ids(self, class_names):
+        return np.array(sorted(self.name_to_id[n] for n in class_names if n in self.name_to_id), dtype=np.int64)
+
+    def ids_for(self, class_names):
+        """Sorted id array for an iterable of class names (cached per distinct set)."""
+        return self._ids_for(frozenset(class_names))
+
+    def mask(self, result, class_names=None, min_conf=None):
+        """Boolean keep-mask over `result.boxes` for class membership and confidence."""
+        _, conf, cls = box_arrays(result)
+        keep = np.ones(len(cls), dtype=bool)
+        if class_names is not None:
+            keep &= np.isin(cls, self.ids_for(class_names))
+        if min_conf is not None:
+            keep &= conf >= min_conf
+        return keep
+
+    def select(self, result, class_names=None, min_conf=None):
+        """New result holding only the boxes that pass the class / confidence filter."""
+        filtered = result.new()
+        if result.boxes is None or len(result.boxes) == 0:
+            return filtered
+        keep = self.mask(result, class_names, min_conf)
+        if keep.all():
+            filtered.boxes = result.boxes
+        elif keep.any():
+            filtered.boxes = result.boxes[np.flatnonzero(keep).tolist()]
+        return filtered
+
+    def summarize(self, result):
+        """Class ids, confidences and per-class counts of a result in one pass."""
+        _, conf, cls = box_arrays(result)
+        counts = {}
+        if len(cls):
+            per_class = np.bincount(cls, minlength=self.num_classes)
+            counts = {self.names.get(int(i), str(i)): int(per_class[i]) for i in np.flatnonzero(per_class)}
+        return DetectionSummary(cls, conf, counts)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy arrays -> (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]).clip(0) * (a[:, 3] - a[:, 1]).clip(0)
+    area_b = (b[:, 2] - b[:, 0]).clip(0) * (b[:, 3] - b[:, 1]).clip(0)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def result_records(result, names):
+    """JSON-ready list of {class_id, class, conf, bbox[x1, y1, x2, y2]} for a result."""
+    xyxy, conf, cls = box_arrays(result)
+    return [
+        {"class_id": c, "class": names[c], "conf": round(p, 4), "bbox": [round(v, 1) for v in box]}
+        for box, p, c in zip(xyxy.tolist(), conf.tolist(), cls.tolist())
+    ]
@@ -0,0 +1,159 @@
+"""
+Low-copy display path for the GUI canvas
+========================================
+`FrameDisplay` owns one `ImageTk.PhotoImage` and two preallocated buffers
+at canvas size. Each frame is resized straight into the BGR buffer (with a
+filter chosen by scale factor), the detections are drawn onto that small
+buffer instead of onto a full-resolution copy (what `result.plot()` does),
+converted in place to RGBX (a layout PIL maps straight onto the numpy
+buffer) and pasted into the existing PhotoImage. Nothing frame-sized is
+allocated per frame apart from the block Tk copies the pixels from.
+
+    python display.py data/images/val/<image>.jpg     # old vs new render cost per frame
+"""
+
+import sys
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+from detections import box_arrays
+
+DISPLAY_SIZE = (700, 500)   # canvas (width, height)
+# --- ultralytics' default palette (hex), so colours match result.plot() ---
+PALETTE_HEX = ("FF3838", "FF9D97", "FF701F", "FFB21D", "CFD231", "48F90A", "92CC17", "3DDB86", "1A9334", "00D4BB",
+               "2C99A8", "00C2FF", "344593", "6473FF", "0018EC", "8438FF", "520085", "CB38FF", "FF95C8", "FF37C7")
+PALETTE_BGR = [tuple(int(h[i:i + 2], 16) for i in (4, 2, 0)) for h in PALETTE_HEX]
+BENCH_RUNS = 50
+
+
+AREA_BELOW_SCALE = 1 / 3    # shrinking further than this switches from bilinear to area averaging
+
+
+def interpolation_for(scale):
+    """Cheapest filter that still looks right for the preview.
+
+    Bilinear is ~10x cheaper than INTER_AREA at non-integer factors and only
+    aliases visibly on strong shrinks (e.g. 4K stills), where area is used.
+    """
+    return cv2.INTER_AREA if scale < AREA_BELOW_SCALE else cv2.INTER_LINEAR
+
+
+def draw_detections(img, result, sx, sy):
+    """Draw `result`'s boxes onto `img` (already resized), scaling box coordinates by (sx, sy)."""
+    xyxy, confs, classes = box_arrays(result)
+    if not len(confs):
+        return img
+    names = result.names
+    boxes = np.round(xyxy * np.array([sx, sy, sx, sy], dtype=np.float32)).astype(int)
+    for (x1, y1, x2, y2), conf, cls in zip(boxes.tolist(), confs.tolist(), classes.tolist()):
+        color = PALETTE_BGR[cls % len(PALETTE_BGR)]
+        label = f"{names[cls]} {conf:.2f}"
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
+        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)
+        y_text = y1 if y1 - th - 4 >= 0 else y1 + th + 4  # keep labels of boxes at the top edge visible
+        cv2.rectangle(img, (x1, y_text - th - 4), (x1 + tw, y_text), color, -1)
+        cv2.putText(img, label, (x1, y_text - 2), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1, cv2.LINE_AA)
+    return img
+
+
+class FrameDisplay:
+    """Shows BGR frames (+ detections) on a Tk canvas through one reused PhotoImage."""
+
+    def __init__(self, canvas=None, size=DISPLAY_SIZE):
+        self.size = size
+        w, h = size
+        self.bgr = np.zeros((h, w, 3), dtype=np.uint8)
+        self.rgbx = np.zeros((h, w, 4), dtype=np.uint8)
+        self.rgb = self.rgbx[..., :3]
+        # --- PIL view over self.rgbx; "RGB" would make frombuffer copy once and never see later frames ---
+        self.pil = Image.frombuffer("RGBX", size, self.rgbx, "raw", "RGBX", 0, 1)
+        self.photo = None
+        if canvas is not None:  # --- no canvas: render-only, e.g. for compare_render_cost ---
+            self.photo = ImageTk.PhotoImage("RGB", size)
+            self.image_id = canvas.create_image(0, 0, anchor="nw", image=self.photo)
+            canvas.image = self.photo  # prevent GC
+
+    def render(self, frame, result=None):
+        """Resize + draw + colour-convert into the preallocated buffers; returns the RGB buffer."""
+        h, w = frame.shape[:2]
+        sx, sy = self.size[0] / w, self.size[1] / h
+        cv2.resize(frame, self.size, dst=self.bgr, interpolation=interpolation_for(min(sx, sy)))
+        if result is not None:
+            draw_detections(self.bgr, result, sx, sy)
+        cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGBA, dst=self.rgbx)
+        return self.rgb
+
+    def paste(self, image=None):
+        """Hand the rendered frame (or `image`) to Tk; returns the RGB image that was uploaded.
+
+        Without a canvas this does the same RGB block conversion PhotoImage.paste does.
+        """
+        image = self.pil if image is None else image
+        if self.photo is not None:
+            self.photo.paste(image)
+            return image
+        return image.convert("RGB")
+
+    def show(self, frame, result=None):
+        self.render(frame, result)
+        self.paste()
+
+# ───────────────────────── Render cost ────────────────────────
+
+def _old_render(frame, result, size=DISPLAY_SIZE):
+    """The previous path: full-resolution plot, cvtColor, LANCZOS resize, new PhotoImage-sized PIL image."""
+    annotated = draw_detections(frame.copy(), result, 1.0, 1.0)  # stands in for result.plot()
+    rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
+    return Image.fromarray(rgb).resize(size, Image.Resampling.LANCZOS)
+
+
+def compare_render_cost(frame, result, runs=BENCH_RUNS, size=DISPLAY_SIZE, canvas=None):
+    """Mean ms per frame of the old and the new path, both including the paste into the PhotoImage."""
+    display = FrameDisplay(canvas, size)
+    timings = {}
+    for name, fn in (("old", lambda: display.paste(_old_render(frame, result, size))),
+                     ("new", lambda: display.show(frame, result))):
+        fn()  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        timings[name] = 1000 * (time.perf_counter() - t0) / runs
+    return timings
+
+
+class _FakeResult:
+    """Boxes-only stand-in so the cost comparison runs without a model."""
+
+    def __init__(self, xyxy, conf, cls, names):
+        self.boxes = type("Boxes", (), {"xyxy": xyxy, "conf": conf, "cls": cls, "__len__": lambda s: len(conf)})()
+        self.names = names
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        frame = cv2.imread(argv[0])
+    else:
+        frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    h, w = frame.shape[:2]
+    rng = np.random.default_rng(1)
+    xy = rng.uniform(0, 0.8, (20, 2)) * (w, h)
+    xyxy = np.concatenate([xy, xy + rng.uniform(0.05, 0.2, (20, 2)) * (w, h)], axis=1).astype(np.float32)
+    result = _FakeResult(xyxy, rng.uniform(0.3, 1, 20).astype(np.float32), rng.integers(0, 5, 20).astype(np.float32),
+                         {i: f"class{i}" for i in range(5)})
+    try:
+        import tkinter
+        root = tkinter.Tk()
+        root.withdraw()
+        canvas = tkinter.Canvas(root, width=DISPLAY_SIZE[0], height=DISPLAY_SIZE[1])
+    except Exception:  # --- headless: paste() stands in for the Tk upload ---
+        canvas = None
+    cost = compare_render_cost(frame, result, canvas=canvas)
+    print(f"{w}x{h} -> {DISPLAY_SIZE[0]}x{DISPLAY_SIZE[1]}, 20 boxes{'' if canvas else ' (no display)'}: "
+          f"old {cost['old']:.2f} ms/frame, new {cost['new']:.2f} ms/frame ({cost['old'] / cost['new']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
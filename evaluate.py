@@ -0,0 +1,260 @@
+"""
+Offline evaluation against the YOLO-format labels in data/
+==========================================================
+Runs a model over a val list (default `data/val.txt`), matches predictions to
+the ground-truth boxes in `data/labels/...` and reports precision, recall,
+mAP50 and mAP50-95 per class, plus per-image latency percentiles.
+
+The metric definitions follow ultralytics' validator (greedy IoU matching per
+threshold, 101-point interpolated AP, P/R taken at the max mean-F1
+confidence), and the summary is written under the same
+`metrics/precision(B)`, `metrics/recall(B)`, `metrics/mAP50(B)`,
+`metrics/mAP50-95(B)` keys as `results.csv`, so numbers can be compared
+directly with `folder_2_model/detect/train*/results.csv`.
+
+    python evaluate.py --weights best.pt --out eval.json
+    python evaluate.py --weights best.pt --results-csv folder_2_model/detect/train7/results.csv --min-map50 0.5 --max-p95-ms 120
+    python evaluate.py --weights best.pt --cache data/cache/val_640     # read a packed shard, no JPEG decoding
+
+With `--cache` the images come letterboxed from a memory-mapped shard (see
+dataset_cache.py, rebuilt automatically when the val images change) and the
+labels are scored in that letterboxed frame.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+import numpy as np
+from detections import box_arrays, iou_matrix
+from inference import iter_batches, iter_decoded, iter_image_paths
+from label_stats import label_path_for, read_label_file
+from model_loader import BACKENDS, DEFAULT_BACKEND, load_model
+
+# ───────────────────────── Constants ──────────────────────────
+DEFAULT_WEIGHTS = Path("best.pt")
+DEFAULT_LIST    = Path("data/val.txt")
+IMG_SIZE        = 640
+CONF_THRESHOLD  = 0.001   # same as ultralytics val, so low-confidence detections count towards the PR curve
+NMS_IOU         = 0.7
+IOU_THRESHOLDS  = np.linspace(0.5, 0.95, 10)
+METRIC_KEYS     = ("metrics/precision(B)", "metrics/recall(B)", "metrics/mAP50(B)", "metrics/mAP50-95(B)")
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+# ───────────────────────── Ground truth ───────────────────────
+
+def load_labels(image_path, shape):
+    """Ground truth of one image as (classes (N,), xyxy pixel boxes (N, 4))."""
+    values = read_label_file(label_path_for(image_path))
+    h, w = shape[:2]
+    cx, cy, bw, bh = values[:, 1] * w, values[:, 2] * h, values[:, 3] * w, values[:, 4] * h
+    xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    return values[:, 0].astype(np.int64), xyxy
+
+# ───────────────────────── Matching / metrics ─────────────────
+
+def match_predictions(gt_cls, gt_xyxy, pred_cls, pred_xyxy, iou_thresholds=IOU_THRESHOLDS):
+    """(P, T) bool array: prediction p is a true positive at IoU threshold t.
+
+    One IoU matrix per image; at each threshold, candidate pairs are taken in
+    descending IoU order and each prediction / ground-truth box is used once.
+    """
+    correct = np.zeros((len(pred_cls), len(iou_thresholds)), dtype=bool)
+    if not len(pred_cls) or not len(gt_cls):
+        return correct
+    iou = iou_matrix(gt_xyxy, pred_xyxy) * (gt_cls[:, None] == pred_cls[None, :])
+    for t, threshold in enumerate(iou_thresholds):
+        gi, pi = np.nonzero(iou >= threshold)
+        if not len(gi):
+            continue
+        order = np.argsort(-iou[gi, pi], kind="stable")
+        gi, pi = gi[order], pi[order]
+        _, first_pred = np.unique(pi, return_index=True)
+        gi, pi = gi[first_pred], pi[first_pred]
+        order = np.argsort(-iou[gi, pi], kind="stable")
+        gi, pi = gi[order], pi[order]
+        _, first_gt = np.unique(gi, return_index=True)
+        correct[pi[first_gt], t] = True
+    return correct
+
+
+def compute_ap(recall, precision):
+    """101-point interpolated area under a PR curve (COCO / ultralytics)."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return _trapezoid(np.interp(x, mrec, mpre), x)
+
+
+def _smooth(y, fraction=0.1):
+    nf = round(len(y) * fraction * 2) // 2 + 1
+    p = np.ones(nf // 2)
+    yp = np.concatenate((p * y[0], y, p * y[-1]), 0)
+    return np.convolve(yp, np.ones(nf) / nf, mode="valid")
+
+
+def ap_per_class(correct, conf, pred_cls, gt_cls, num_classes):
+    """Per-class precision, recall, AP at each IoU threshold -> dict of arrays indexed by class id."""
+    order = np.argsort(-conf, kind="stable")
+    correct, conf, pred_cls = correct[order], conf[order], pred_cls[order]
+    n_gt = np.bincount(gt_cls, minlength=num_classes)
+    classes = np.flatnonzero(n_gt)
+
+    px = np.linspace(0, 1, 1000)
+    p_curve = np.zeros((num_classes, 1000))
+    r_curve = np.zeros((num_classes, 1000))
+    ap = np.zeros((num_classes, correct.shape[1]))
+    for c in classes:
+        i = pred_cls == c
+        if not i.any():
+            continue
+        tpc = correct[i].cumsum(0)
+        fpc = (~correct[i]).cumsum(0)
+        recall = tpc / (n_gt[c] + 1e-16)
+        precision = tpc / (tpc + fpc)
+        r_curve[c] = np.interp(-px, -conf[i], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-px, -conf[i], precision[:, 0], left=1)
+        for t in range(correct.shape[1]):
+            ap[c, t] = compute_ap(recall[:, t], precision[:, t])
+
+    f1 = 2 * p_curve * r_curve / (p_curve + r_curve + 1e-16)
+    best = int(_smooth(f1[classes].mean(0)).argmax()) if len(classes) else 0
+    return {"classes": classes, "n_gt": n_gt, "precision": p_curve[:, best], "recall": r_curve[:, best], "ap": ap}
+
+# ───────────────────────── Evaluation run ─────────────────────
+
+def _labels_from_rows(rows, size):
+    """(K, 5) normalised class/cx/cy/w/h rows of a square `size` image -> (classes, xyxy pixels)."""
+    cx, cy, bw, bh = rows[:, 1] * size, rows[:, 2] * size, rows[:, 3] * size, rows[:, 4] * size
+    xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    return rows[:, 0].astype(np.int64), xyxy
+
+
+def _val_batches(sources, batch_size, workers, imgsz, cache_dir):
+    """Lists of (path, image, (gt_cls, gt_xyxy)): decoded from disk, or views into a packed shard."""
+    if cache_dir:
+        from dataset_cache import open_shard
+        reader = open_shard(sources, cache_dir, imgsz, workers)
+        for paths, images, labels in reader.batches(batch_size):
+            yield [(p, img, _labels_from_rows(rows, reader.imgsz)) for p, img, rows in zip(paths, images, labels)]
+        return
+    for batch in iter_batches(iter_decoded(iter_image_paths(sources), workers), batch_size):
+        yield [(path, image, load_labels(path, image.shape)) for path, image in batch]
+
+
+def evaluate(model, sources=(DEFAULT_LIST,), batch_size=1, workers=4, imgsz=IMG_SIZE, conf=CONF_THRESHOLD,
+             cache_dir=None):
+    """Run the model over `sources` and return the metrics report (dict)."""
+    correct, confs, pred_classes, gt_classes = [], [], [], []
+    latencies_ms = []
+    stage_ms = {"preprocess": [], "inference": [], "postprocess": []}
+    n_images = 0
+
+    for batch in _val_batches(sources, batch_size, workers, imgsz, cache_dir):
+        t0 = time.perf_counter()
+        results = model.predict([img for _, img, _ in batch], imgsz=imgsz, conf=conf, iou=NMS_IOU, verbose=False)
+        per_image = 1000 * (time.perf_counter() - t0) / len(batch)
+        for (path, image, (gt_cls, gt_xyxy)), result in zip(batch, results):
+            latencies_ms.append(per_image)
+            for stage, values in stage_ms.items():
+                values.append((result.speed or {}).get(stage, 0.0))
+            xyxy, p_conf, p_cls = box_arrays(result)
+            correct.append(match_predictions(gt_cls, gt_xyxy, p_cls, xyxy))
+            confs.append(p_conf)
+            pred_classes.append(p_cls)
+            gt_classes.append(gt_cls)
+            n_images += 1
+
+    names = model.names
+    num_classes = max(names) + 1 if isinstance(names, dict) else len(names)
+    stats = ap_per_class(np.concatenate(correct) if correct else np.zeros((0, len(IOU_THRESHOLDS)), bool),
+                         np.concatenate(confs) if confs else np.zeros(0),
+                         np.concatenate(pred_classes) if pred_classes else np.zeros(0, np.int64),
+                         np.concatenate(gt_classes) if gt_classes else np.zeros(0, np.int64),
+                         num_classes)
+
+    classes = stats["classes"]
+    per_class = {}
+    for c in classes.tolist():
+        per_class[names[c]] = {
+            "instances": int(stats["n_gt"][c]),
+            "precision": float(stats["precision"][c]),
+            "recall": float(stats["recall"][c]),
+            "mAP50": float(stats["ap"][c, 0]),
+            "mAP50-95": float(stats["ap"][c].mean()),
+        }
+    mean = lambda values: float(values[classes].mean()) if len(classes) else 0.0
+    summary = dict(zip(METRIC_KEYS, (mean(stats["precision"]), mean(stats["recall"]),
+                                     mean(stats["ap"][:, 0]), mean(stats["ap"].mean(1)))))
+
+    latency = {f"p{q}": float(np.percentile(latencies_ms, q)) if latencies_ms else 0.0 for q in LATENCY_PERCENTILES}
+    latency["mean"] = float(np.mean(latencies_ms)) if latencies_ms else 0.0
+    latency["stages_mean_ms"] = {k: float(np.mean(v)) if v else 0.0 for k, v in stage_ms.items()}
+    return {"images": n_images, "metrics": summary, "per_class": per_class, "latency_ms": latency}
+
+
+def read_results_csv(path, row="best"):
+    """metrics/* values from an ultralytics results.csv: the best-mAP50-95 epoch, or the last one."""
+    with open(path, newline="") as f:
+        rows = [{k.strip(): v for k, v in r.items()} for r in csv.DictReader(f)]
+    if not rows:
+        return {}
+    chosen = max(rows, key=lambda r: float(r[METRIC_KEYS[3]])) if row == "best" else rows[-1]
+    return {k: float(chosen[k]) for k in METRIC_KEYS}
+
+
+def print_report(report, reference=None):
+    print(f"\n{'class':<20}{'inst':>6}{'P':>8}{'R':>8}{'mAP50':>8}{'mAP50-95':>10}")
+    for name, m in report["per_class"].items():
+        print(f"{name:<20}{m['instances']:>6}{m['precision']:>8.3f}{m['recall']:>8.3f}{m['mAP50']:>8.3f}{m['mAP50-95']:>10.3f}")
+    print()
+    for key in METRIC_KEYS:
+        ref = f"   (results.csv: {reference[key]:.4f})" if reference else ""
+        print(f"{key:<22}{report['metrics'][key]:.4f}{ref}")
+    lat = report["latency_ms"]
+    pct = "  ".join(f"p{q} {lat[f'p{q}']:.1f}" for q in LATENCY_PERCENTILES)
+    print(f"\nlatency over {report['images']} images (ms/image): mean {lat['mean']:.1f}  {pct}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score a model on the local val split.")
+    parser.add_argument("sources", nargs="*", default=[str(DEFAULT_LIST)], help="val list files / image dirs")
+    parser.add_argument("--weights", default=str(DEFAULT_WEIGHTS))
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--batch", type=int, default=1, help="1 gives true per-image latency")
+    parser.add_argument("--out", default=None, help="write the report as JSON")
+    parser.add_argument("--cache", default=None, metavar="DIR",
+                        help="read images from a packed shard in DIR (built / refreshed as needed)")
+    parser.add_argument("--results-csv", default=None, help="ultralytics results.csv to compare against")
+    parser.add_argument("--min-map50", type=float, default=None, help="fail (exit 1) below this mAP50")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="fail (exit 1) above this p95 latency")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    model = load_model(args.weights, args.backend, args.imgsz)
+    report = evaluate(model, args.sources, batch_size=args.batch, imgsz=args.imgsz, cache_dir=args.cache)
+    reference = read_results_csv(args.results_csv) if args.results_csv else None
+    print_report(report, reference)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+
+    failed = []
+    if args.min_map50 is not None and report["metrics"]["metrics/mAP50(B)"] < args.min_map50:
+        failed.append(f"mAP50 below {args.min_map50}")
+    if args.max_p95_ms is not None and report["latency_ms"]["p95"] > args.max_p95_ms:
+        failed.append(f"p95 latency above {args.max_p95_ms} ms")
+    if failed:
+        print("FAILED: " + "; ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,134 @@
+import time
+STARTUP_T0 = time.perf_counter()  # --- taken before the other imports so cold start is measured in full --- 
+
 import tkinter as tk
 from tkinter import filedialog
-from PIL import Image, ImageTk
 import cv2
-from ultralytics import YOLO
 import threading
-import time
+import os
+import json
+from collections import OrderedDict
 import numpy as np
-from inference_mp4 import annotate_video
-
-# Load YOLO model
-model = YOLO('best.pt')
+from live_pipeline import FrameRing, LatestResult
+from video_playback import VideoReader
+from detections import ClassIndex, make_result
+from tracking import SparseDetector
+from perf_stats import PerfStats
+from tiling import TiledModel
+from display import DISPLAY_SIZE, FrameDisplay
+from model_loader import DEFAULT_BACKEND
+from video_analysis import FrameDetections, VideoAnalyzer
+
+UI_POLL_MS = 15  # how often the Tk thread picks up new inference results
+MODEL_WEIGHTS = 'best.pt'
+MODEL_BACKEND = DEFAULT_BACKEND  # "torch", "onnx" or "openvino" (see model_loader)
+PREDICT_KWARGS = {}  # extra model() arguments; part of the result cache key
+RESULT_CACHE_SIZE = 16  # raw image results kept for instant re-filtering
+PERF_REFRESH_MS = 500  # how often the performance panel is redrawn
+CAMERA_DETECT_EVERY = 1  # >1: camera runs YOLO every k-th frame and tracks boxes in between
+TILE_MODE = None  # uploaded images: None, "full" (sliced inference) or "adaptive" (slice only unsure regions)
+LOADING_POLL_MS = 100  # how often the window checks whether the model has finished loading
+STARTUP_LOG = 'startup_times.jsonl'  # one line per GUI start: window / model-ready times in ms
+VIDEO_CACHE_SIZE = 4  # videos whose per-frame detections are kept (reopening one skips the analysis)
+ANALYSIS_REFRESH_MS = 250  # how often the analysed-range bar under the seek slider is redrawn
+SLIDER_LENGTH = 400  # seek slider / analysed-range bar width in px
+
+# --- YOLO model: loaded on first use (the GUI starts this on a background thread) --- 
+model = None
+class_index = None  # --- precomputed name <-> id lookups for filtering --- 
+model_load_ms = None
+_model_lock = threading.Lock()
+
+
+def ensure_model():
+    # --- torch / ultralytics are only imported here, so the window can appear before they load --- 
+    global model, class_index, model_load_ms
+    with _model_lock:
+        if model is None:
+            from model_loader import load_model
+            t0 = time.perf_counter()
+            loaded = load_model(MODEL_WEIGHTS, MODEL_BACKEND)  # also warms it up
+            class_index = ClassIndex(loaded.names)
+            model_load_ms = 1000 * (time.perf_counter() - t0)
+            model = loaded
+    return model
+
+
+def log_startup(window_ms, ready_ms, path=STARTUP_LOG):
+    # --- append this start's timings so cold-start time can be tracked across versions --- 
+    entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "window_ms": round(window_ms, 1),
+             "model_load_ms": round(model_load_ms or 0.0, 1), "ready_ms": round(ready_ms, 1),
+             "weights": MODEL_WEIGHTS, "backend": model.backend if model else None}
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"Startup: window {window_ms:.0f} ms, model ready {ready_ms:.0f} ms (load {entry['model_load_ms']:.0f} ms)")
+
+
+class ResultCache:
+    """Small LRU of raw YOLO results keyed by (path, mtime, model params)."""
+
+    def __init__(self, max_items=RESULT_CACHE_SIZE):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(image_path):
+        stat = os.stat(image_path)
+        params = tuple(sorted(PREDICT_KWARGS.items())) + (TILE_MODE,)
+        return (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, MODEL_WEIGHTS, ensure_model().backend, params)
+
+    def get(self, key):
+        with self._lock:
+            result = self._items.get(key)
+            if result is not None:
+                self._items.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+result_cache = ResultCache()
+video_cache = ResultCache(VIDEO_CACHE_SIZE)  # --- video key -> FrameDetections --- 
+
+
+def predict_image(image_path):
+    # --- raw result for an image file, only running the model on a cache miss --- 
+    key = ResultCache.key_for(image_path)
+    result = result_cache.get(key)
+    if result is None:
+        detector = ensure_model()
+        if TILE_MODE:
+            # --- small objects in large stills: full-frame pass + batched overlapping tiles --- 
+            detector = TiledModel(detector, adaptive=TILE_MODE == "adaptive")
+        result = detector(image_path, **PREDICT_KWARGS)[0]
+        result_cache.put(key, result)
+    return result
+
+def render_results(result, visible_classes=None):
+    if visible_classes is not None:
+        # --- get filtered classes --- 
+        result = filter_results(result, visible_classes)
+    return result.plot()
 
 # Inference + annotation for image path
 def annotate_image(image_path, visible_classes=None):
-    results = model(image_path)
-    if visible_classes is not None:
-        # --- get filtered classes --- 
-        filtered_result = filter_results(results[0], visible_classes) 
-        return filtered_result.plot(), results[0] 
-    return results[0].plot(), results[0]  # BGR image and detection result
+    result = predict_image(image_path)
+    return render_results(result, visible_classes), result  # BGR image and detection result
 
 # Inference + annotation for frame
 def annotate_frame(frame, visible_classes=None):
-    results = model(frame)
-    if visible_classes is not None:
-        # --- get filtered classes --- 
-        filtered_result = filter_results(results[0], visible_classes)
-        return filtered_result.plot(), results[0] 
-    return results[0].plot(), results[0]  # BGR image and detection result
+    results = ensure_model()(frame, **PREDICT_KWARGS)
+    return render_results(results[0], visible_classes), results[0]  # BGR image and detection result
 
 def filter_results(result, visible_classes):
-    if not result.boxes or not visible_classes:
-        # --- empty result  --- 
-        filtered_result = result.new()
-        return filtered_result
-    
-    # --- keep track of indices --- 
-    keep_indices = []
-    for i, box in enumerate(result.boxes):
-        cls_id = int(box.cls[0])
-        class_name = model.names[cls_id]
-        if class_name in visible_classes:
-            keep_indices.append(i)
-    
-    if not keep_indices:
-        # --- empty result --- 
-        filtered_result = result.new()
-        return filtered_result
-    
-    # --- add new selected classes --- 
-    filtered_result = result.new()
-    filtered_result.boxes = result.boxes[keep_indices]
-    
-    return filtered_result
+    # --- one vectorised class mask instead of a per-box loop --- 
+    return class_index.select(result, visible_classes)
 
 class YOLO_GUI:
     def __init__(self, root):
@@ -68,8 +144,9 @@ class YOLO_GUI:
         self.right_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=10, pady=10)
 
         # Canvas for image or webcam stream
-        self.canvas = tk.Canvas(self.left_frame, width=700, height=500)
+        self.canvas = tk.Canvas(self.left_frame, width=DISPLAY_SIZE[0], height=DISPLAY_SIZE[1])
         self.canvas.pack()
+        self.display = FrameDisplay(self.canvas)  # --- one PhotoImage + preallocated buffers, reused every frame --- 
 
         # Buttons
         self.upload_button = tk.Button(self.left_frame, text="Upload Image", command=self.upload_image)
@@ -84,6 +161,13 @@ class YOLO_GUI:
         self.stop_button = tk.Button(self.left_frame, text="Stop Camera", command=self.stop_camera, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5)
 
+        # --- model loading indicator; the buttons that need the model wait for it --- 
+        self.status_label = tk.Label(self.left_frame, text="Loading model", fg="gray")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+        self.model_buttons = (self.upload_button, self.upload_video_button, self.cam_button)
+        for button in self.model_buttons:
+            button.config(state=tk.DISABLED)
+
         # Video playback controls
         self.video_controls_frame = tk.Frame(self.left_frame)
         self.video_controls_frame.pack(pady=5)
@@ -94,6 +178,16 @@ class YOLO_GUI:
         self.stop_video_button = tk.Button(self.video_controls_frame, text="Stop Video", command=self.stop_video, state=tk.DISABLED)
         self.stop_video_button.pack(side=tk.LEFT, padx=5)
 
+        self.slider_frame = tk.Frame(self.video_controls_frame)
+        self.slider_frame.pack(side=tk.LEFT, padx=5)
+        self.video_slider = tk.Scale(self.slider_frame, from_=0, to=0, orient=tk.HORIZONTAL, length=SLIDER_LENGTH,
+                                     showvalue=False, command=self.seek_video, state=tk.DISABLED)
+        self.video_slider.pack()
+        self.slider_updating = False  # --- set while playback moves the slider, so it doesn't seek --- 
+        # --- thin bar under the slider: frames already analysed by the background pass --- 
+        self.analysis_bar = tk.Canvas(self.slider_frame, width=SLIDER_LENGTH, height=4, highlightthickness=0, bg="gray85")
+        self.analysis_bar.pack()
+
         # --- Get filters --- 
         self.filter_frame = tk.Frame(self.right_frame)
         self.filter_frame.pack(fill=tk.X, pady=(0, 10))
@@ -124,6 +218,19 @@ class YOLO_GUI:
         self.toggle_all_button = tk.Button(self.toggle_frame, text="Toggle All", command=self.toggle_all_classes)
         self.toggle_all_button.pack()
 
+        # --- performance panel (fps, per-stage latency, dropped frames) --- 
+        self.perf = PerfStats()
+        self.perf_frame = tk.Frame(self.right_frame)
+        self.perf_frame.pack(fill=tk.X, pady=(0, 10))
+
+        tk.Label(self.perf_frame, text="Performance", font=("Arial", 12, "bold")).pack()
+        self.perf_label = tk.Label(self.perf_frame, text="", font=("Courier", 8), justify=tk.LEFT, anchor="w")
+        self.perf_label.pack(fill=tk.X)
+
+        self.trace_button = tk.Button(self.perf_frame, text="Dump Trace", command=self.dump_trace)
+        self.trace_button.pack()
+        self.root.after(PERF_REFRESH_MS, self.refresh_perf_panel)
+
         # Detection result panel (scrollable)
         tk.Label(self.right_frame, text="Detections", font=("Arial", 12, "bold")).pack()
         self.text_area = tk.Text(self.right_frame, width=30, height=20, wrap=tk.WORD)
@@ -142,18 +249,61 @@ class YOLO_GUI:
         self.frame_duration = 1.0/self.target_fps
 
         # Video playback variables
-        self.video_cap = None
+        self.video_reader = None
         self.video_playing = False
         self.video_paused = False
         self.total_frames = 0
         self.current_frame_num = 0
         self.video_fps = 30
+        self.frame_detections = None  # --- per-frame detection cache of the loaded video --- 
+        self.analyzer = None  # --- background pre-analysis thread --- 
 
         # --- class filtering --- 
         self.class_vars = {}  # --- stores checkbox values --- 
         self.current_results = None  # --- current checkbox values --- 
         self.current_image_path = None  # --- current image path --- 
         self.current_frame = None  # --- current frame --- 
+        self.visible_classes = []  # --- snapshot of ticked classes for worker threads --- 
+
+        # --- live pipeline (capture thread -> inference worker -> Tk poll) --- 
+        self.frame_ring = None
+        self.result_box = None
+        self.capture_thread = None
+        self.infer_thread = None
+        self.live_detected_classes = set()
+
+        # --- load + warm up the model in the background while the window is already usable --- 
+        self.window_ms = None
+        self.model_error = None
+        self.loading_ticks = 0
+        self.root.after(0, self.on_window_shown)
+        threading.Thread(target=self.load_model_background, daemon=True).start()
+        self.root.after(LOADING_POLL_MS, self.poll_model_loading)
+
+    def on_window_shown(self):
+        # --- first event-loop turn: the window is on screen --- 
+        self.window_ms = 1000 * (time.perf_counter() - STARTUP_T0)
+
+    def load_model_background(self):
+        try:
+            ensure_model()
+        except Exception as exc:  # --- reported in the status label; the window stays open --- 
+            self.model_error = exc
+
+    def poll_model_loading(self):
+        if self.model_error is not None:
+            self.status_label.config(text=f"Model failed to load: {self.model_error}", fg="red")
+            return
+        if model is None or self.window_ms is None:
+            self.loading_ticks += 1
+            self.status_label.config(text="Loading model" + "." * (self.loading_ticks % 4))
+            self.root.after(LOADING_POLL_MS, self.poll_model_loading)
+            return
+        ready_ms = 1000 * (time.perf_counter() - STARTUP_T0)
+        self.status_label.config(text=f"Ready ({model.backend})", fg="dark green")
+        for button in self.model_buttons:
+            button.config(state=tk.NORMAL)
+        log_startup(self.window_ms, ready_ms)
 
     def update_class_checkboxes(self, detected_classes):
         # --- clear all checkboxes
@@ -181,13 +331,13 @@ class YOLO_GUI:
     def on_class_filter_change(self):
         visible_classes = self.get_visible_classes()
         
-        # --- re-display the current image/frame with updated filtering --- 
+        # --- re-display the current image/frame with updated filtering (no model call) --- 
         if self.current_image_path:
-            annotated_img, _ = annotate_image(self.current_image_path, visible_classes)
-            self.display_image(annotated_img)
-        elif self.current_frame is not None:
-            # --- dont need to do anything - will be updated in next frame cycle --- 
-            pass
+            self.current_results = predict_image(self.current_image_path)
+            self.display_image(self.current_results.orig_img, filter_results(self.current_results, visible_classes))
+        elif self.current_frame is not None and self.current_results is not None:
+            # --- live frames are refreshed next cycle; this covers paused video --- 
+            self.display_image(self.current_frame, filter_results(self.current_results, visible_classes))
 
     def toggle_all_classes(self):
         if not self.class_vars:
@@ -215,22 +365,17 @@ class YOLO_GUI:
         self.current_frame = None
         
         # --- get image without filtering
-        annotated_img, results = annotate_image(file_path)
+        results = predict_image(file_path)
         self.current_results = results
         
         # --- extract detected class names --- 
-        detected_classes = set()
-        if results and results.boxes:
-            for box in results.boxes:
-                cls_id = int(box.cls[0])
-                class_name = model.names[cls_id]
-                detected_classes.add(class_name)
+        summary = class_index.summarize(results)
         
         # --- update checkboxes --- 
-        self.update_class_checkboxes(detected_classes)
+        self.update_class_checkboxes(set(summary.counts))
         
-        self.display_image(annotated_img)
-        self.display_detections(results)
+        self.display_image(results.orig_img, results)
+        self.display_detections(results, summary)
     
     def upload_video(self):
         self.stop_camera()
@@ -239,14 +384,27 @@ class YOLO_GUI:
         if not file_path:
             return
         
-        # Initialize video capture
-        self.video_cap = cv2.VideoCapture(file_path)
-        self.total_frames = int(self.video_cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.video_fps = self.video_cap.get(cv2.CAP_PROP_FPS)
+        # Initialize video reader (sequential prefetch + keyframe index built in the background)
+        self.video_reader = VideoReader(file_path)
+        self.total_frames = self.video_reader.total_frames
+        self.video_fps = self.video_reader.fps
+
+        # --- detections per frame: reused if this video was analysed before, else filled in the background --- 
+        key = ResultCache.key_for(file_path)
+        self.frame_detections = video_cache.get(key)
+        if self.frame_detections is None:
+            self.frame_detections = FrameDetections(self.total_frames)
+            video_cache.put(key, self.frame_detections)
+        if not self.frame_detections.complete():
+            detector = ensure_model()
+            self.analyzer = VideoAnalyzer(file_path, self.frame_detections,
+                                          lambda frames: detector.predict(frames, **PREDICT_KWARGS))
+        self.root.after(0, self.refresh_analysis_bar, self.frame_detections)
         
         # Enable video controls
         self.play_pause_button.config(state=tk.NORMAL)
         self.stop_video_button.config(state=tk.NORMAL)
+        self.video_slider.config(state=tk.NORMAL, to=max(self.total_frames - 1, 0))
         
         # Reset playback state
         self.video_playing = False
@@ -259,7 +417,7 @@ class YOLO_GUI:
         print(f"Video loaded: {self.total_frames} frames at {self.video_fps} FPS")
 
     def toggle_video_playback(self):
-        if not self.video_cap:
+        if not self.video_reader:
             return
             
         if self.video_playing:
@@ -267,49 +425,68 @@ class YOLO_GUI:
         else:
             self.video_playing = True
             self.video_paused = False
-            threading.Thread(target=self.video_playback_loop, daemon=True).start()
+            self.start_live_pipeline(self.video_playback_loop, flip=False)
 
     def stop_video(self):
         self.video_playing = False
         self.video_paused = False
-        if self.video_cap:
-            self.video_cap.release()
-            self.video_cap = None
+        self.stop_live_pipeline()
+        if self.analyzer:
+            self.analyzer.stop()
+            self.analyzer = None
+        self.frame_detections = None
+        self.analysis_bar.delete("all")
+        if self.video_reader:
+            self.video_reader.release()
+            self.video_reader = None
         
         # Disable video controls
         self.play_pause_button.config(state=tk.DISABLED)
         self.stop_video_button.config(state=tk.DISABLED)
+        self.video_slider.config(state=tk.DISABLED)
         
         # Clear current states
         self.current_image_path = None
         self.current_frame = None
 
     def seek_video(self, value):
-        if not self.video_cap:
+        if not self.video_reader or self.slider_updating:
             return
-        frame_num = int(value)
-        self.seek_to_frame(frame_num)
+        frame_num = int(float(value))
+        if frame_num == self.current_frame_num:
+            return
+        if self.video_playing and not self.video_paused:
+            # --- playback loop picks up from the new position --- 
+            self.video_reader.seek(frame_num)
+        else:
+            self.seek_to_frame(frame_num)
+
+    def set_slider_position(self, frame_num):
+        self.slider_updating = True
+        self.video_slider.set(frame_num)
+        self.slider_updating = False
 
     def seek_to_frame(self, frame_num):
-        if not self.video_cap:
+        if not self.video_reader:
             return
             
-        self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-        ret, frame = self.video_cap.read()
-        if ret:
+        # --- keyframe-indexed seek; the reader keeps prefetching from here --- 
+        self.video_reader.seek(frame_num)
+        item = self.video_reader.read(timeout=5.0)
+        if item:
+            frame_num, frame = item
             self.current_frame_num = frame_num
+            self.current_frame = frame
+            self.set_slider_position(frame_num)
             
             # Apply filtering and display
             visible_classes = self.get_visible_classes()
-            annotated_frame, results = annotate_frame(frame, visible_classes)
+            results = self.video_frame_results(frame_num, frame)
+            self.current_results = results
             
             # Update detected classes
-            detected_classes = set()
-            if results and results.boxes:
-                for box in results.boxes:
-                    cls_id = int(box.cls[0])
-                    class_name = model.names[cls_id]
-                    detected_classes.add(class_name)
+            summary = class_index.summarize(results)
+            detected_classes = set(summary.counts)
             
             # Update checkboxes if new classes detected
             current_checkbox_classes = set(self.class_vars.keys())
@@ -320,22 +497,67 @@ class YOLO_GUI:
                     if name in current_states:
                         var.set(current_states[name])
             
-            self.display_image(annotated_frame)
-            self.display_detections(results)
-
-    def video_playback_loop(self):
-        frame_duration = 1.0 / self.video_fps if self.video_fps > 0 else 1.0/30
-        
-        while self.video_playing and self.video_cap:
-            if not self.video_paused:
-                if self.current_frame_num >= self.total_frames - 1:
-                    # End of video
-                    self.video_playing = False
+            self.display_image(frame, filter_results(results, visible_classes))
+            self.display_detections(results, summary)
+
+    def video_frame_results(self, frame_num, frame):
+        # --- cached boxes for this frame if analysed, else run the model once and cache them --- 
+        detections = self.frame_detections
+        if self.analyzer:
+            self.analyzer.focus(frame_num)  # --- keep the background pass just ahead of the play head --- 
+        boxes = detections.get(frame_num) if detections is not None else None
+        if boxes is None:
+            results = ensure_model()(frame, **PREDICT_KWARGS)[0]
+            if detections is not None:
+                detections.put_result(frame_num, results)
+            return results
+        return make_result(frame, class_index.names, *boxes)
+
+    def refresh_analysis_bar(self, detections):
+        # --- redraw the analysed ranges; stops once the video is fully analysed, unloaded or replaced --- 
+        if detections is None or detections is not self.frame_detections:
+            return
+        self.analysis_bar.delete("all")
+        for x0, x1 in detections.coverage_runs(SLIDER_LENGTH):
+            self.analysis_bar.create_rectangle(x0, 0, x1, 4, fill="steel blue", width=0)
+        if self.analyzer and self.analyzer.error is not None:
+            print(f"Background analysis stopped: {self.analyzer.error}")
+            self.analyzer = None
+        if not detections.complete():
+            self.root.after(ANALYSIS_REFRESH_MS, self.refresh_analysis_bar, detections)
+
+    def video_playback_loop(self, ring):
+        # --- capture stage for video: prefetched sequential frames paced by their timestamps --- 
+        reader = self.video_reader
+        idle_sleep = 1.0 / self.video_fps if self.video_fps > 0 else 1.0/30
+        last_frame_num = None
+        base_wall = base_ts = 0.0
+
+        while self.video_playing and self.video_reader is reader:
+            if self.video_paused:
+                time.sleep(idle_sleep)
+                last_frame_num = None
+                continue
+            t0 = time.perf_counter()
+            item = reader.read(timeout=0.5)
+            if item is None:
+                if reader.finished():
                     break
-                
-                self.seek_to_frame(self.current_frame_num + 1)
-            
-            time.sleep(frame_duration)
+                continue
+            frame_num, frame = item
+            self.perf.record("capture", t0, time.perf_counter(), frame_num)
+
+            # --- (re)start the clock after a pause or seek, then wait for the frame's timestamp --- 
+            ts = reader.index.timestamp(frame_num)
+            if last_frame_num is None or frame_num != last_frame_num + 1:
+                base_wall, base_ts = time.perf_counter(), ts
+            last_frame_num = frame_num
+            sleep_time = base_wall + (ts - base_ts) - time.perf_counter()
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+
+            ring.publish(frame, tag=frame_num)
+        ring.close()
 
     def start_camera(self):
         if self.running:
@@ -346,81 +568,173 @@ class YOLO_GUI:
         self.stop_button.config(state=tk.NORMAL)
         self.cam_button.config(state=tk.DISABLED)
         self.current_image_path = None
-        threading.Thread(target=self.camera_loop, daemon=True).start()
+        self.live_detected_classes = set()
+        self.start_live_pipeline(self.camera_loop, flip=True, detect_every=CAMERA_DETECT_EVERY)
 
     def stop_camera(self):
         self.running = False
+        self.stop_live_pipeline()
         if self.cap:
             self.cap.release()
             self.cap = None
         self.stop_button.config(state=tk.DISABLED)
         self.cam_button.config(state=tk.NORMAL)
 
-    def camera_loop(self):
-        all_detected_classes = set()
-        
+    def camera_loop(self, ring):
+        # --- capture stage for the webcam: decode straight into the ring's buffers --- 
         while self.running and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            frame_start = time.perf_counter()
-            if not ret:
+            t0 = time.perf_counter()
+            if not ring.write(self.cap.read):
                 break
-            frame = cv2.flip(frame, 1)
-            self.current_frame = frame.copy()
-            
-            # --- get results and update detected classes --- 
-            visible_classes = self.get_visible_classes()
-            annotated_frame, results = annotate_frame(frame, visible_classes)
-            self.current_results = results
-            
-            # --- collect all detected classes across frames --- 
-            if results and results.boxes:
-                for box in results.boxes:
-                    cls_id = int(box.cls[0])
-                    class_name = model.names[cls_id]
-                    all_detected_classes.add(class_name)
-            
-            # ---  update checkboxes if new classes detected --- 
-            current_checkbox_classes = set(self.class_vars.keys())
-            if all_detected_classes != current_checkbox_classes:
-                # Preserve current checkbox states
-                current_states = {name: var.get() for name, var in list(self.class_vars.items())}
-                self.update_class_checkboxes(all_detected_classes)
-                # --- restore previous states, new classes default to True --- 
-                for name, var in list(self.class_vars.items()):
-                    if name in current_states:
-                        var.set(current_states[name])
-            
-            self.display_image(annotated_frame)
-            self.display_detections(results)
+            self.perf.record("capture", t0, time.perf_counter())
+        ring.close()
+
+    def start_live_pipeline(self, capture_loop, flip, detect_every=1):
+        self.visible_classes = self.get_visible_classes()
+        self.perf.reset()
+        self.frame_ring = FrameRing()
+        self.result_box = LatestResult()
+        self.capture_thread = threading.Thread(target=capture_loop, args=(self.frame_ring,), daemon=True)
+        self.infer_thread = threading.Thread(target=self.inference_loop, args=(self.frame_ring, flip, detect_every), daemon=True)
+        self.capture_thread.start()
+        self.infer_thread.start()
+        self.root.after(UI_POLL_MS, self.poll_live_results)
+
+    def stop_live_pipeline(self):
+        # --- wait for capture to let go of the VideoCapture before it is released --- 
+        if self.frame_ring:
+            self.frame_ring.close()
+        if self.capture_thread and self.capture_thread is not threading.current_thread():
+            self.capture_thread.join(timeout=1.0)
+        self.capture_thread = None
+
+    def inference_loop(self, ring, flip, detect_every=1):
+        # --- always process the newest frame; anything older is dropped --- 
+        model = ensure_model()
+        detector = None
+        if detect_every > 1:
+            detector = SparseDetector(lambda f: model(f, **PREDICT_KWARGS)[0], model.names, every=detect_every)
+        last_seq = 0
+        while True:
+            item = ring.take_latest(last_seq)
+            if item is None:
+                if ring.closed:
+                    break
+                continue
+            frame_start = time.perf_counter()
+            seq, frame, frame_num, _ = item
+            self.perf.add_dropped("capture", seq - last_seq - 1)
+            last_seq = seq
+            try:
+                # --- copy out of the ring so the capture thread can reuse the slot --- 
+                frame = cv2.flip(frame, 1) if flip else frame.copy()
+            finally:
+                ring.release()
+
+            # --- model + filter here; boxes are drawn on the Tk side onto the resized display buffer --- 
+            t0 = time.perf_counter()
+            if self.frame_detections is not None and frame_num is not None:
+                results = self.video_frame_results(frame_num, frame)  # --- video: from the analysis cache --- 
+            elif detector is not None:
+                results = detector(frame)
+            else:
+                results = model(frame, **PREDICT_KWARGS)[0]
+            t1 = time.perf_counter()
+            filtered = filter_results(results, self.visible_classes)
+            t2 = time.perf_counter()
+            self.perf.record("inference", t0, t1, frame_num)
+            self.perf.record("filter", t1, t2, frame_num)
+
+            if self.result_box.put((frame_num, frame, filtered, results)):
+                self.perf.add_dropped("display")
+
             delta_time = time.perf_counter() - frame_start
             sleep_time = self.frame_duration - delta_time
             if sleep_time > 0 and self.limit_fps:
                 time.sleep(sleep_time)
-        self.stop_camera()
 
-    def display_image(self, bgr_img):
-        rgb_img = cv2.cvtColor(bgr_img, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(rgb_img).resize((700, 500), Image.Resampling.LANCZOS)
-        tk_img = ImageTk.PhotoImage(img_pil)
+    def poll_live_results(self):
+        # --- Tk side of the pipeline: the only place live results touch widgets --- 
+        ring, infer_thread = self.frame_ring, self.infer_thread
+        if ring is None:
+            return
+        self.visible_classes = self.get_visible_classes()
+
+        item = self.result_box.take()
+        if item is not None:
+            self.show_live_result(*item)
+
+        if ring.closed and not infer_thread.is_alive() and self.frame_ring is ring:
+            # --- stream ended on its own (camera unplugged / end of video) --- 
+            item = self.result_box.take()
+            if item is not None:
+                self.show_live_result(*item)
+            if self.running:
+                self.stop_camera()
+            elif self.video_playing:
+                self.video_playing = False
+            return
+        if self.frame_ring is ring and (self.running or self.video_playing):
+            self.root.after(UI_POLL_MS, self.poll_live_results)
+
+    def show_live_result(self, frame_num, frame, filtered, results):
+        tk_start = time.perf_counter()
+        self.current_frame = frame
+        self.current_results = results
+        if frame_num is not None:
+            self.current_frame_num = frame_num
+            self.set_slider_position(frame_num)
 
-        if not hasattr(self, 'image_id'):
-            self.image_id = self.canvas.create_image(0, 0, anchor="nw", image=tk_img)
-        else:
-            self.canvas.itemconfig(self.image_id, image=tk_img)
-        
-        self.canvas.image = tk_img  # prevent GC
+        summary = class_index.summarize(results)
+        detected_classes = set(summary.counts)
 
-    def display_detections(self, result):
+        if self.running:
+            # --- camera: collect all detected classes across frames --- 
+            self.live_detected_classes |= detected_classes
+            detected_classes = self.live_detected_classes
+
+        # ---  update checkboxes if new classes detected --- 
+        current_checkbox_classes = set(self.class_vars.keys())
+        if detected_classes != current_checkbox_classes and detected_classes:
+            # Preserve current checkbox states
+            current_states = {name: var.get() for name, var in list(self.class_vars.items())}
+            self.update_class_checkboxes(detected_classes)
+            # --- restore previous states, new classes default to True --- 
+            for name, var in list(self.class_vars.items()):
+                if name in current_states:
+                    var.set(current_states[name])
+
+        self.display_detections(results, summary)
+        render_start = time.perf_counter()
+        self.display_image(frame, filtered)
+        self.perf.record("tk", tk_start, render_start, frame_num)
+        self.perf.record("render", render_start, time.perf_counter(), frame_num)
+        self.perf.frame_shown()
+
+    def refresh_perf_panel(self):
+        limit = "on" if self.limit_fps else "off"
+        self.perf_label.config(text=f"{self.perf.summary_text()}\ntarget {self.target_fps} FPS (limit {limit})")
+        self.root.after(PERF_REFRESH_MS, self.refresh_perf_panel)
+
+    def dump_trace(self):
+        path = self.perf.dump_trace(f"trace_{time.strftime('%Y%m%d-%H%M%S')}.json")
+        print(f"Trace written to {path} (open in chrome://tracing or ui.perfetto.dev)")
+
+    def display_image(self, bgr_img, result=None):
+        # --- resize into the display buffer, draw boxes at display size, paste into the same PhotoImage --- 
+        self.display.show(bgr_img, result)
+
+    def display_detections(self, result, summary=None):
         self.text_area.delete(1.0, tk.END)  # Clear previous
-        if not result or not result.boxes:
+        if summary is None:
+            summary = class_index.summarize(result)
+        if not len(summary.class_ids):
             self.text_area.insert(tk.END, "No detections.")
             return
-        # --- add confidence ---- 
-        for box in result.boxes:
-            cls_id = int(box.cls[0])
-            conf = float(box.conf[0])
-            label = model.names[cls_id]
-            self.text_area.insert(tk.END, f"{label}: {conf:.2f}\n")
+        # --- add confidence (one text insert for all boxes) ---- 
+        names = class_index.names
+        lines = [f"{names[cls_id]}: {conf:.2f}\n" for cls_id, conf in zip(summary.class_ids.tolist(), summary.confs.tolist())]
+        self.text_area.insert(tk.END, "".join(lines))
 
 # Run the app
 if __name__ == "__main__":
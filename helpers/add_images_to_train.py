@@ -1,8 +1,9 @@
 import os
-import shutil
 import sys
+from file_ops import print_summary, scan_dir, transfer
+from manifest import Manifest, print_duplicates
 
-def extract_image_names_and_copy(list_file, source_dir1, source_dir2, destination_dir):
+def extract_image_names_and_copy(list_file, source_dir1, source_dir2, destination_dir, mode="auto", conflict="overwrite"):
     """
     Extract image filenames from a text file and copy those images from multiple source directories to destination.
     
@@ -11,16 +12,12 @@ def extract_image_names_and_copy(list_file, source_dir1, source_dir2, destinatio
         source_dir1: First directory containing the actual images
         source_dir2: Second directory containing the actual images
         destination_dir: Directory where to copy the images
+        mode: "auto" (reflink / hardlink when possible, else copy), "copy", "hardlink" or "reflink"
+        conflict: what to do when the image is already in destination_dir: "overwrite", "skip", "rename" or "error"
     """
-    # Create destination directory if it doesn't exist
-    os.makedirs(destination_dir, exist_ok=True)
-    
-    # Count for tracking progress
-    copied_count = 0
-    not_found_count = 0
-    not_found_files = []
-    source1_count = 0
-    source2_count = 0
+    # Index both source directories once (one scandir each) instead of checking paths per file
+    index1 = scan_dir(source_dir1)
+    index2 = scan_dir(source_dir2)
     
     # Read the file paths from the text file
     with open(list_file, 'r') as f:
@@ -28,47 +25,34 @@ def extract_image_names_and_copy(list_file, source_dir1, source_dir2, destinatio
     
     print(f"Found {len(file_paths)} image paths in {list_file}")
     
-    # Process each file path
+    # Resolve each listed image (ignore directory structure in the text file)
+    pairs = []
+    not_found_files = []
+    source1_count = 0
+    source2_count = 0
     for file_path in file_paths:
-        # Extract just the filename (ignore directory structure in the text file)
-        image_name = os.path.basename(file_path)
-        
-        # Look for the image in the first source directory
-        source_path1 = os.path.join(source_dir1, image_name)
-        
-        # Look for the image in the second source directory
-        source_path2 = os.path.join(source_dir2, image_name)
-        
-        # Check if the image exists in either source directory
-        if os.path.exists(source_path1):
-            # Image found in first source directory, copy it
-            destination_path = os.path.join(destination_dir, image_name)
-            shutil.copy2(source_path1, destination_path)
-            copied_count += 1
+        image_name = os.path.basename(file_path.replace('\\', '/'))
+        if image_name in index1:
+            pairs.append((index1[image_name], os.path.join(destination_dir, image_name)))
             source1_count += 1
-            
-            # Progress update for every 100 files
-            if copied_count % 100 == 0:
-                print(f"Progress: Copied {copied_count} images so far")
-        
-        elif os.path.exists(source_path2):
-            # Image found in second source directory, copy it
-            destination_path = os.path.join(destination_dir, image_name)
-            shutil.copy2(source_path2, destination_path)
-            copied_count += 1
+        elif image_name in index2:
+            pairs.append((index2[image_name], os.path.join(destination_dir, image_name)))
             source2_count += 1
-            
-            # Progress update for every 100 files
-            if copied_count % 100 == 0:
-                print(f"Progress: Copied {copied_count} images so far")
-        
         else:
-            # Image not found in either source directory
-            not_found_count += 1
             not_found_files.append(image_name)
+    not_found_count = len(not_found_files)
+    
+    # Same image exported under different names / folders?
+    manifest = Manifest()
+    print_duplicates(manifest.find_duplicates([src for src, _ in pairs]))
+    
+    # Link / copy in parallel; destinations that already hold the same content are left alone
+    stats = transfer(pairs, mode=mode, conflict=conflict, label="Copied", manifest=manifest)
+    manifest.save()
     
     # Print summary
-    print(f"\nComplete! Copied {copied_count} images to {destination_dir}")
+    print()
+    print_summary(stats, "Copied", destination_dir)
     print(f"Found {source1_count} images in first source directory ({source_dir1})")
     print(f"Found {source2_count} images in second source directory ({source_dir2})")
     print(f"Could not find {not_found_count} images in either source directory")
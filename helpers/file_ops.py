@@ -0,0 +1,226 @@
+"""
+Shared file operations for the dataset helper scripts
+=====================================================
+* `scan_dir`  - one `os.scandir` pass -> {file name: path}, instead of an
+                `os.path.exists` call per listed file
+* `place`     - put one file at a destination: reflink (copy-on-write clone)
+                or hardlink when the filesystem allows it, else a real copy;
+                or a move (rename when on the same filesystem)
+* `transfer`  - run many of those on a thread pool with a batch conflict
+                policy and progress output; given a `manifest.Manifest`,
+                destinations that already hold identical content are left
+                alone ("unchanged") and the manifest learns the new copies
+
+Conflict policies, applied when the destination name already exists:
+"skip", "overwrite", "rename" (add _1, _2, ... to the name) or "error"
+(raise before anything is touched).
+
+Note that a hardlinked file *is* the source file: editing one in place edits
+both. Use mode="copy" if the destination files will be modified.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+
+WORKERS        = 16       # copies are I/O bound; threads overlap the syscalls
+PROGRESS_EVERY = 1000     # files between progress lines
+MODES          = ("auto", "reflink", "hardlink", "copy", "move")
+CONFLICTS      = ("skip", "overwrite", "rename", "error")
+FICLONE        = 0x40049409  # Linux ioctl: clone src into dst (btrfs, XFS, overlayfs on those, ...)
+
+# --- (src device, dst device) pairs where a method already failed, so it isn't retried per file ---
+_unsupported = set()
+_unsupported_lock = threading.Lock()
+
+
+def scan_dir(directory, exts=None):
+    """{name: path} of the regular files in `directory` (one scandir pass); {} if it doesn't exist."""
+    index = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and (exts is None or os.path.splitext(entry.name)[1].lower() in exts):
+                    index[entry.name] = entry.path
+    except FileNotFoundError:
+        pass
+    return index
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+    shutil.copystat(src, dst)
+
+
+def _try(method, key, fn, src, dst):
+    with _unsupported_lock:
+        if (method, key) in _unsupported:
+            return False
+    try:
+        fn(src, dst)
+        return True
+    except (OSError, ImportError) as exc:
+        if method == "reflink" and os.path.exists(dst):
+            os.remove(dst)  # --- empty file left behind by a failed clone ---
+        if isinstance(exc, ImportError) or exc.errno in (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EPERM,
+                                                         errno.EINVAL, errno.EMLINK, errno.ENOSYS):
+            with _unsupported_lock:
+                _unsupported.add((method, key))
+            return False
+        raise
+
+
+def place(src, dst, mode="auto"):
+    """Create `dst` from `src`; returns the method actually used ("reflink", "hardlink", "copy" or "move")."""
+    if mode == "move":
+        try:
+            os.replace(src, dst)  # --- same filesystem: a rename, no data copied ---
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                raise
+            shutil.move(src, dst)
+        return "move"
+
+    key = (os.stat(src).st_dev, os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+    if mode in ("auto", "reflink") and sys.platform.startswith("linux") and _try("reflink", key, _reflink, src, dst):
+        return "reflink"
+    if mode in ("auto", "hardlink") and _try("hardlink", key, os.link, src, dst):
+        return "hardlink"
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _free_name(name, taken):
+    stem, ext = os.path.splitext(name)
+    i = 1
+    while f"{stem}_{i}{ext}" in taken:
+        i += 1
+    return f"{stem}_{i}{ext}"
+
+
+def plan(pairs, conflict="skip", manifest=None):
+    """Resolve conflicts up front against one index per destination directory.
+
+    Returns (jobs, skipped, unchanged): jobs are (src, dst, replace_existing)
+    triples; unchanged are (src, dst) pairs whose destination already has the
+    same content according to `manifest`.
+    """
+    if conflict not in CONFLICTS:
+        raise ValueError(f"Unknown conflict policy {conflict!r}; expected one of {CONFLICTS}")
+    pairs = list(pairs)
+    indexes = {}
+    for _, dst in pairs:
+        directory = os.path.dirname(dst)
+        if directory not in indexes:
+            indexes[directory] = set(scan_dir(directory))
+
+    identical = set()
+    if manifest is not None:
+        # --- only pairs whose destination exists need hashing; cached hashes make re-runs cheap ---
+        existing = [(src, dst) for src, dst in pairs if os.path.basename(dst) in indexes[os.path.dirname(dst)]]
+        hashes = manifest.hash_many([p for pair in existing for p in pair])
+        identical = {(src, dst) for src, dst in existing if src in hashes and hashes[src] == hashes.get(dst)}
+
+    planned = set()
+    jobs, skipped, unchanged, clashes = [], [], [], []
+    for src, dst in pairs:
+        directory, name = os.path.split(dst)
+        taken = indexes[directory]
+        if dst in planned and conflict != "rename":
+            skipped.append(dst)  # --- listed twice: the first job already writes this destination ---
+            continue
+        if (src, dst) in identical:
+            unchanged.append((src, dst))
+            continue
+        exists = name in taken
+        if exists:
+            if conflict == "skip":
+                skipped.append(dst)
+                continue
+            if conflict == "error":
+                clashes.append(dst)
+                continue
+            if conflict == "rename":
+                name = _free_name(name, taken)
+                dst = os.path.join(directory, name)
+                exists = False
+        taken.add(name)
+        planned.add(dst)
+        jobs.append((src, dst, exists))
+    if clashes:
+        raise FileExistsError(f"{len(clashes)} destination file(s) already exist, e.g. {clashes[0]}")
+    return jobs, skipped, unchanged
+
+
+def _run_job(src, dst, replace_existing, mode):
+    if replace_existing and mode != "move":
+        os.remove(dst)  # --- links / clones can't be created over an existing file ---
+    return place(src, dst, mode)
+
+
+def transfer(pairs, mode="auto", conflict="skip", workers=WORKERS, progress_every=PROGRESS_EVERY, label="Placed",
+             manifest=None):
+    """Copy / link / move (src, dst) pairs in parallel. Returns a stats dict.
+
+    Stats: "done", "skipped", "unchanged", "failed" (list of (src, error))
+    and a count per method used ("reflink", "hardlink", "copy", "move").
+    With a manifest, a move whose destination is already identical just
+    removes the source.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {MODES}")
+    jobs, skipped, unchanged = plan(pairs, conflict, manifest)
+    for directory in {os.path.dirname(dst) for _, dst, _ in jobs}:
+        os.makedirs(directory or ".", exist_ok=True)
+    if mode == "move":
+        for src, _ in unchanged:
+            os.remove(src)
+            manifest.forget(src)
+
+    stats = {"done": 0, "skipped": len(skipped), "unchanged": len(unchanged), "failed": []}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for src, dst, replace in jobs:
+            # --- look up before the job runs: a move makes the source disappear ---
+            known = manifest.cached_hash(src) if manifest is not None else None
+            futures[pool.submit(_run_job, src, dst, replace, mode)] = (src, dst, known)
+        for future in as_completed(futures):
+            src, dst, known = futures[future]
+            try:
+                method = future.result()
+            except OSError as exc:
+                stats["failed"].append((src, exc))
+                continue
+            if manifest is not None:
+                if mode == "move":
+                    manifest.forget(src)
+                if known:
+                    manifest.record(dst, known)  # --- same bytes as the source; no need to hash the copy ---
+            stats[method] = stats.get(method, 0) + 1
+            stats["done"] += 1
+            if progress_every and stats["done"] % progress_every == 0:
+                rate = stats["done"] / max(time.perf_counter() - start, 1e-9)
+                print(f"Progress: {label.lower()} {stats['done']}/{len(jobs)} files ({rate:.0f} files/s)")
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def print_summary(stats, label="Placed", destination=""):
+    methods = ", ".join(f"{stats[m]} {m}" for m in ("reflink", "hardlink", "copy", "move") if stats.get(m))
+    target = f" to {destination}" if destination else ""
+    print(f"{label} {stats['done']} files{target} in {stats['seconds']:.1f}s ({methods or 'nothing to do'})")
+    if stats.get("unchanged"):
+        print(f"Left {stats['unchanged']} files alone that already had identical content")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} files that already existed")
+    if stats["failed"]:
+        print(f"Failed on {len(stats['failed'])} files, e.g.:")
+        for src, exc in stats["failed"][:10]:
+            print(f"  - {src}: {exc}")
@@ -0,0 +1,196 @@
+"""
+Incremental, content-addressed manifest of the dataset
+======================================================
+`data/manifest.json` records, for every file under `data/images` and
+`data/labels`: size, mtime, a BLAKE2b content hash and (for images) the
+paired label file. Updating it re-hashes only files whose size or mtime
+changed, so after the first run it costs one directory walk.
+
+The copy / split helpers use it through `file_ops.transfer(..., manifest=)`
+to skip destination files that already have the same content, and
+`find_duplicates` to spot the same image under different names / folders
+(e.g. the same frame in both the Folder4 and Folder5 exports).
+
+    python helpers/manifest.py            # update data/manifest.json, print duplicate groups
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_PATH = os.path.join("data", "manifest.json")
+IMAGES_ROOT   = os.path.join("data", "images")
+LABELS_ROOT   = os.path.join("data", "labels")
+IMAGE_EXTS    = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".webp"}
+HASH_WORKERS  = 8
+CHUNK         = 1 << 20
+
+
+def hash_file(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def key_for(path):
+    """Manifest key: path relative to the working directory, with forward slashes."""
+    return os.path.relpath(path).replace("\\", "/")
+
+
+def label_for(image_key, images_root=IMAGES_ROOT, labels_root=LABELS_ROOT):
+    """data/images/<sub>/X.jpg -> data/labels/<sub>/X.txt key (YOLO layout), or None outside images_root."""
+    rel = os.path.relpath(image_key, images_root)
+    if rel.startswith(".."):
+        return None
+    return key_for(os.path.join(labels_root, os.path.splitext(rel)[0] + ".txt"))
+
+
+def _walk(root):
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            yield os.path.join(dirpath, name)
+
+
+class Manifest:
+    """{key: {"size", "mtime_ns", "hash", ["label"]}}, loaded from / saved to `path`."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.entries = {}
+        self.last_hashed = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f).get("files", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "files": self.entries}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)  # --- never leave a half-written manifest behind ---
+
+    def _cached(self, key, st):
+        entry = self.entries.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["hash"]
+        return None
+
+    def hash_many(self, paths, workers=HASH_WORKERS):
+        """{path: hash} for existing files, hashing (in parallel) only those whose size/mtime changed."""
+        hashes, stale = {}, []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            cached = self._cached(key_for(path), st)
+            if cached is None:
+                stale.append((path, st))
+            else:
+                hashes[path] = cached
+        if stale:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for (path, st), digest in zip(stale, pool.map(hash_file, [p for p, _ in stale])):
+                    self.record(path, digest, st)
+                    hashes[path] = digest
+        self.last_hashed = len(stale)
+        return hashes
+
+    def hash_of(self, path):
+        return self.hash_many([path]).get(path)
+
+    def cached_hash(self, path):
+        """Hash of `path` if the manifest already has it up to date, else None (never reads the file)."""
+        try:
+            return self._cached(key_for(path), os.stat(path))
+        except FileNotFoundError:
+            return None
+
+    def record(self, path, digest, st=None):
+        """Store a known hash for `path` (e.g. a fresh copy of a file whose hash is already known)."""
+        st = st or os.stat(path)
+        key = key_for(path)
+        with self._lock:
+            entry = self.entries.setdefault(key, {})
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns, hash=digest)
+
+    def forget(self, path):
+        with self._lock:
+            self.entries.pop(key_for(path), None)
+
+    def same_content(self, a, b):
+        hashes = self.hash_many([a, b])
+        return a in hashes and hashes.get(a) == hashes.get(b)
+
+    def update(self, images_root=IMAGES_ROOT, labels_root=LABELS_ROOT):
+        """Bring the entries under both roots up to date; returns {"files", "hashed", "removed"}."""
+        paths = list(_walk(images_root)) + list(_walk(labels_root))
+        self.hash_many(paths)
+        present = {key_for(p) for p in paths}
+        prefixes = tuple(key_for(r) + "/" for r in (images_root, labels_root))
+        removed = [k for k in self.entries if k.startswith(prefixes) and k not in present]
+        for key in removed:
+            del self.entries[key]
+        for key, entry in self.entries.items():
+            if os.path.splitext(key)[1].lower() in IMAGE_EXTS:
+                label = label_for(key, images_root, labels_root)
+                entry["label"] = label if label in present else None
+        return {"files": len(paths), "hashed": self.last_hashed, "removed": len(removed)}
+
+    def find_duplicates(self, paths=None):
+        """Groups (lists of keys, size > 1) of images with identical content, optionally only among `paths`."""
+        if paths is None:
+            hashes = {k: e["hash"] for k, e in self.entries.items() if os.path.splitext(k)[1].lower() in IMAGE_EXTS}
+        else:
+            hashes = {key_for(p): h for p, h in self.hash_many(paths).items()}
+        groups = {}
+        for key, digest in hashes.items():
+            if digest is not None:  # --- unreadable files have no content to compare ---
+                groups.setdefault(digest, []).append(key)
+        return [sorted(g) for g in groups.values() if len(g) > 1]
+
+
+def drop_duplicates(manifest, paths):
+    """`paths` with every exact duplicate after its first occurrence removed; prints what was dropped."""
+    hashes = manifest.hash_many(paths)
+    seen, kept, dropped, unhashed = set(), [], 0, 0
+    for path in paths:
+        digest = hashes.get(path)
+        if digest is None:  # --- unreadable or vanished: can't be a known duplicate, keep it ---
+            unhashed += 1
+            kept.append(path)
+            continue
+        if digest in seen:
+            dropped += 1
+            continue
+        seen.add(digest)
+        kept.append(path)
+    if dropped:
+        print(f"Dropped {dropped} exact duplicate file(s) (same content as another listed file)")
+    if unhashed:
+        print(f"Warning: could not hash {unhashed} file(s); kept them without a duplicate check")
+    return kept
+
+
+def print_duplicates(groups, limit=10):
+    if not groups:
+        print("No exact duplicates found")
+        return
+    print(f"{len(groups)} group(s) of exact duplicates ({sum(len(g) - 1 for g in groups)} redundant files):")
+    for group in groups[:limit]:
+        print("  - " + "  ==  ".join(group))
+    if len(groups) > limit:
+        print(f"  ... and {len(groups) - limit} more")
+
+
+if __name__ == "__main__":
+    manifest = Manifest()
+    stats = manifest.update()
+    manifest.save()
+    print(f"Manifest {MANIFEST_PATH}: {stats['files']} files, {stats['hashed']} (re)hashed, {stats['removed']} removed")
+    print_duplicates(manifest.find_duplicates())
@@ -0,0 +1,284 @@
+"""
+Near-duplicate frames via a perceptual-hash index
+=================================================
+The fixed cameras produce bursts of almost identical frames. Exact hashes
+(manifest.py) don't catch those, so every image gets a 64-bit DCT
+perceptual hash (pHash). Two frames are near-duplicates when their hashes
+differ in at most `radius` bits.
+
+* hashes are computed on a thread pool (cv2 decodes with the GIL released,
+  at 1/8 scale) and cached in `data/cache/phash.json` by path, size and mtime
+* `HashIndex` is a multi-index hash: each 64-bit hash is cut into
+  radius + 1 chunks, and two hashes within `radius` bits must agree exactly
+  on at least one chunk (pigeonhole). Only hashes sharing a chunk value are
+  compared, in vectorised numpy blocks, so there is no all-pairs pass
+* `near_duplicate_groups` joins the close pairs into clusters (union-find).
+  The split helpers shuffle and assign whole groups, so a burst never ends
+  up in both train and val
+
+    python helpers/near_duplicates.py                      # report on data/images/*
+    python helpers/near_duplicates.py data/images/val --radius 4 --json near_dupes.json
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import time
+import cv2
+import numpy as np
+
+from manifest import key_for
+
+CACHE_PATH   = os.path.join("data", "cache", "phash.json")
+IMAGES_ROOT  = os.path.join("data", "images")
+IMAGE_EXTS   = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".webp"}
+HASH_WORKERS = 8
+RADIUS       = 6        # max differing bits (of 64) for two frames to count as near-duplicates
+BLOCK        = 2048     # rows per vectorised comparison block inside one bucket
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # --- numpy < 2.0: popcount through a byte table ---
+    _BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(a):
+        return _BYTE_BITS[a.view(np.uint8)].reshape(*a.shape, 8).sum(-1)
+
+# ───────────────────────── Hashing ────────────────────────────
+
+def phash(path):
+    """64-bit DCT perceptual hash of an image file as an int, or None if it can't be read."""
+    img = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)  # --- JPEG decodes at 1/8 scale, ~10x cheaper ---
+    if img is None:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            return None
+    small = cv2.resize(img, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    bits = low > np.median(low[1:])  # --- the DC term only carries brightness ---
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class HashCache:
+    """{key: [size, mtime_ns, hash hex]} in `path`; only new or changed files are hashed again."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.last_hashed = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def hashes(self, paths, workers=HASH_WORKERS):
+        """{path: int hash} for the readable images in `paths`, hashing the stale ones in parallel."""
+        result, stale = {}, []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entry = self.entries.get(key_for(path))
+            if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                result[path] = int(entry[2], 16)
+            else:
+                stale.append((path, st))
+        if stale:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for (path, st), h in zip(stale, pool.map(phash, [str(p) for p, _ in stale])):
+                    if h is None:
+                        print(f"Warning: could not read {path}")
+                        continue
+                    self.entries[key_for(path)] = [st.st_size, st.st_mtime_ns, f"{h:016x}"]
+                    result[path] = h
+        self.last_hashed = len(stale)
+        return result
+
+# ───────────────────────── Index ──────────────────────────────
+
+def _chunk_bounds(n_chunks):
+    """(shift, mask) per chunk, splitting 64 bits into `n_chunks` near-equal pieces."""
+    sizes = [64 // n_chunks + (i < 64 % n_chunks) for i in range(n_chunks)]
+    bounds, shift = [], 0
+    for size in sizes:
+        bounds.append((shift, (1 << size) - 1))
+        shift += size
+    return bounds
+
+
+class HashIndex:
+    """Multi-index hashing over 64-bit hashes, exact for Hamming radius <= `radius`."""
+
+    def __init__(self, hashes, radius=RADIUS):
+        if not 0 <= radius < 64:
+            raise ValueError(f"radius must be in [0, 63], got {radius}")
+        self.radius = radius
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        # --- per chunk: item order sorted by chunk value, plus the bucket boundaries in that order ---
+        self.tables = []
+        for shift, mask in _chunk_bounds(radius + 1):
+            values = (self.hashes >> np.uint64(shift)) & np.uint64(mask)
+            order = np.argsort(values, kind="stable")
+            keys, starts = np.unique(values[order], return_index=True)
+            self.tables.append((shift, mask, order, keys, np.append(starts, len(order))))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def query(self, h, radius=None):
+        """Indices of the hashes within `radius` (<= the index radius) bits of `h`."""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        found = []
+        for shift, mask, order, keys, bounds in self.tables:
+            i = np.searchsorted(keys, (h >> shift) & mask)
+            if i < len(keys) and keys[i] == (h >> shift) & mask:
+                found.append(order[bounds[i]:bounds[i + 1]])
+        if not found:
+            return np.zeros(0, np.int64)
+        candidates = np.unique(np.concatenate(found))
+        close = _popcount(self.hashes[candidates] ^ np.uint64(h)) <= radius
+        return candidates[close]
+
+    def pairs(self, radius=None):
+        """(K, 2) array of index pairs i < j whose hashes are within `radius` bits of each other."""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        found = []
+        for _, _, order, _, bounds in self.tables:
+            sizes = np.diff(bounds)
+            for b in np.flatnonzero(sizes > 1):
+                members = np.sort(order[bounds[b]:bounds[b + 1]])
+                found.extend(_close_pairs(self.hashes, members, radius))
+        if not found:
+            return np.zeros((0, 2), np.int64)
+        # --- a pair sharing several chunks is found once per chunk ---
+        return np.unique(np.concatenate(found), axis=0)
+
+
+def _close_pairs(hashes, members, radius):
+    """Close pairs within one bucket, compared block by block to bound memory on huge buckets."""
+    out = []
+    h = hashes[members]
+    for start in range(0, len(members), BLOCK):
+        block = h[start:start + BLOCK]
+        dist = _popcount(block[:, None] ^ h[None, start:])
+        i, j = np.nonzero(dist <= radius)
+        keep = j > i  # --- columns start at `start`, so j > i means a later member ---
+        if keep.any():
+            out.append(np.stack([members[start + i[keep]], members[start + j[keep]]], axis=1))
+    return out
+
+# ───────────────────────── Groups ─────────────────────────────
+
+def clusters(n, pairs):
+    """Union-find over `pairs` -> list of index groups (size > 1), largest first."""
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs.tolist():
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+
+def near_duplicate_groups(paths, radius=RADIUS, cache=None, save=True):
+    """Every path in `paths`, grouped: near-duplicates share a group, other images are singletons.
+
+    Unreadable images come back as singletons too, so callers never lose a file.
+    """
+    paths = list(paths)
+    cache = cache or HashCache()
+    hashes = cache.hashes(paths)
+    if save:
+        cache.save()
+    hashed = [p for p in paths if p in hashes]
+    index = HashIndex([hashes[p] for p in hashed], radius)
+    grouped = [[hashed[i] for i in g] for g in clusters(len(hashed), index.pairs())]
+    in_group = {p for g in grouped for p in g}
+    return grouped + [[p] for p in paths if p not in in_group]
+
+
+def split_groups(groups, fractions, rng):
+    """Shuffle `groups` and assign whole groups to len(fractions) splits by image count; returns path lists."""
+    groups = list(groups)
+    rng.shuffle(groups)
+    total = sum(len(g) for g in groups)
+    targets = [f * total for f in fractions]
+    splits = [[] for _ in fractions]
+    for group in groups:
+        # --- the split furthest below its target takes the whole group ---
+        k = max(range(len(splits)), key=lambda s: targets[s] - len(splits[s]))
+        splits[k].extend(group)
+    return splits
+
+
+def report(groups, radius):
+    """Dedupe / cluster report dict (JSON-serialisable) for the output of near_duplicate_groups."""
+    dupes = [[key_for(p) for p in g] for g in groups if len(g) > 1]
+    return {
+        "radius": radius,
+        "images": sum(len(g) for g in groups),
+        "groups": len(dupes),
+        "redundant": sum(len(g) - 1 for g in dupes),
+        "clusters": dupes,
+    }
+
+
+def print_report(stats, limit=10):
+    print(f"{stats['images']} images, {stats['groups']} near-duplicate group(s) within {stats['radius']} bits "
+          f"({stats['redundant']} redundant frames)")
+    for group in stats["clusters"][:limit]:
+        shown = ", ".join(group[:5]) + (f" ... (+{len(group) - 5})" if len(group) > 5 else "")
+        print(f"  - {len(group):>4}: {shown}")
+    if len(stats["clusters"]) > limit:
+        print(f"  ... and {len(stats['clusters']) - limit} more")
+
+
+def image_paths(roots):
+    """All images under each root (recursively), sorted per root."""
+    paths = []
+    for root in roots:
+        found = []
+        for dirpath, _, filenames in os.walk(root):
+            found.extend(os.path.join(dirpath, n) for n in filenames if os.path.splitext(n)[1].lower() in IMAGE_EXTS)
+        paths.extend(sorted(found))
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate images with a perceptual-hash index.")
+    parser.add_argument("roots", nargs="*", default=[IMAGES_ROOT])
+    parser.add_argument("--radius", type=int, default=RADIUS, help="max differing hash bits (of 64)")
+    parser.add_argument("--json", default=None, help="also write the cluster report here")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    paths = image_paths(args.roots)
+    cache = HashCache()
+    groups = near_duplicate_groups(paths, args.radius, cache)
+    stats = report(groups, args.radius)
+    print_report(stats)
+    print(f"\n{len(paths)} images, {cache.last_hashed} hashed, {time.perf_counter() - t0:.2f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import os
-import shutil
 import random
 from math import ceil
+from file_ops import print_summary, scan_dir, transfer
+from manifest import Manifest, drop_duplicates
+from near_duplicates import RADIUS, near_duplicate_groups, split_groups
 
 
 
-def split_images_into_folders(source_folder, dest_base_folder, num_folders=6):
+def split_images_into_folders(source_folder, dest_base_folder, num_folders=6, mode="auto", conflict="overwrite",
+                              near_dup_radius=RADIUS):
     """
     Split images from source_folder into num_folders equal folders.
     
@@ -13,43 +16,37 @@ def split_images_into_folders(source_folder, dest_base_folder, num_folders=6):
     - source_folder: Path to the folder containing images
     - dest_base_folder: Base path where to create the destination folders
     - num_folders: Number of equal folders to create (default: 6)
+    - mode: "auto" (reflink / hardlink when possible, else copy) or "copy"
+    - conflict: policy for files already in a destination folder ("overwrite", "skip", "rename", "error")
+    - near_dup_radius: perceptual-hash bits; near-identical frames are kept in the same folder
     """
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']
-    image_files = []
-    
-    for file in os.listdir(source_folder):
-        file_path = os.path.join(source_folder, file)
-        if os.path.isfile(file_path):
-            file_ext = os.path.splitext(file)[1].lower()
-            if file_ext in image_extensions:
-                image_files.append(file)
-        random.shuffle(image_files)
-    
-    # Calculate how many images per folder
-    total_images = len(image_files)
-    images_per_folder = ceil(total_images / num_folders)
-    
-    print(f"Found {total_images} images. Will distribute ~{images_per_folder} images per folder.")
+    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
+    manifest = Manifest()
+    image_paths = drop_duplicates(manifest, sorted(scan_dir(source_folder, image_extensions).values()))
+    # --- whole near-duplicate groups go to one folder, sized by image count ---
+    groups = near_duplicate_groups(image_paths, near_dup_radius)
+    folders = split_groups(groups, [1 / num_folders] * num_folders, random)
+
+    total_images = len(image_paths)
+    print(f"Found {total_images} images in {len(groups)} near-duplicate groups. "
+          f"Will distribute ~{ceil(total_images / num_folders)} images per folder.")
     
-    # Create destination folders if they don't exist
-    dest_folders = []
-    for i in range(1, num_folders + 1):
-        folder_name = os.path.join(dest_base_folder, f"folder_{i}")
-        if not os.path.exists(folder_name):
-            os.makedirs(folder_name)
-        dest_folders.append(folder_name)
+    # Destination folders are created by transfer()
+    dest_folders = [os.path.join(dest_base_folder, f"folder_{i}") for i in range(1, num_folders + 1)]
     
-    # Distribute files to folders
-    for i, image_file in enumerate(image_files):
-        folder_index = min(i // images_per_folder, num_folders - 1)
-        source_path = os.path.join(source_folder, image_file)
-        dest_path = os.path.join(dest_folders[folder_index], image_file)
-        shutil.copy2(source_path, dest_path)
+    # Distribute files to folders (linked when the filesystem allows it, in parallel)
+    pairs = []
+    counts = [len(paths) for paths in folders]
+    for folder_index, paths in enumerate(folders):
+        for path in paths:
+            pairs.append((path, os.path.join(dest_folders[folder_index], os.path.basename(path))))
+    stats = transfer(pairs, mode=mode, conflict=conflict, label="Copied", manifest=manifest)
+    manifest.save()
+    print_summary(stats, "Copied", dest_base_folder)
         
     # Print summary
-    for i, folder in enumerate(dest_folders, 1):
-        folder_files = os.listdir(folder)
-        print(f"Folder {i}: {len(folder_files)} images")
+    for i, count in enumerate(counts, 1):
+        print(f"Folder {i}: {count} images")
 
 if __name__ == "__main__":
     # Set your source and destination folders here
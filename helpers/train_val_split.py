@@ -1,44 +1,52 @@
 import os
-import shutil
 import random
 from pathlib import Path
+from file_ops import print_summary, scan_dir, transfer
+from manifest import Manifest, drop_duplicates
+from near_duplicates import near_duplicate_groups, split_groups
 
 # === CONFIG ===
 base_dir = Path("data")
 image_exts = [".jpg", ".jpeg", ".png"]
 val_ratio = 0.2
+link_mode = "auto"        # reflink / hardlink when the filesystem allows it, else copy
+conflict = "overwrite"    # for files already in the split folders: overwrite, skip, rename or error
+near_dup_radius = 6       # perceptual-hash bits; frames this close always land in the same split
 
 # Step 1: Flatten the folder
 images_src = base_dir / "images/folder_2"
 labels_src = base_dir / "labels/folder_2"
 
-all_images = [f for f in images_src.iterdir() if f.suffix.lower() in image_exts]
-random.shuffle(all_images)
+manifest = Manifest()
+# --- identical images would otherwise be able to land in both train and val ---
+all_images = [Path(p) for p in drop_duplicates(manifest, sorted(scan_dir(images_src, image_exts).values()))]
+label_index = scan_dir(labels_src)  # one scandir pass instead of an exists() check per image
+# --- bursts of near-identical frames are shuffled and split as one unit, so they can't leak into val ---
+groups = near_duplicate_groups([str(p) for p in all_images], near_dup_radius)
+print(f"{len(all_images)} images in {len(groups)} near-duplicate groups")
 
 # Step 2: Create YOLO-style structure
 for split in ["train", "val"]:
     os.makedirs(base_dir / f"images/{split}", exist_ok=True)
     os.makedirs(base_dir / f"labels/{split}", exist_ok=True)
 
-split_index = int(len(all_images) * (1 - val_ratio))
-train_imgs = all_images[:split_index]
-val_imgs = all_images[split_index:]
+train_imgs, val_imgs = ([Path(p) for p in split] for split in split_groups(groups, [1 - val_ratio, val_ratio], random))
 
-# Step 3: Move files
-def move_files(images, split):
+# Step 3: Copy files (in parallel)
+def split_pairs(images, split):
+    pairs = []
     for img_path in images:
         name = img_path.stem
-        label_path = labels_src / f"{name}.txt"
 
         # Destination paths
-        img_dst = base_dir / f"images/{split}" / img_path.name
-        label_dst = base_dir / f"labels/{split}" / f"{name}.txt"
-
-        shutil.copy(img_path, img_dst)
-        if label_path.exists():
-            shutil.copy(label_path, label_dst)
-
-move_files(train_imgs, "train")
-move_files(val_imgs, "val")
+        pairs.append((img_path, base_dir / f"images/{split}" / img_path.name))
+        if f"{name}.txt" in label_index:
+            pairs.append((label_index[f"{name}.txt"], base_dir / f"labels/{split}" / f"{name}.txt"))
+    return pairs
+
+stats = transfer(split_pairs(train_imgs, "train") + split_pairs(val_imgs, "val"), mode=link_mode, conflict=conflict,
+                 label="Copied", manifest=manifest)
+manifest.save()
+print_summary(stats, "Copied", base_dir)
 
 print("✅ Dataset split into train and val.")
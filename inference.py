@@ -1,25 +1,303 @@
-from ultralytics import YOLO
+"""
+Image inference: a single image, or streaming batches over folders / list files
+================================================================================
+With no arguments this runs the trained model on one sample image, prints the
+detections and saves `result.jpg`, as before.
 
-# Load your trained model
-model = YOLO('runs\\detect\\train7\\weights\\best.pt')  # replace with your model path
+Given sources it runs in batch mode:
 
-# Perform prediction on an image
-results = model('data\\images\\val\\GMU.1-3-2022-1646079386795.jpg')  # replace with your image path
+    python inference.py data/val.txt --out detections.jsonl
+    python inference.py data/images/val --format coco --coco-gt instances_val.json --out results.json
+    python inference.py data/images/val --save-dir annotated
 
-# Process results
-for result in results:
-    boxes = result.boxes  # Bounding boxes
-    
-    # Print detection results
-    for box in boxes:
-        # Get box coordinates
-        x1, y1, x2, y2 = box.xyxy[0]  # get box coordinates in (x1, y1, x2, y2) format
-        conf = box.conf[0]  # confidence score
-        cls = int(box.cls[0])  # class id
-        
-        print(f"Detected {model.names[cls]} with confidence {conf:.2f} at location {x1:.2f}, {y1:.2f}, {x2:.2f}, {y2:.2f}")
-
-# Optionally save results with bounding boxes
-result_image = results[0].plot()  # plot a BGR numpy array of predictions
+Sources can be image files, directories (scanned for images) or `.txt` list
+files with one image path per line (like `data/val.txt`). Paths are streamed,
+decoded on a pool of worker threads, fed to the model in fixed-size batches
+and the detections are written as each batch finishes, so memory stays flat
+however many images there are.
+
+COCO results need the annotation file's integer image ids and category ids:
+with `--coco-gt` images are matched by file name and classes by category
+name. Without it, images are numbered 1.. in the order they are written
+(listed in `<out>.images.json`) and category ids are the class index plus
+`--category-offset` (1 by default, like COCO).
+
+`--tile full` adds sliced inference for small objects in large stills and
+`--tile adaptive` only slices where the full-frame pass was unsure (see
+tiling.py).
+"""
+
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
 import cv2
-cv2.imwrite('result.jpg', result_image)  # save the result image
\ No newline at end of file
+from detections import box_arrays, result_records
+from model_loader import BACKENDS, DEFAULT_BACKEND, load_model
+from tiling import TILE_OVERLAP, TILE_SIZE, TiledModel
+
+# ───────────────────────── Constants ──────────────────────────
+DEFAULT_WEIGHTS = Path("runs/detect/train7/weights/best.pt")
+DEFAULT_IMAGE   = Path("data/images/val/GMU.1-3-2022-1646079386795.jpg")
+DEFAULT_OUTPUT  = Path("result.jpg")
+IMAGE_EXTS      = {".jpg", ".jpeg", ".png", ".bmp"}
+BATCH_SIZE      = 8      # images per model.predict call
+DECODE_WORKERS  = 4      # threads decoding images ahead of the model
+IMG_SIZE        = 640
+CONF_THRESHOLD  = 0.25
+
+# ───────────────────────── Single image ───────────────────────
+
+def predict_single(model, image_path, output_path=DEFAULT_OUTPUT, timings=None, **predict_kwargs):
+    """Detect, print and optionally save one image; returns its result.
+
+    If given, `timings` is filled with the seconds spent on "decode",
+    "predict", "draw" and "encode" (the last two only when saving).
+    """
+    timings = {} if timings is None else timings
+    t0 = time.perf_counter()
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise FileNotFoundError(f"could not read {image_path}")
+    t1 = time.perf_counter()
+    # Perform prediction on an image
+    results = model(image, **predict_kwargs)
+    timings["decode"], timings["predict"] = t1 - t0, time.perf_counter() - t1
+
+    # Print detection results
+    for det in result_records(results[0], model.names):
+        x1, y1, x2, y2 = det["bbox"]
+        print(f"Detected {det['class']} with confidence {det['conf']:.2f} at location {x1:.2f}, {y1:.2f}, {x2:.2f}, {y2:.2f}")
+
+    # Optionally save results with bounding boxes
+    if output_path:
+        t0 = time.perf_counter()
+        annotated = results[0].plot()  # plot a BGR numpy array of predictions
+        t1 = time.perf_counter()
+        cv2.imwrite(str(output_path), annotated)
+        timings["draw"], timings["encode"] = t1 - t0, time.perf_counter() - t1
+    return results[0]
+
+# ───────────────────────── Batch mode ─────────────────────────
+
+def iter_image_paths(sources):
+    """Yield image paths from files, directories and .txt list files, lazily and in order."""
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            with os.scandir(source) as entries:
+                names = sorted(e.name for e in entries if e.is_file() and Path(e.name).suffix.lower() in IMAGE_EXTS)
+            for name in names:
+                yield source / name
+        elif source.suffix.lower() == ".txt":
+            with open(source) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield Path(line.replace("\\", "/"))
+        else:
+            yield source
+
+
+def iter_decoded(paths, workers=DECODE_WORKERS, prefetch=None):
+    """Decode images on a thread pool, keeping at most `prefetch` in flight; yields (path, image|None) in order."""
+    prefetch = prefetch or workers * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path in paths:
+            pending.append((path, pool.submit(cv2.imread, str(path))))
+            if len(pending) >= prefetch:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+
+def iter_batches(decoded, batch_size=BATCH_SIZE):
+    """Group decoded images into lists of (path, image); unreadable images are reported and skipped."""
+    batch = []
+    for path, image in decoded:
+        if image is None:
+            print(f"Warning: could not read {path}")
+            continue
+        batch.append((path, image))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class JsonlWriter:
+    """One JSON object per image: {"image": path, "detections": [...]}."""
+
+    def __init__(self, path, names):
+        self.f = open(path, "w")
+        self.names = names
+
+    def write(self, image_path, result):
+        record = {"image": str(image_path), "detections": result_records(result, self.names)}
+        self.f.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+def coco_ids(annotation_path, names):
+    """({file name: image id}, {class index: category id}) from a COCO annotation file.
+
+    Images are keyed by their `file_name` (see CocoWriter for how paths are
+    matched to it); classes are matched to categories by name.
+    """
+    gt = json.loads(Path(annotation_path).read_text())
+    image_ids = {Path(image["file_name"]).as_posix(): image["id"] for image in gt.get("images", [])}
+    by_name = {c["name"]: c["id"] for c in gt.get("categories", [])}
+    names = dict(enumerate(names)) if isinstance(names, (list, tuple)) else names
+    category_ids = {cls: by_name[name] for cls, name in names.items() if name in by_name}
+    missing = sorted(name for name in names.values() if name not in by_name)
+    if missing:
+        print(f"Warning: no category in {annotation_path} for {', '.join(missing)}; those detections are skipped")
+    return image_ids, category_ids
+
+
+class CocoWriter:
+    """COCO results format: a JSON array of {image_id, category_id, bbox[x, y, w, h], score}, streamed.
+
+    `image_ids` maps file names to the annotation file's ids; without it images
+    are numbered from 1 and the numbering is written to `<path>.images.json`.
+    `category_ids` maps class indices; without it they are offset by `category_offset`.
+    """
+
+    def __init__(self, path, names, image_ids=None, category_ids=None, category_offset=1):
+        self.f = open(path, "w")
+        self.f.write("[")
+        self.first = True
+        self.image_ids = image_ids
+        self.category_ids = category_ids
+        self.category_offset = category_offset
+        self.assigned = []  # --- {id, file_name} of numbered images, when there is no annotation file ---
+        self.index_path = Path(f"{path}.images.json")
+
+    def _image_id(self, image_path):
+        if self.image_ids is None:
+            self.assigned.append({"id": len(self.assigned) + 1, "file_name": str(image_path)})
+            return len(self.assigned)
+        # --- longest trailing part of the path that is a file_name: a/x.jpg and b/x.jpg stay apart ---
+        parts = Path(image_path).parts
+        image_id = next((self.image_ids[k] for k in (Path(*parts[i:]).as_posix() for i in range(len(parts)))
+                         if k in self.image_ids), None)
+        if image_id is None:
+            print(f"Warning: {image_path} is not in the annotation file; its detections are skipped")
+        return image_id
+
+    def write(self, image_path, result):
+        image_id = self._image_id(image_path)
+        if image_id is None:
+            return
+        xyxy, conf, cls = box_arrays(result)
+        for (x1, y1, x2, y2), score, cat in zip(xyxy.tolist(), conf.tolist(), cls.tolist()):
+            category_id = cat + self.category_offset if self.category_ids is None else self.category_ids.get(cat)
+            if category_id is None:
+                continue
+            item = {"image_id": image_id, "category_id": category_id,
+                    "bbox": [round(x1, 1), round(y1, 1), round(x2 - x1, 1), round(y2 - y1, 1)],
+                    "score": round(score, 4)}
+            self.f.write(("" if self.first else ",\n") + json.dumps(item))
+            self.first = False
+
+    def close(self):
+        self.f.write("]\n")
+        self.f.close()
+        if self.image_ids is None:
+            self.index_path.write_text(json.dumps(self.assigned))
+
+
+def save_path_for(image_path, save_dir, used):
+    """Annotated-image path in `save_dir`; a name already used this run gets a short hash of the full path."""
+    name = Path(image_path).name
+    if name in used:
+        digest = hashlib.blake2b(str(image_path).encode(), digest_size=4).hexdigest()
+        name = f"{Path(name).stem}_{digest}{Path(name).suffix}"
+    used.add(name)
+    return os.path.join(save_dir, name)
+
+
+WRITERS = {"jsonl": JsonlWriter, "coco": CocoWriter}
+
+
+def run_batch(model, sources, out_path, fmt="jsonl", batch_size=BATCH_SIZE, workers=DECODE_WORKERS,
+              save_dir=None, imgsz=IMG_SIZE, conf=CONF_THRESHOLD, writer_kwargs=None):
+    """Stream every image in `sources` through the model; returns the number of images processed."""
+    saved_names = set()
+    if save_dir:
+        os.makedirs(save_dir, exist_ok=True)
+    writer = WRITERS[fmt](out_path, model.names, **(writer_kwargs or {}))
+    count = 0
+    start = time.perf_counter()
+    try:
+        for n_batches, batch in enumerate(iter_batches(iter_decoded(iter_image_paths(sources), workers), batch_size), 1):
+            paths = [p for p, _ in batch]
+            results = model.predict([img for _, img in batch], imgsz=imgsz, conf=conf, verbose=False)
+            for path, result in zip(paths, results):
+                writer.write(path, result)
+                if save_dir:
+                    cv2.imwrite(save_path_for(path, save_dir, saved_names), result.plot())
+            count += len(batch)
+            if n_batches % 25 == 0:
+                print(f"Progress: {count} images ({count / (time.perf_counter() - start):.1f} img/s)")
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"Done: {count} images in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} img/s) -> {out_path}")
+    return count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the YOLO model over images, folders or list files.")
+    parser.add_argument("sources", nargs="*", help="image files, directories or .txt list files")
+    parser.add_argument("--weights", default=str(DEFAULT_WEIGHTS))
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--out", default="detections.jsonl", help="detections output file")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="jsonl")
+    parser.add_argument("--coco-gt", default=None, help="COCO annotation file supplying image and category ids")
+    parser.add_argument("--category-offset", type=int, default=1,
+                        help="without --coco-gt: category_id = class index + this")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DECODE_WORKERS)
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--conf", type=float, default=CONF_THRESHOLD)
+    parser.add_argument("--save-dir", default=None, help="also write annotated images here (slower)")
+    parser.add_argument("--tile", choices=("full", "adaptive"), default=None,
+                        help="sliced inference: every tile, or only tiles around low-confidence candidates")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--tile-overlap", type=float, default=TILE_OVERLAP)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Load your trained model
+    model = load_model(args.weights, args.backend, args.imgsz)
+    if args.tile:
+        model = TiledModel(model, args.tile_size, args.tile_overlap, adaptive=args.tile == "adaptive")
+    if not args.sources:
+        predict_single(model, DEFAULT_IMAGE, imgsz=args.imgsz, conf=args.conf)
+    else:
+        writer_kwargs = None
+        if args.format == "coco":
+            writer_kwargs = {"category_offset": args.category_offset}
+            if args.coco_gt:
+                writer_kwargs["image_ids"], writer_kwargs["category_ids"] = coco_ids(args.coco_gt, model.names)
+        run_batch(model, args.sources, args.out, args.format, args.batch, args.workers,
+                  args.save_dir, args.imgsz, args.conf, writer_kwargs)
+    if args.tile:
+        print(model.cost_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,80 @@
 """
-YOLOv8 video inference script (constants only)
-============================================
-Takes an input MP4, runs inference frame‑by‑frame with a trained Ultralytics
-YOLO model, draws the predictions, and writes an annotated MP4.
+Video inference: annotated MP4s, bulk runs and detections-only track files
+==========================================================================
+Runs a trained Ultralytics YOLO model over videos. With no arguments it
+annotates SOURCE_VIDEO into OUTPUT_VIDEO using the constants below
+(pipelined decode / infer / encode, BATCH_SIZE frames per predict call,
+optional detect-every-k tracking) and prints per-stage timings:
 
-All configuration is hard‑coded below so you can just `python yolo_video_inference.py`
-without any arguments.
+    python inference_mp4.py
+    python inference_mp4.py --backend onnx         # exported ONNX Runtime model (see model_loader)
+
+`--bulk` annotates every video in a directory or glob on a process pool;
+each worker loads the model once and runs with a bounded thread count
+(whatever the backend). Outputs mirror the source layout under `--out-dir`
+and videos whose output already exists are skipped, so an interrupted run
+can simply be restarted:
+
+    python inference_mp4.py --bulk "incoming/**/*.mp4" --out-dir annotated --workers 4
+
+`--detections-only` skips drawing and encoding and writes a compact track
+file instead (see track_file.py); `--render` draws one onto its source
+video later, without the model:
+
+    python inference_mp4.py --detections-only --track test.trk
+    python inference_mp4.py --render --track test.trk --classes person
+
+From Python, `annotate_video(model, path)` returns (output_path, frames);
+pass `timings={}` to also get the seconds spent per stage.
 """
 
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import multiprocessing
+import os
 from pathlib import Path
+import queue
+import threading
+import time
 import cv2
-from ultralytics import YOLO
+import numpy as np
+from detections import box_arrays
+from tracking import SparseDetector, match_quality
+from model_loader import BACKENDS, DEFAULT_BACKEND, load_model
+from track_file import TrackReader, TrackWriter
 
 # ───────────────────────── Constants ──────────────────────────
 MODEL_WEIGHTS = Path("best.pt")  # path to .pt file
+MODEL_BACKEND = DEFAULT_BACKEND  # "torch", "onnx" or "openvino" (see model_loader)
 SOURCE_VIDEO  = Path("VIDEO_FOR_DEMO.MP4")              # input video
 OUTPUT_VIDEO  = Path("test.mp4")    # output video
+OUTPUT_TRACK  = Path("test.trk")    # detections-only output (see track_file)
 IMG_SIZE      = 640                                           # inference image size
 CONF_THRESHOLD = 0.20                                        # confidence threshold
+QUEUE_SIZE    = 8                                             # max frames buffered between pipeline stages
+BATCH_SIZE    = 4                                             # frames per model.predict call
+BENCH_BATCH_SIZES = (1, 2, 4, 8)                              # batch sizes compared by compare_batch_sizes
+BENCH_FRAMES  = 64                                            # frames of SOURCE_VIDEO used for the comparison
+RUN_BATCH_BENCHMARK = False                                   # print the batch-size comparison before annotating
+DETECT_EVERY  = 1                                             # >1: detect every k-th frame, track in between
+BENCH_DETECT_EVERY = (1, 3, 5, 10)                            # k values compared by compare_detect_every
+RUN_TRACKING_BENCHMARK = False                                # print the detect-every-k comparison before annotating
+VIDEO_EXTS    = {".mp4", ".mov", ".avi", ".mkv"}                # picked up when --bulk is given a directory
+BULK_OUT_DIR  = Path("annotated")                             # where bulk mode writes <stem>_annotated.mp4
+BULK_WORKERS  = max(1, (os.cpu_count() or 1) // 4)            # videos annotated in parallel
 
 # ───────────────────────── Helpers ────────────────────────────
 
 def draw_boxes(frame, results, names):
     """Draw bounding boxes and labels on a frame."""
-    for box in results.boxes:
-        x1, y1, x2, y2 = map(int, box.xyxy[0])
-        conf = float(box.conf[0])
-        cls = int(box.cls[0])
-        if conf < CONF_THRESHOLD:
-            continue
+    return draw_arrays(frame, *box_arrays(results), names)
+
+
+def draw_arrays(frame, xyxy, confs, classes, names):
+    """draw_boxes for plain (xyxy, conf, cls) arrays, e.g. one frame of a track file."""
+    keep = confs >= CONF_THRESHOLD
+    for (x1, y1, x2, y2), conf, cls in zip(xyxy[keep].astype(int).tolist(), confs[keep].tolist(), classes[keep].tolist()):
         label = f"{names[cls]} {conf:.2f}"
         color = (0, 255, 0)
         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
@@ -38,10 +84,174 @@ def draw_boxes(frame, results, names):
     return frame
 
 
-def annotate_video(model, input_path, output_path = OUTPUT_VIDEO):
+_END = object()  # end-of-stream marker passed down the pipeline
+
+
+def _new_timings():
+    return {"decode": 0.0, "infer": 0.0, "encode": 0.0, "wall": 0.0}
+
+
+def _put(q, item, stop):
+    """Blocking put that gives up once the pipeline is being torn down."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    """Blocking get that returns _END once the pipeline is being torn down."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def _predict_batch(model, frames, imgsz=IMG_SIZE):
+    """Run one predict call over a list of frames; returns one result per frame, in order."""
+    results = model.predict(list(frames), imgsz=imgsz, conf=CONF_THRESHOLD, verbose=False)
+    return list(results)
+
+
+def _decode_stage(cap, frames_q, timings, stop, errors):
+    try:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            timings["decode"] += time.perf_counter() - t0
+            if not ret:
+                break
+            if not _put(frames_q, frame, stop):
+                return
+    except Exception as exc:
+        errors.append(exc)
+        stop.set()
+    _put(frames_q, _END, stop)
+
+
+def _make_infer_fn(model, detect_every, imgsz=IMG_SIZE):
+    """frames -> results callable: batched predict, or detect-every-k with tracking in between."""
+    if detect_every <= 1:
+        return lambda frames: _predict_batch(model, frames, imgsz)
+    sparse = SparseDetector(lambda frame: _predict_batch(model, [frame], imgsz)[0], model.names, every=detect_every)
+    return lambda frames: [sparse(frame) for frame in frames]
+
+
+def _infer_stage(infer_fn, frames_q, results_q, timings, stop, errors, batch_size):
+    try:
+        ended = False
+        while not ended:
+            # --- block for the first frame, then fill the batch; a short final batch is fine ---
+            batch = []
+            while len(batch) < batch_size:
+                frame = _get(frames_q, stop)
+                if frame is _END:
+                    ended = True
+                    break
+                batch.append(frame)
+            if not batch:
+                break
+            t0 = time.perf_counter()
+            results = infer_fn(batch)
+            timings["infer"] += time.perf_counter() - t0
+            for frame, result in zip(batch, results):
+                if not _put(results_q, (frame, result), stop):
+                    return
+    except Exception as exc:
+        errors.append(exc)
+        stop.set()
+    _put(results_q, _END, stop)
+
+
+def _run_sequential(infer_fn, cap, sink, timings, batch_size):
+    frame_idx = 0
+    ended = False
+    while not ended:
+        t0 = time.perf_counter()
+        batch = []
+        while len(batch) < batch_size:
+            ret, frame = cap.read()
+            if not ret:
+                ended = True
+                break
+            batch.append(frame)
+        t1 = time.perf_counter()
+        timings["decode"] += t1 - t0
+        if not batch:
+            break
+        results = infer_fn(batch)
+        t2 = time.perf_counter()
+        timings["infer"] += t2 - t1
+        for i, (frame, result) in enumerate(zip(batch, results), frame_idx):
+            sink(i, frame, result)
+        timings["encode"] += time.perf_counter() - t2
+        frame_idx += len(batch)
+    return frame_idx
+
+
+def _run_pipelined(infer_fn, cap, sink, timings, queue_size, batch_size):
+    """Decode, inference and the sink (draw+encode, or a track file append) on their own threads.
+
+    Stages are joined by bounded FIFO queues, so a slow stage blocks the one
+    feeding it (back-pressure) and frames reach the sink in decode order.
+    The sink runs on the calling thread.
+    """
+    frames_q = queue.Queue(maxsize=queue_size)
+    results_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    workers = [
+        threading.Thread(target=_decode_stage, args=(cap, frames_q, timings, stop, errors), daemon=True),
+        threading.Thread(target=_infer_stage, args=(infer_fn, frames_q, results_q, timings, stop, errors, batch_size), daemon=True),
+    ]
+    for w in workers:
+        w.start()
+
+    frame_idx = 0
+    try:
+        while True:
+            item = _get(results_q, stop)
+            if item is _END:
+                break
+            frame, result = item
+            t0 = time.perf_counter()
+            sink(frame_idx, frame, result)
+            timings["encode"] += time.perf_counter() - t0
+            frame_idx += 1
+    finally:
+        stop.set()
+        for w in workers:
+            w.join()
+
+    if errors:
+        raise errors[0]
+    return frame_idx
+
+
+def annotate_video(model, input_path, output_path = OUTPUT_VIDEO, pipelined=False, queue_size=QUEUE_SIZE,
+                   batch_size=1, detect_every=1, imgsz=IMG_SIZE, timings=None):
+    """Annotate a video and return (output_path, frames).
+
+    If a `timings` dict is passed, it receives the seconds spent in each
+    stage ("decode", "infer", "encode") plus the total "wall" time. With `pipelined=True` the stages run
+    concurrently, so the slowest stage bounds throughput instead of their sum.
+    `batch_size` groups that many frames into each predict call.
+    `detect_every` > 1 runs the detector on every k-th frame only and tracks
+    boxes with optical flow in between (see tracking.SparseDetector).
+    """
+    batch_size = max(1, int(batch_size))
     names = model.names
+    infer_fn = _make_infer_fn(model, detect_every, imgsz)
+    timings = _new_timings() if timings is None else timings
+    timings.update(_new_timings())
 
-    cap = cv2.VideoCapture(str(SOURCE_VIDEO))
+    cap = cv2.VideoCapture(str(input_path))
     if not cap.isOpened():
         return output_path, 0
 
@@ -50,31 +260,334 @@ def annotate_video(model, input_path, output_path = OUTPUT_VIDEO):
     fps    = cap.get(cv2.CAP_PROP_FPS)
 
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(str(OUTPUT_VIDEO), fourcc, fps, (width, height))
+    out = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+
+    def sink(frame_idx, frame, result):
+        out.write(draw_boxes(frame, result, names))
+
+    start = time.perf_counter()
+    try:
+        frame_idx = _run(infer_fn, cap, sink, timings, pipelined, queue_size, batch_size)
+    finally:
+        cap.release()
+        out.release()
+    timings["wall"] = time.perf_counter() - start
+    return output_path, frame_idx
+
+
+def _run(infer_fn, cap, sink, timings, pipelined, queue_size, batch_size):
+    if pipelined:
+        return _run_pipelined(infer_fn, cap, sink, timings, queue_size, batch_size)
+    return _run_sequential(infer_fn, cap, sink, timings, batch_size)
+
+# ───────────────────────── Track files ────────────────────────
+
+def detect_video(model, input_path, track_path=OUTPUT_TRACK, pipelined=True, queue_size=QUEUE_SIZE,
+                 batch_size=1, detect_every=1, imgsz=IMG_SIZE, append=False):
+    """Detections-only run: no drawing or encoding, every frame's boxes go to a track file.
+
+    Returns (track_path, frames, timings); "encode" in timings is the time
+    spent appending records. Render the annotated video later, if ever,
+    with `render_track`.
+    """
+    batch_size = max(1, int(batch_size))
+    infer_fn = _make_infer_fn(model, detect_every, imgsz)
+    timings = _new_timings()
+
+    cap = cv2.VideoCapture(str(input_path))
+    if not cap.isOpened():
+        return track_path, 0, timings
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
 
+    start = time.perf_counter()
+    with TrackWriter(track_path, model.names, cap.get(cv2.CAP_PROP_FPS), size, input_path, append=append) as writer:
+        offset = writer.frames  # --- appending: continue the frame numbering of the existing file ---
+        try:
+            frame_idx = _run(infer_fn, cap, lambda i, frame, result: writer.append(offset + i, result),
+                             timings, pipelined, queue_size, batch_size)
+        finally:
+            cap.release()
+    timings["wall"] = time.perf_counter() - start
+    return track_path, frame_idx, timings
+
+
+def render_track(track_path=OUTPUT_TRACK, input_path=None, output_path=OUTPUT_VIDEO, classes=None, min_conf=None):
+    """Draw a track file's detections onto its source video; returns (output_path, frames).
+
+    Only decode + draw + encode: no model. `classes` / `min_conf` limit which
+    detections are drawn.
+    """
+    reader = TrackReader(track_path)
+    input_path = input_path or reader.header["source"]
+    cap = cv2.VideoCapture(str(input_path))
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open source video {input_path}")
+    width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    out = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*"mp4v"), cap.get(cv2.CAP_PROP_FPS), (width, height))
+
+    rows = reader.query(classes=classes, min_conf=min_conf)
+    # --- records are in frame order: one searchsorted gives every frame's slice ---
+    bounds = np.searchsorted(rows["frame"], np.arange(reader.n_frames + 1))
+    xyxy = np.stack([rows[f] for f in ("x1", "y1", "x2", "y2")], axis=1).astype(np.float32)
+    confs, cls = rows["conf"].astype(np.float32), rows["cls"].astype(np.int64)
     frame_idx = 0
-    while True:
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_idx < reader.n_frames:
+                lo, hi = bounds[frame_idx], bounds[frame_idx + 1]
+                draw_arrays(frame, xyxy[lo:hi], confs[lo:hi], cls[lo:hi], reader.names)
+            out.write(frame)
+            frame_idx += 1
+    finally:
+        cap.release()
+        out.release()
+    return output_path, frame_idx
+
+
+def print_timings(frames, timings):
+    """Print per-stage cost and which stage limits throughput."""
+    if not frames:
+        return
+    stages = ("decode", "infer", "encode")
+    for stage in stages:
+        print(f"  {stage:<7} {timings[stage]:8.2f}s  ({1000 * timings[stage] / frames:6.1f} ms/frame)")
+    print(f"  wall    {timings['wall']:8.2f}s  ({frames / timings['wall']:.1f} FPS)")
+    print(f"  bottleneck: {max(stages, key=timings.get)}")
+
+
+def _read_frames(input_path, max_frames):
+    cap = cv2.VideoCapture(str(input_path))
+    frames = []
+    while len(frames) < max_frames:
         ret, frame = cap.read()
         if not ret:
             break
-        results = model.predict(frame, imgsz=IMG_SIZE, conf=CONF_THRESHOLD, verbose=False)
-        if results:
-            frame = draw_boxes(frame, results[0], names)
-        out.write(frame)
-        frame_idx += 1
-
+        frames.append(frame)
     cap.release()
-    out.release()
-    return output_path, frame_idx
+    return frames
+
+
+def compare_batch_sizes(model, input_path, batch_sizes=BENCH_BATCH_SIZES, max_frames=BENCH_FRAMES):
+    """Time inference alone over the first `max_frames` frames at each batch size.
+
+    Frames are decoded up front so only predict calls are measured. Returns
+    {batch_size: frames_per_second}.
+    """
+    frames = _read_frames(input_path, max_frames)
+    if not frames:
+        return {}
+
+    _predict_batch(model, frames[:1])  # warm-up, excluded from timings
+
+    throughput = {}
+    for bs in batch_sizes:
+        t0 = time.perf_counter()
+        for i in range(0, len(frames), bs):
+            _predict_batch(model, frames[i:i + bs])
+        elapsed = time.perf_counter() - t0
+        throughput[bs] = len(frames) / elapsed
+        print(f"batch {bs:>3}: {throughput[bs]:6.1f} FPS  ({1000 * elapsed / len(frames):6.1f} ms/frame)")
+    return throughput
+
+
+def compare_detect_every(model, input_path, ks=BENCH_DETECT_EVERY, max_frames=BENCH_FRAMES):
+    """Speedup vs accuracy drift of detect-every-k on a reference clip.
+
+    Per-frame detection (k=1) is the reference. For each k, reports the speedup
+    of inference+tracking over it, and how well the k-mode boxes match the
+    reference boxes (mean best IoU and recall at IoU 0.5, same class).
+    Returns {k: (speedup, mean_iou, recall)}.
+    """
+    frames = _read_frames(input_path, max_frames)
+    if not frames:
+        return {}
+
+    _predict_batch(model, frames[:1])  # warm-up, excluded from timings
+    t0 = time.perf_counter()
+    reference = [_predict_batch(model, [frame])[0] for frame in frames]
+    reference_time = time.perf_counter() - t0
+
+    report = {}
+    for k in ks:
+        infer_fn = _make_infer_fn(model, k)
+        t0 = time.perf_counter()
+        results = infer_fn(frames)
+        elapsed = time.perf_counter() - t0
+        quality = [match_quality(ref, res) for ref, res in zip(reference, results)]
+        mean_iou = sum(q[0] for q in quality) / len(quality)
+        recall = sum(q[1] for q in quality) / len(quality)
+        report[k] = (reference_time / elapsed, mean_iou, recall)
+        print(f"k={k:>3}: {report[k][0]:5.2f}x faster  mean IoU {mean_iou:.3f}  recall@0.5 {recall:.3f}")
+    return report
+
+# ───────────────────────── Bulk mode ──────────────────────────
+
+def iter_video_paths(source):
+    """Videos in a directory (sorted), or the sorted matches of a glob pattern."""
+    if os.path.isdir(source):
+        with os.scandir(source) as entries:
+            names = sorted(e.name for e in entries if e.is_file() and Path(e.name).suffix.lower() in VIDEO_EXTS)
+        return [Path(source) / name for name in names]
+    return [Path(p) for p in sorted(glob.glob(source, recursive=True))]
+
+
+def source_root(source):
+    """Directory the matches of `source` are relative to: the directory itself, or a glob's non-wildcard prefix."""
+    if os.path.isdir(source):
+        return Path(source)
+    parts = Path(source).parts
+    fixed = []
+    for part in parts:
+        if glob.has_magic(part):
+            break
+        fixed.append(part)
+    if len(fixed) == len(parts):  # --- a plain file path ---
+        fixed = fixed[:-1]
+    return Path(*fixed) if fixed else Path(".")
+
+
+def bulk_output_path(video, out_dir, root=None):
+    """out_dir mirrors the layout under `root`, so a/clip.mp4 and b/clip.mp4 don't share an output."""
+    video = Path(video)
+    rel = video.relative_to(root) if root is not None and video.is_relative_to(root) else Path(video.name)
+    return Path(out_dir) / rel.parent / f"{rel.stem}_annotated.mp4"
+
+
+_worker_model = None  # one model per pool process, loaded by _init_worker
+
+
+def _init_worker(weights, backend, imgsz, threads):
+    # --- bound intra-op threads before torch spins up its pools, so workers don't oversubscribe cores ---
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    global _worker_model
+    _worker_model = load_model(weights, backend, imgsz)
+    # --- ONNX Runtime / OpenVINO sessions size their own pools to the machine; this bounds them too ---
+    _worker_model.set_threads(threads)
+
+
+def _annotate_one(video, output, batch_size, detect_every, imgsz):
+    """Runs in a pool worker. Writes to a .part file first so an interrupted video is redone, not skipped."""
+    partial = output.with_name(output.stem + ".part.mp4")
+    try:
+        timings = {}
+        _, frames = annotate_video(_worker_model, video, partial, pipelined=True, batch_size=batch_size,
+                                   detect_every=detect_every, imgsz=imgsz, timings=timings)
+        if not frames:
+            partial.unlink(missing_ok=True)
+            return video, 0, 0.0, "no frames decoded"
+        os.replace(partial, output)
+        return video, frames, timings["wall"], None
+    except Exception as exc:
+        partial.unlink(missing_ok=True)
+        return video, 0, 0.0, repr(exc)
+
+
+def bulk_annotate(source, out_dir=BULK_OUT_DIR, workers=BULK_WORKERS, threads=None, weights=MODEL_WEIGHTS,
+                  backend=MODEL_BACKEND, batch_size=BATCH_SIZE, detect_every=DETECT_EVERY, imgsz=IMG_SIZE):
+    """Annotate every video matched by `source` on a process pool; returns (videos done, total frames)."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    videos = iter_video_paths(source)
+    root = source_root(source)
+    targets = [(v, bulk_output_path(v, out_dir, root)) for v in videos]
+    # --- e.g. clip.mp4 + clip.mov: two workers would share one .part file, or the second would be skipped ---
+    claimed = {}
+    for v, out in targets:
+        key = os.path.normcase(str(out))
+        if key in claimed:
+            raise ValueError(f"{claimed[key]} and {v} would both be written to {out}")
+        claimed[key] = v
+    todo = [(v, out) for v, out in targets if not out.exists()]
+    for _, out in todo:
+        out.parent.mkdir(parents=True, exist_ok=True)
+    print(f"{len(videos)} video(s) found, {len(videos) - len(todo)} already annotated, {len(todo)} to do")
+    if not todo:
+        return 0, 0
+
+    workers = max(1, min(workers, len(todo)))
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    print(f"{workers} worker(s) x {threads} thread(s)")
+
+    done = total_frames = 0
+    start = time.perf_counter()
+    # --- spawn: fresh interpreters, so torch's thread pools are created after the limit is set ---
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(str(weights), backend, imgsz, threads)) as pool:
+        futures = [pool.submit(_annotate_one, v, out, batch_size, detect_every, imgsz) for v, out in todo]
+        for future in as_completed(futures):
+            video, frames, wall, error = future.result()
+            if error:
+                print(f"  FAILED {video}: {error}")
+                continue
+            done += 1
+            total_frames += frames
+            elapsed = time.perf_counter() - start
+            print(f"  [{done}/{len(todo)}] {video}: {frames} frames, {frames / max(wall, 1e-9):.1f} FPS "
+                  f"(aggregate {total_frames / elapsed:.1f} FPS)")
+
+    elapsed = time.perf_counter() - start
+    print(f"Bulk done: {done}/{len(todo)} videos, {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / max(elapsed, 1e-9):.1f} FPS aggregate) -> {out_dir}")
+    return done, total_frames
 
 # ───────────────────────── Main ───────────────────────────────
 
-def main():
-    model = YOLO(str(MODEL_WEIGHTS))
-    
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Annotate videos with the YOLO model.")
+    parser.add_argument("--bulk", metavar="DIR_OR_GLOB", help="annotate every matching video on a process pool")
+    parser.add_argument("--out-dir", default=str(BULK_OUT_DIR))
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS)
+    parser.add_argument("--threads", type=int, default=None, help="inference threads per worker (default cores / workers)")
+    parser.add_argument("--backend", choices=BACKENDS, default=MODEL_BACKEND)
+    parser.add_argument("--detections-only", action="store_true",
+                        help="write a track file (--track) instead of an annotated video; nothing is drawn or encoded")
+    parser.add_argument("--render", action="store_true", help="draw the track file onto its source video, no model")
+    parser.add_argument("--track", default=str(OUTPUT_TRACK))
+    parser.add_argument("--classes", nargs="*", default=None, help="with --render: only draw these classes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.bulk:
+        try:
+            bulk_annotate(args.bulk, args.out_dir, args.workers, args.threads, backend=args.backend)
+        except ValueError as exc:
+            raise SystemExit(f"Error: {exc}")
+        return
+    if args.render:
+        t0 = time.perf_counter()
+        _, frames = render_track(args.track, output_path=OUTPUT_VIDEO, classes=args.classes)
+        print(f"Rendered {args.track} onto {frames} frames -> {OUTPUT_VIDEO} in {time.perf_counter() - t0:.1f}s")
+        return
+
+    model = load_model(MODEL_WEIGHTS, args.backend, IMG_SIZE)
+
+    if RUN_BATCH_BENCHMARK:
+        compare_batch_sizes(model, SOURCE_VIDEO)
+    if RUN_TRACKING_BENCHMARK:
+        compare_detect_every(model, SOURCE_VIDEO)
+
+    if args.detections_only:
+        _, frame_idx, timings = detect_video(model, SOURCE_VIDEO, args.track, batch_size=BATCH_SIZE,
+                                             detect_every=DETECT_EVERY)
+        print(f"Finished! Saved detections to {args.track} (processed {frame_idx} frames).")
+        print_timings(frame_idx, timings)
+        return
 
-    _,frame_idx = annotate_video(model, SOURCE_VIDEO)
+    timings = {}
+    _, frame_idx = annotate_video(model, SOURCE_VIDEO, pipelined=True, batch_size=BATCH_SIZE,
+                                  detect_every=DETECT_EVERY, timings=timings)
     print(f"Finished! Saved annotated video to {OUTPUT_VIDEO} (processed {frame_idx} frames).")
+    print_timings(frame_idx, timings)
 
 
 if __name__ == "__main__":
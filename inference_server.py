@@ -0,0 +1,286 @@
+"""
+Local HTTP inference server
+===========================
+Serves the shared model over HTTP (standard library only):
+
+    POST /detect     image bytes as the body (or a multipart form upload);
+                     optional query: ?classes=name1,name2&conf=0.4
+    GET  /metrics    queue depth, batch-size histogram, coalesced requests,
+                     latency percentiles per stage
+    GET  /health
+
+Every request thread decodes its upload and hands it to one `MicroBatcher`
+thread, which runs the model on up to `max_batch` images at a time: a batch
+is sent as soon as it is full, or once the oldest image in it has waited
+`max_wait_ms` (the latency budget). Uploads with identical bytes that arrive
+while the first is still queued or running are coalesced by BLAKE2b content
+hash: they share that one inference instead of joining the batch again.
+
+The JSON holds the same per-box name / confidence pairs the GUI's detection
+panel shows, plus boxes and per-class counts:
+
+    {"detections": [{"class_id", "class", "conf", "bbox": [x1, y1, x2, y2]}, ...],
+     "counts": {"class": n}, "width", "height", "batch_size", "coalesced", "timing_ms": {...}}
+
+    python inference_server.py --port 8000 --max-batch 8 --max-wait-ms 10
+    curl --data-binary @data/images/val/<image>.jpg http://127.0.0.1:8000/detect
+    python load_test.py --url http://127.0.0.1:8000 --concurrency 1 4 16
+"""
+
+import argparse
+from collections import Counter
+from concurrent.futures import Future
+from email.parser import BytesParser
+from email.policy import HTTP
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+import cv2
+import numpy as np
+
+from detections import ClassIndex, result_records
+from perf_stats import PerfStats
+
+# ───────────────────────── Constants ──────────────────────────
+HOST            = "127.0.0.1"
+PORT            = 8000
+MAX_BATCH       = 8        # images per model call
+MAX_WAIT_MS     = 10.0     # latency budget a partial batch may wait for more requests
+MAX_UPLOAD      = 32 << 20  # bytes
+REQUEST_TIMEOUT = 60.0     # seconds a request waits for its result
+SERVER_STAGES   = ("queue", "inference", "request")
+LATENCY_WINDOW  = 5000     # recent samples per stage kept for percentiles
+
+# ───────────────────────── Micro-batching ─────────────────────
+
+class MicroBatcher:
+    """Coalesces identical uploads and runs queued images through the model in small batches."""
+
+    def __init__(self, model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, predict_kwargs=None):
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait_ms / 1000.0
+        self.predict_kwargs = predict_kwargs or {}
+        self.stats = PerfStats(SERVER_STAGES, window=LATENCY_WINDOW)
+        self.batch_sizes = Counter()
+        self.requests = self.coalesced = self.errors = 0
+        self._queue = queue.Queue()
+        self._inflight = {}     # content hash -> Future shared by every request for those bytes
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, data):
+        """(Future -> (result, batch_size), coalesced) for encoded image bytes."""
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(digest)
+            if future is not None:
+                self.coalesced += 1
+                return future, True
+            future = Future()
+            self._inflight[digest] = future
+        # --- decode on the request thread, so decoding runs in parallel and outside the batch ---
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self._finish(digest, future, error=ValueError("could not decode the uploaded image"))
+        else:
+            self._queue.put((digest, image, future, time.perf_counter()))
+        return future, False
+
+    def _finish(self, digest, future, value=None, error=None):
+        with self._lock:
+            self._inflight.pop(digest, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def record_failure(self, start, end):
+        """A request that got an error response (bad input, undecodable image or a failed batch)."""
+        with self._lock:
+            self.errors += 1
+        self.stats.record("request", start, end)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][3] + self.max_wait  # --- the budget runs from when the oldest request arrived ---
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            t0 = time.perf_counter()
+            try:
+                results = list(self.model.predict([image for _, image, _, _ in batch], **self.predict_kwargs))
+            except Exception as exc:  # --- counted per request by the handler, via record_failure ---
+                for digest, _, future, _ in batch:
+                    self._finish(digest, future, error=exc)
+                continue
+            t1 = time.perf_counter()
+            self.batch_sizes[len(batch)] += 1
+            for (digest, _, future, queued_at), result in zip(batch, results):
+                self.stats.record("queue", queued_at, t0)
+                self.stats.record("inference", t0, t1)
+                self._finish(digest, future, (result, len(batch)))
+
+    def metrics(self):
+        with self._lock:
+            counters = {"requests": self.requests, "coalesced": self.coalesced, "errors": self.errors,
+                        "inflight_images": len(self._inflight)}
+        snapshot = self.stats.snapshot()
+        return {
+            "queue_depth": self._queue.qsize(),
+            **counters,
+            "batches": sum(self.batch_sizes.values()),
+            "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "latency_ms": {stage: {k: round(v, 2) for k, v in s.items() if k.startswith("p")}
+                           for stage, s in snapshot.items()},
+            "max_batch": self.max_batch,
+            "max_wait_ms": 1000 * self.max_wait,
+        }
+
+# ───────────────────────── HTTP ───────────────────────────────
+
+def _upload_bytes(headers, body):
+    """Image bytes from a raw body or from the first file part of a multipart/form-data upload."""
+    content_type = headers.get("Content-Type", "")
+    if not content_type.startswith("multipart/form-data"):
+        return body
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    for part in message.iter_parts():
+        if part.get_filename() or part.get_param("name", header="content-disposition") in ("image", "file"):
+            return part.get_payload(decode=True)
+    return b""
+
+
+def response_for(result, class_index, classes=None, min_conf=None):
+    """JSON-ready detections of a result, filtered like the GUI's class checkboxes."""
+    if classes is not None or min_conf is not None:
+        keep = class_index.mask(result, classes, min_conf)
+        records = [r for r, k in zip(result_records(result, class_index.names), keep.tolist()) if k]
+    else:
+        records = result_records(result, class_index.names)
+    height, width = result.orig_shape[:2]
+    return {"detections": records, "counts": dict(Counter(r["class"] for r in records)),
+            "width": width, "height": height}
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    batcher = None
+    class_index = None
+    protocol_version = "HTTP/1.1"  # --- keep-alive: the load generator reuses connections ---
+    disable_nagle_algorithm = True  # --- headers and body go out in separate writes; don't wait for delayed ACKs ---
+
+    def log_message(self, format, *args):
+        pass  # --- per-request logging would dominate the timings; /metrics has the numbers ---
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            self._send_json(200, self.batcher.metrics())
+        elif path == "/health":
+            self._send_json(200, {"status": "ok", "classes": len(self.class_index.names)})
+        else:
+            self._send_json(404, {"error": f"unknown path {path}"})
+
+    def _fail(self, start, status, message):
+        """Error response; counted in /metrics and in the request stage like any other request."""
+        self.batcher.record_failure(start, time.perf_counter())
+        self._send_json(status, {"error": message})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self.close_connection = True  # --- the body can't be skipped without a length ---
+            return self._fail(start, 400, "invalid Content-Length")
+        if url.path != "/detect":
+            self.rfile.read(length)
+            return self._send_json(404, {"error": f"unknown path {url.path}"})
+        if not 0 < length <= MAX_UPLOAD:
+            self.rfile.read(min(length, MAX_UPLOAD))
+            self.close_connection = True
+            return self._fail(start, 413 if length else 400, f"expected an image body of 1..{MAX_UPLOAD} bytes")
+        body = self.rfile.read(length)
+        try:
+            query = parse_qs(url.query)
+            classes = query["classes"][0].split(",") if "classes" in query else None
+            min_conf = float(query["conf"][0]) if "conf" in query else None
+            data = _upload_bytes(self.headers, body)
+        except ValueError as exc:
+            return self._fail(start, 400, f"bad request: {exc}")
+        if not data:
+            return self._fail(start, 400, "no image in the upload")
+
+        future, coalesced = self.batcher.submit(data)
+        try:
+            result, batch_size = future.result(timeout=REQUEST_TIMEOUT)
+            payload = response_for(result, self.class_index, classes, min_conf)
+        except ValueError as exc:
+            return self._fail(start, 400, str(exc))
+        except Exception as exc:
+            return self._fail(start, 500, repr(exc))
+        end = time.perf_counter()
+        self.batcher.stats.record("request", start, end)
+        payload.update(batch_size=batch_size, coalesced=coalesced, timing_ms={"total": round(1000 * (end - start), 2)})
+        self._send_json(200, payload)
+
+
+def make_server(model, host=HOST, port=PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, predict_kwargs=None):
+    """ThreadingHTTPServer bound to (host, port) serving `model`; call serve_forever() on it."""
+    handler = type("Handler", (InferenceHandler,), {
+        "batcher": MicroBatcher(model, max_batch, max_wait_ms, predict_kwargs),
+        "class_index": ClassIndex(model.names),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP inference server with micro-batching.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", default=None, help="torch, onnx or openvino (default: model_loader's)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    from model_loader import DEFAULT_BACKEND, load_model
+    model = load_model(args.weights, args.backend or DEFAULT_BACKEND)
+    server = make_server(model, args.host, args.port, args.max_batch, args.max_wait_ms)
+    print(f"Serving {args.weights} ({model.backend}) on http://{args.host}:{args.port} "
+          f"(max batch {args.max_batch}, max wait {args.max_wait_ms:g} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Bulk YOLO label loader and dataset statistics
+=============================================
+`load_split("val")` reads every `data/labels/val/*.txt` on a thread pool and
+parses them in one vectorised pass into a structured numpy array with one
+row per box (`image`, `cls`, `cx`, `cy`, `w`, `h`, normalised like the
+files). The parsed array is cached in `data/cache/labels_<split>.npz` and
+reused until a label file is added, removed or modified.
+
+`report()` builds class histograms, box size / aspect ratio distributions,
+boxes per image and the images that have no labels, all from that array.
+
+    python label_stats.py val
+    python label_stats.py train --json stats_train.json
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
+import numpy as np
+
+# ───────────────────────── Constants ──────────────────────────
+LABELS_ROOT = Path("data/labels")
+IMAGES_ROOT = Path("data/images")
+CACHE_DIR   = Path("data/cache")
+IMAGE_EXTS  = {".jpg", ".jpeg", ".png", ".bmp"}
+READ_WORKERS = 16
+LABEL_DTYPE = np.dtype([("image", np.int32), ("cls", np.int32),
+                        ("cx", np.float32), ("cy", np.float32), ("w", np.float32), ("h", np.float32)])
+SIZE_EDGES   = (0.02, 0.05, 0.1, 0.25, 0.5)          # sqrt(w * h), fraction of the image side
+ASPECT_EDGES = (0.25, 0.5, 0.8, 1.25, 2.0, 4.0)       # w / h
+COUNT_EDGES  = (1, 2, 3, 6, 11, 21)                   # boxes per image: 0, 1, 2, 3-5, 6-10, 11-20, 21+
+
+# ───────────────────────── Loading ────────────────────────────
+
+def _scan(directory, exts):
+    """{stem: (name, size, mtime_ns)} of the files in `directory` with one of `exts`, one scandir pass."""
+    found = {}
+    try:
+        with os.scandir(directory) as entries:
+            for e in entries:
+                stem, ext = os.path.splitext(e.name)
+                if ext.lower() in exts and e.is_file():
+                    st = e.stat()
+                    found[stem] = (e.name, st.st_size, st.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return found
+
+
+def _signature(label_files):
+    h = hashlib.blake2b(digest_size=16)
+    for stem in sorted(label_files):
+        name, size, mtime = label_files[stem]
+        h.update(f"{name}\0{size}\0{mtime}\n".encode())
+    return h.hexdigest()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def parse_labels(contents):
+    """Parse a list of label file contents (bytes) -> (LABEL_DTYPE rows, indices of malformed files).
+
+    All files are tokenised into one list and converted to float32 in a
+    single numpy call; the image id column comes from np.repeat over the
+    per-file row counts. Only if that call fails are the files converted one
+    by one, to find and drop those with non-numeric tokens.
+    """
+    per_file, counts, bad = [], [], []
+    for i, data in enumerate(contents):
+        t = data.split()
+        if len(t) % 5:
+            bad.append(i)
+            t = []
+        per_file.append(t)
+        counts.append(len(t) // 5)
+    try:
+        values = np.array([tok for t in per_file for tok in t], dtype=np.float32)
+    except ValueError:
+        chunks = []
+        for i, t in enumerate(per_file):
+            try:
+                chunks.append(np.array(t, dtype=np.float32))
+            except ValueError:
+                bad.append(i)
+                counts[i] = 0
+        bad.sort()
+        values = np.concatenate(chunks) if chunks else np.zeros(0, np.float32)
+    values = values.reshape(-1, 5)
+    rows = np.empty(len(values), dtype=LABEL_DTYPE)
+    rows["image"] = np.repeat(np.arange(len(contents), dtype=np.int32), counts)
+    rows["cls"] = values[:, 0].astype(np.int32)
+    for j, field in enumerate(("cx", "cy", "w", "h"), 1):
+        rows[field] = values[:, j]
+    return rows, bad
+
+
+def label_path_for(image_path):
+    """data/images/<split>/X.jpg -> data/labels/<split>/X.txt (the YOLO convention)."""
+    parts = list(Path(image_path).parts)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == "images":
+            parts[i] = "labels"
+            break
+    return Path(*parts).with_suffix(".txt")
+
+
+def read_label_file(path):
+    """(N, 5) float32 class, cx, cy, w, h rows of one label file; empty if it doesn't exist."""
+    path = Path(path)
+    if not path.exists():
+        return np.zeros((0, 5), np.float32)
+    rows, bad = parse_labels([path.read_bytes()])
+    if bad:
+        raise ValueError(f"malformed label file {path}")
+    return np.stack([rows[f].astype(np.float32) for f in ("cls", "cx", "cy", "w", "h")], axis=1)
+
+
+def load_split(split="val", labels_root=LABELS_ROOT, images_root=IMAGES_ROOT, workers=READ_WORKERS,
+               cache_dir=CACHE_DIR, use_cache=True):
+    """Every box of a split -> dict with "labels" (LABEL_DTYPE), "images" (stems; `image` indexes this),
+    "unlabelled" (image stems with no label file) and "malformed" (label files that didn't parse).
+    """
+    label_dir, image_dir = Path(labels_root) / split, Path(images_root) / split
+    label_files = _scan(label_dir, {".txt"})
+    image_files = _scan(image_dir, IMAGE_EXTS)
+    stems = sorted(set(label_files) | set(image_files))
+    unlabelled = [s for s in stems if s not in label_files]
+    signature = _signature(label_files)
+
+    # --- the cache holds ids into the labelled files only; they are remapped onto `stems` on every load ---
+    labelled = [s for s in stems if s in label_files]
+    cache = Path(cache_dir) / f"labels_{split}.npz"
+    rows = None
+    if use_cache and cache.exists():
+        with np.load(cache, allow_pickle=False) as cached:  # --- closed here, so the re-save below can replace it ---
+            if str(cached["signature"]) == signature:
+                rows, malformed = cached["labels"], [str(m) for m in cached["malformed"]]
+
+    if rows is None:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            contents = list(pool.map(_read, [label_dir / label_files[s][0] for s in labelled]))
+        rows, bad = parse_labels(contents)
+        malformed = [labelled[i] for i in bad]
+        if use_cache:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(cache, labels=rows, signature=np.array(signature), malformed=np.array(malformed, dtype=str))
+
+    if len(rows):
+        rows = rows.copy()
+        rows["image"] = np.searchsorted(np.array(stems), np.array(labelled))[rows["image"]]
+    return {"labels": rows, "images": stems, "unlabelled": unlabelled, "malformed": malformed}
+
+# ───────────────────────── Statistics ─────────────────────────
+
+def _histogram(values, edges):
+    """Counts per bucket: (-inf, e0), [e0, e1), ..., [e_last, inf)."""
+    return np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1).tolist()
+
+
+def _percentiles(values, qs=(5, 25, 50, 75, 95)):
+    if not len(values):
+        return {}
+    return {f"p{q}": float(v) for q, v in zip(qs, np.percentile(values, qs))}
+
+
+def report(split_data):
+    """Statistics dict for the output of load_split."""
+    rows = split_data["labels"]
+    n_images = len(split_data["images"])
+    size = np.sqrt(rows["w"] * rows["h"])
+    aspect = rows["w"] / np.maximum(rows["h"], 1e-9)
+    per_image = np.bincount(rows["image"], minlength=n_images) if n_images else np.zeros(0, np.int64)
+    classes = np.bincount(rows["cls"]) if len(rows) else np.zeros(0, np.int64)
+    class_size = np.bincount(rows["cls"], weights=size) / np.maximum(classes, 1) if len(rows) else np.zeros(0)
+    # --- images per class: unique (class, image) pairs, counted per class ---
+    pairs = np.unique(rows["cls"].astype(np.int64) * max(n_images, 1) + rows["image"])
+    class_images = np.bincount(pairs // max(n_images, 1), minlength=len(classes))
+    unlabelled = set(split_data["unlabelled"])
+    empty_files = [split_data["images"][i] for i in np.flatnonzero(per_image == 0)
+                   if split_data["images"][i] not in unlabelled]
+    return {
+        "images": n_images,
+        "boxes": int(len(rows)),
+        "classes": {int(c): {"boxes": int(n), "images": int(class_images[c]), "mean_size": float(class_size[c])}
+                    for c, n in enumerate(classes) if n},
+        "box_size": {"edges": SIZE_EDGES, "counts": _histogram(size, SIZE_EDGES), **_percentiles(size)},
+        "aspect_ratio": {"edges": ASPECT_EDGES, "counts": _histogram(aspect, ASPECT_EDGES), **_percentiles(aspect)},
+        "boxes_per_image": {"edges": COUNT_EDGES, "counts": _histogram(per_image, COUNT_EDGES),
+                            "mean": float(per_image.mean()) if n_images else 0.0,
+                            "max": int(per_image.max()) if n_images else 0},
+        "unlabelled_images": split_data["unlabelled"],
+        "empty_label_files": empty_files,
+        "malformed_label_files": split_data["malformed"],
+        "out_of_range_boxes": int(((rows["cx"] < 0) | (rows["cx"] > 1) | (rows["cy"] < 0) | (rows["cy"] > 1) |
+                                   (rows["w"] <= 0) | (rows["h"] <= 0)).sum()),
+    }
+
+
+def _bucket_labels(edges, fmt="{:g}"):
+    edges = [fmt.format(e) for e in edges]
+    return [f"<{edges[0]}"] + [f"{a}-{b}" for a, b in zip(edges, edges[1:])] + [f">={edges[-1]}"]
+
+
+def print_report(stats, names=None, limit=10):
+    print(f"{stats['images']} images, {stats['boxes']} boxes")
+    print(f"\n{'class':<20}{'boxes':>8}{'images':>8}{'mean size':>11}")
+    for c, s in sorted(stats["classes"].items(), key=lambda kv: -kv[1]["boxes"]):
+        name = names[c] if names and c < len(names) else str(c)
+        print(f"{name:<20}{s['boxes']:>8}{s['images']:>8}{s['mean_size']:>11.3f}")
+    peak = lambda counts: max(counts) or 1
+    for title, key, labels in (("box size (sqrt(w*h), fraction of image)", "box_size", _bucket_labels(SIZE_EDGES)),
+                               ("aspect ratio (w/h)", "aspect_ratio", _bucket_labels(ASPECT_EDGES)),
+                               ("boxes per image", "boxes_per_image",
+                                ["0", "1", "2", "3-5", "6-10", "11-20", "21+"])):
+        counts = stats[key]["counts"]
+        print(f"\n{title}")
+        for label, n in zip(labels, counts):
+            print(f"  {label:>10} {n:>7}  {'#' * round(40 * n / peak(counts))}")
+    for title, key in (("images without a label file", "unlabelled_images"), ("empty label files", "empty_label_files"),
+                       ("malformed label files", "malformed_label_files")):
+        items = stats[key]
+        if items:
+            more = f" ... and {len(items) - limit} more" if len(items) > limit else ""
+            print(f"\n{len(items)} {title}: {', '.join(items[:limit])}{more}")
+    if stats["out_of_range_boxes"]:
+        print(f"\n{stats['out_of_range_boxes']} boxes with coordinates outside [0, 1] or non-positive size")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load all YOLO labels of a split and report dataset statistics.")
+    parser.add_argument("split", nargs="?", default="val")
+    parser.add_argument("--names", nargs="*", default=None, help="class names in id order")
+    parser.add_argument("--json", default=None, help="also write the statistics here")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    data = load_split(args.split, use_cache=not args.no_cache)
+    t1 = time.perf_counter()
+    stats = report(data)
+    t2 = time.perf_counter()
+    print_report(stats, args.names)
+    print(f"\nloaded in {1000 * (t1 - t0):.0f} ms, statistics in {1000 * (t2 - t1):.0f} ms")
+    if args.json:
+        Path(args.json).write_text(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Building blocks for the GUI's live camera / video loops
+=======================================================
+Capture, inference and Tk updates run as three decoupled stages:
+
+* a capture thread writes frames into a `FrameRing` (a few preallocated
+  slots, never blocks on the consumer),
+* an inference worker always takes the newest frame from the ring and
+  silently drops anything older, then posts its output to a `LatestResult`,
+* the Tk thread polls `LatestResult` with `root.after` and is the only stage
+  that touches widgets.
+
+Because nothing in the chain queues more than one item, end-to-end latency
+stays bounded by roughly one capture interval + one inference + one poll
+interval, however slow the model is relative to the camera.
+"""
+
+import threading
+import time
+
+RING_SLOTS = 3  # newest frame + the one being read + one free for the writer
+
+
+class FrameRing:
+    """Small ring of reusable frame buffers where readers only ever see the newest frame."""
+
+    def __init__(self, slots=RING_SLOTS):
+        if slots < 3:
+            raise ValueError("FrameRing needs at least 3 slots so the writer never waits")
+        self._cond = threading.Condition()
+        self._buffers = [None] * slots
+        self._tags = [None] * slots
+        self._stamps = [0.0] * slots
+        self._latest = -1    # slot holding the newest complete frame
+        self._reading = -1   # slot currently lent to the reader
+        self._seq = 0        # number of frames written so far
+        self.closed = False
+
+    def write(self, read_fn, tag=None):
+        """Fill a free slot via `read_fn(buffer) -> (ok, frame)` and publish it.
+
+        `read_fn` receives the slot's previous buffer (None on first use) so
+        `cv2.VideoCapture.read` can decode straight into it. Returns False
+        when `read_fn` fails.
+        """
+        with self._cond:
+            idx = next(i for i in range(len(self._buffers)) if i not in (self._latest, self._reading))
+        buf = self._buffers[idx]
+        ok, frame = read_fn(buf) if buf is not None else read_fn()
+        if not ok:
+            return False
+        self._store(idx, frame, tag)
+        return True
+
+    def publish(self, frame, tag=None):
+        """Publish a frame decoded elsewhere (e.g. by a prefetching video reader)."""
+        with self._cond:
+            idx = next(i for i in range(len(self._buffers)) if i not in (self._latest, self._reading))
+        self._store(idx, frame, tag)
+
+    def _store(self, idx, frame, tag):
+        with self._cond:
+            self._buffers[idx] = frame
+            self._tags[idx] = tag
+            self._stamps[idx] = time.perf_counter()
+            self._latest = idx
+            self._seq += 1
+            self._cond.notify_all()
+
+    def take_latest(self, last_seq, timeout=0.1):
+        """Wait for a frame newer than `last_seq`.
+
+        Returns (seq, frame, tag, captured_at) and lends the slot to the
+        caller until `release()`; returns None on timeout or once closed.
+        `seq - last_seq - 1` frames were dropped in between.
+        """
+        with self._cond:
+            if self._seq <= last_seq and not self.closed:
+                self._cond.wait(timeout)
+            if self._seq <= last_seq or self._latest < 0:
+                return None
+            self._reading = self._latest
+            idx = self._reading
+            return self._seq, self._buffers[idx], self._tags[idx], self._stamps[idx]
+
+    def release(self):
+        with self._cond:
+            self._reading = -1
+
+    def close(self):
+        """Mark the stream as finished and wake any waiting reader."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class LatestResult:
+    """Single-slot mailbox: the producer overwrites, the consumer takes whatever is newest."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+
+    def put(self, item):
+        """Store `item`; returns True if it replaced one that was never taken (a dropped result)."""
+        with self._lock:
+            dropped = self._item is not None
+            self._item = item
+            return dropped
+
+    def take(self):
+        with self._lock:
+            item, self._item = self._item, None
+            return item
@@ -0,0 +1,137 @@
+"""
+Load generator for inference_server.py
+======================================
+Posts images from a folder to `/detect` from N concurrent keep-alive
+connections and reports throughput against latency percentiles (p50 / p95
+/ p99), once per concurrency level, so the knee of the curve is easy to see.
+After each level the server's /metrics (mean batch size, coalesced requests)
+are shown next to the client-side numbers.
+
+    python load_test.py --concurrency 1 2 4 8 16 --requests 400
+    python load_test.py --duplicates 0.5     # half the requests reuse one image: exercises coalescing
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+from pathlib import Path
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import numpy as np
+
+# ───────────────────────── Constants ──────────────────────────
+DEFAULT_URL    = "http://127.0.0.1:8000"
+IMAGE_DIR      = Path("data/images/val")
+IMAGE_EXTS     = {".jpg", ".jpeg", ".png", ".bmp"}
+CONCURRENCY    = (1, 2, 4, 8, 16)
+REQUESTS       = 200      # per concurrency level
+MAX_IMAGES     = 64       # images loaded into memory and cycled through
+
+
+def load_images(image_dir=IMAGE_DIR, limit=MAX_IMAGES):
+    paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTS)[:limit]
+    if not paths:
+        raise FileNotFoundError(f"No images in {image_dir}")
+    return [p.read_bytes() for p in paths]
+
+
+def _get_json(url, path):
+    u = urlparse(url)
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=10)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def run_level(url, images, concurrency, requests, duplicates=0.0, seed=0):
+    """Fire `requests` posts from `concurrency` connections; returns a stats dict (latencies in ms)."""
+    u = urlparse(url)
+    rng = random.Random(seed)
+    # --- the request mix is fixed up front, so every level sends the same images ---
+    bodies = [images[0] if rng.random() < duplicates else images[rng.randrange(len(images))] for _ in range(requests)]
+    latencies, errors = [], []
+    lock = threading.Lock()
+    next_i = iter(range(requests))
+
+    def worker():
+        conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=60)
+        try:
+            while True:
+                with lock:
+                    i = next(next_i, None)
+                if i is None:
+                    return
+                t0 = time.perf_counter()
+                error = None
+                try:
+                    conn.request("POST", "/detect", body=bodies[i], headers={"Content-Type": "application/octet-stream"})
+                    response = conn.getresponse()
+                    body = response.read()
+                    if response.status != 200:
+                        error = f"HTTP {response.status}: {body[:200]!r}"
+                except (OSError, http.client.HTTPException) as exc:
+                    error = repr(exc)
+                    conn.close()
+                    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=60)
+                ms = 1000 * (time.perf_counter() - t0)
+                with lock:
+                    if error is None:
+                        latencies.append(ms)
+                    else:
+                        errors.append(error)
+        finally:
+            conn.close()
+
+    before = _get_json(url, "/metrics")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - start
+    after = _get_json(url, "/metrics")
+
+    batches = after["batches"] - before["batches"]
+    inferred = after["requests"] - before["requests"] - (after["coalesced"] - before["coalesced"])
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    return {"concurrency": concurrency, "requests": requests, "ok": len(latencies), "errors": len(errors),
+            "throughput": len(latencies) / elapsed, "p50": float(np.percentile(lat, 50)),
+            "p95": float(np.percentile(lat, 95)), "p99": float(np.percentile(lat, 99)),
+            "mean_batch": inferred / batches if batches else 0.0,
+            "coalesced": after["coalesced"] - before["coalesced"], "first_error": errors[0] if errors else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput vs latency of the HTTP inference server.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--images", default=str(IMAGE_DIR))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="requests per concurrency level")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="fraction of requests that send the same image")
+    parser.add_argument("--json", default=None, help="also write the results here")
+    args = parser.parse_args(argv)
+
+    images = load_images(args.images)
+    health = _get_json(args.url, "/health")
+    print(f"{args.url}: {health['status']}, {len(images)} images, {args.requests} requests per level")
+    run_level(args.url, images, 1, min(4, args.requests))  # --- warm-up ---
+
+    print(f"{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'batch':>7}{'coal.':>7}{'err':>5}")
+    rows = []
+    for c in args.concurrency:
+        r = run_level(args.url, images, c, args.requests, args.duplicates)
+        rows.append(r)
+        print(f"{c:>5}{r['throughput']:>9.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+              f"{r['mean_batch']:>7.2f}{r['coalesced']:>7}{r['errors']:>5}")
+        if r["first_error"]:
+            print(f"      first error: {r['first_error']}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Shared model loading with optimised CPU backends
+================================================
+`load_model()` is the one place the scripts and the GUI get a detector from.
+For the "onnx" (ONNX Runtime) and "openvino" backends the `.pt` weights are
+exported once and the artifact is cached next to them (`best.onnx`,
+`best_openvino_model/`). A small `.meta.json` sidecar records the source
+weights' size/mtime and the export settings, so the export is redone only
+when the weights change. The returned `Predictor` behaves the same whatever
+the backend (`names`, `predict()`, calling it directly) and has already been
+warmed up, so the first real frame doesn't pay for lazy initialisation.
+
+PyTorch is the default everywhere; the exported backends are opt-in with
+`--backend` or the YOLO_BACKEND environment variable, and need packages that
+are not in requirements.txt (`onnx onnxruntime`, or `openvino`). If an
+export or backend fails to load, it falls back to PyTorch with a warning
+rather than stopping the app. A failed export is recorded in the sidecar,
+so it is not retried on every start until the weights change (or the
+sidecar is deleted).
+
+    python model_loader.py --weights best.pt --compare      # latency per backend on data/images/val
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import shutil
+import threading
+import time
+
+# ───────────────────────── Constants ──────────────────────────
+DEFAULT_WEIGHTS = Path("best.pt")
+DEFAULT_BACKEND = os.environ.get("YOLO_BACKEND", "torch")  # e.g. YOLO_BACKEND=onnx on CPU-only boxes
+BACKENDS        = ("torch", "onnx", "openvino")
+IMG_SIZE        = 640
+WARMUP_RUNS     = 2
+COMPARE_IMAGES  = Path("data/images/val")
+COMPARE_COUNT   = 20
+
+# ───────────────────────── Export cache ───────────────────────
+
+def artifact_path(weights, backend):
+    weights = Path(weights)
+    if backend == "onnx":
+        return weights.with_suffix(".onnx")
+    if backend == "openvino":
+        return weights.parent / f"{weights.stem}_openvino_model"
+    return weights
+
+
+def _meta_path(artifact):
+    return Path(f"{artifact}.meta.json")
+
+
+def _export_signature(weights, imgsz):
+    stat = Path(weights).stat()
+    return {"weights_size": stat.st_size, "weights_mtime": stat.st_mtime_ns, "imgsz": imgsz}
+
+
+def export_if_stale(weights, backend, imgsz=IMG_SIZE):
+    """Path of the cached artifact for `backend`, exporting it first if missing or out of date."""
+    artifact = artifact_path(weights, backend)
+    if backend == "torch":
+        return artifact
+
+    signature = _export_signature(weights, imgsz)
+    meta = _meta_path(artifact)
+    if meta.exists():
+        try:
+            recorded = json.loads(meta.read_text())
+        except ValueError:
+            recorded = {}  # unreadable sidecar -> export again
+        failed = recorded.pop("export_failed", None)
+        if recorded == signature:
+            if failed:
+                raise RuntimeError(f"export to {backend} failed before ({failed}); delete {meta} to retry")
+            if artifact.exists():
+                return artifact
+
+    from ultralytics import YOLO
+    print(f"Exporting {weights} to {backend} (cached at {artifact}) ...")
+    try:
+        exported = Path(YOLO(str(weights)).export(format=backend, imgsz=imgsz, dynamic=True, half=False))
+    except Exception as exc:
+        meta.write_text(json.dumps({**signature, "export_failed": repr(exc)}))
+        raise
+    if exported.resolve() != artifact.resolve():  # ultralytics picks the name; keep ours stable
+        if artifact.is_dir():
+            shutil.rmtree(artifact)
+        exported.replace(artifact)
+    meta.write_text(json.dumps(signature))
+    return artifact
+
+# ───────────────────────── Predictor ──────────────────────────
+
+class Predictor:
+    """Backend-agnostic detector: same call surface as an ultralytics YOLO model."""
+
+    def __init__(self, model, backend, weights, imgsz=IMG_SIZE, artifact=None):
+        self.model = model
+        self.backend = backend
+        self.weights = str(weights)
+        self.artifact = str(artifact or weights)  # --- the file the backend actually loaded (.pt, .onnx, ...) ---
+        self.imgsz = imgsz
+        self.names = model.names
+        # --- ultralytics predictors keep per-call state; the GUI calls in from more than one thread ---
+        self._lock = threading.Lock()
+
+    def predict(self, source, **kwargs):
+        kwargs.setdefault("imgsz", self.imgsz)
+        kwargs.setdefault("verbose", False)
+        with self._lock:
+            return self.model.predict(source, **kwargs)
+
+    __call__ = predict
+
+    def set_threads(self, threads):
+        """Limit the intra-op threads of whichever backend this predictor runs on."""
+        if self.backend == "torch":
+            import torch
+            torch.set_num_threads(threads)
+            return
+        if self.model.predictor is None:
+            self.warmup(1)  # --- ultralytics builds its AutoBackend on the first call ---
+        backend = self.model.predictor.model
+        with self._lock:
+            if self.backend == "onnx":
+                import onnxruntime
+                options = onnxruntime.SessionOptions()
+                options.intra_op_num_threads = threads
+                backend.session = onnxruntime.InferenceSession(self.artifact, sess_options=options,
+                                                               providers=backend.session.get_providers())
+            else:
+                config = {"PERFORMANCE_HINT": getattr(backend, "inference_mode", "LATENCY"),
+                          "INFERENCE_NUM_THREADS": threads}
+                backend.ov_compiled_model = backend.core.compile_model(
+                    backend.ov_model, device_name=getattr(backend, "device_name", "AUTO"), config=config)
+
+    def warmup(self, runs=WARMUP_RUNS):
+        import numpy as np
+        blank = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.predict(blank)
+        return self
+
+
+def load_model(weights=DEFAULT_WEIGHTS, backend=DEFAULT_BACKEND, imgsz=IMG_SIZE, warmup=True):
+    """Load `weights` on `backend` ("torch", "onnx" or "openvino") and return a warmed-up Predictor."""
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    try:
+        path = export_if_stale(weights, backend, imgsz)
+        model = YOLO(str(path), task="detect")
+        predictor = Predictor(model, backend, weights, imgsz, path)
+        if warmup:
+            predictor.warmup()
+    except Exception as exc:
+        if backend == "torch":
+            raise
+        print(f"Warning: {backend} backend unavailable ({exc}); falling back to PyTorch")
+        return load_model(weights, "torch", imgsz, warmup)
+    return predictor
+
+# ───────────────────────── Latency comparison ─────────────────
+
+def compare_backends(weights=DEFAULT_WEIGHTS, backends=BACKENDS, image_dir=COMPARE_IMAGES, count=COMPARE_COUNT,
+                     imgsz=IMG_SIZE):
+    """Mean / p95 per-image latency of each backend on the same images. Returns {backend: (mean_ms, p95_ms)}."""
+    import cv2
+    paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))[:count]
+    images = [cv2.imread(str(p)) for p in paths]
+    if not images:
+        return {}
+
+    report = {}
+    for backend in backends:
+        predictor = load_model(weights, backend, imgsz)
+        if predictor.backend != backend:
+            continue  # fell back to torch; already measured or will be
+        times = []
+        for image in images:
+            t0 = time.perf_counter()
+            predictor.predict(image)
+            times.append(1000 * (time.perf_counter() - t0))
+        times.sort()
+        report[backend] = (sum(times) / len(times), times[min(int(0.95 * len(times)), len(times) - 1)])
+        print(f"{backend:<9} mean {report[backend][0]:7.1f} ms   p95 {report[backend][1]:7.1f} ms")
+    if "torch" in report:
+        for backend, (mean_ms, _) in report.items():
+            print(f"{backend:<9} {report['torch'][0] / mean_ms:5.2f}x vs torch")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export / load the detector and compare CPU backends.")
+    parser.add_argument("--weights", default=str(DEFAULT_WEIGHTS))
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--compare", action="store_true", help="time every backend on data/images/val")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare_backends(args.weights, imgsz=args.imgsz)
+    else:
+        predictor = load_model(args.weights, args.backend, args.imgsz)
+        print(f"Loaded {args.weights} on {predictor.backend}")
+
+
+if __name__ == "__main__":
+    main()
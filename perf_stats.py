@@ -0,0 +1,109 @@
+"""
+Live performance counters for the GUI
+=====================================
+`PerfStats` collects per-stage latencies (capture, inference, filter, render,
+Tk update), a rolling FPS counter for frames actually shown, and dropped
+frame counts. It is safe to record from any thread.
+
+Each stage keeps a fixed-bucket histogram plus a short window of recent
+samples for percentiles, and every measurement is also appended to a bounded
+trace that `dump_trace` writes in Chrome trace-event JSON, so a session can
+be opened later in chrome://tracing or https://ui.perfetto.dev.
+
+The stage names default to the GUI's; other pipelines (stream_service.py)
+pass their own.
+"""
+
+from collections import deque
+import json
+import threading
+import time
+
+STAGES       = ("capture", "inference", "filter", "render", "tk")
+BUCKETS_MS   = (1, 2, 5, 10, 20, 50, 100, 200, 500)   # histogram upper edges; last bucket is open-ended
+WINDOW       = 120      # recent samples per stage used for percentiles
+FPS_WINDOW_S = 2.0      # FPS is averaged over this many seconds
+TRACE_LEN    = 50000    # trace events kept for dump_trace
+SPARK        = " ▁▂▃▄▅▆▇█"
+
+
+class PerfStats:
+    def __init__(self, stages=STAGES, window=WINDOW):
+        self.stages = tuple(stages)
+        self.window = window
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._recent = {s: deque(maxlen=self.window) for s in self.stages}
+            self._hist = {s: [0] * (len(BUCKETS_MS) + 1) for s in self.stages}
+            self._shown = deque()
+            self._trace = deque(maxlen=TRACE_LEN)
+            self.dropped = {"capture": 0, "display": 0}
+
+    def record(self, stage, start, end, frame=None):
+        """Add one measurement; `start`/`end` are time.perf_counter() seconds."""
+        ms = 1000 * (end - start)
+        bucket = next((i for i, edge in enumerate(BUCKETS_MS) if ms <= edge), len(BUCKETS_MS))
+        with self._lock:
+            self._recent[stage].append(ms)
+            self._hist[stage][bucket] += 1
+            self._trace.append((stage, start, end, threading.get_ident(), frame))
+
+    def add_dropped(self, kind, n=1):
+        if n > 0:
+            with self._lock:
+                self.dropped[kind] += n
+
+    def frame_shown(self):
+        now = time.perf_counter()
+        with self._lock:
+            self._shown.append(now)
+            while self._shown and now - self._shown[0] > FPS_WINDOW_S:
+                self._shown.popleft()
+
+    def fps(self):
+        with self._lock:
+            if len(self._shown) < 2:
+                return 0.0
+            span = self._shown[-1] - self._shown[0]
+            return (len(self._shown) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        """{stage: {"p50", "p95", "p99", "count", "hist"}} for stages that have samples."""
+        with self._lock:
+            out = {}
+            for stage in self.stages:
+                samples = sorted(self._recent[stage])
+                if not samples:
+                    continue
+                pct = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)]
+                out[stage] = {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "count": sum(self._hist[stage]),
+                              "hist": list(self._hist[stage])}
+            return out
+
+    def summary_text(self):
+        """Multi-line text for the GUI panel."""
+        lines = [f"FPS {self.fps():5.1f}   dropped: capture {self.dropped['capture']}, display {self.dropped['display']}"]
+        for stage, s in self.snapshot().items():
+            peak = max(s["hist"]) or 1
+            spark = "".join(SPARK[round(8 * n / peak)] for n in s["hist"])
+            lines.append(f"{stage:<9} p50 {s['p50']:6.1f}  p95 {s['p95']:6.1f} ms  |{spark}|")
+        return "\n".join(lines)
+
+    def dump_trace(self, path):
+        """Write the trace as Chrome trace-event JSON ("X" complete events, microseconds)."""
+        fps = self.fps()
+        with self._lock:
+            events = list(self._trace)
+            meta = {"fps": fps, "dropped": dict(self.dropped), "buckets_ms": BUCKETS_MS,
+                    "histograms": {s: list(h) for s, h in self._hist.items()}}
+        trace = [{"name": stage, "ph": "X", "pid": 1, "tid": tid,
+                  "ts": round(1e6 * (start - self._t0), 1), "dur": round(1e6 * (end - start), 1),
+                  "args": {"frame": frame} if frame is not None else {}}
+                 for stage, start, end, tid, frame in events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "otherData": meta}, f)
+        return path
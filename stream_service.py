@@ -0,0 +1,357 @@
+"""
+Headless multi-stream detection service
+=======================================
+Runs one model over N camera streams (RTSP URLs, camera indices, or video
+files / looped videos standing in for them) with batches built across
+streams:
+
+* every stream has a capture thread that keeps only its *newest* frame in a
+  one-slot mailbox (older frames are dropped and counted, as in the GUI's
+  live pipeline), so a slow model never builds a backlog
+* one asyncio batcher takes the pending frames of all streams, round robin,
+  and sends a batch to the model as soon as it holds `max_batch` frames or
+  `max_wait_ms` has passed since the first one arrived
+* the model runs on a single worker thread (one shared instance) while the
+  event loop keeps accepting frames, so the next batch is usually full by
+  the time the current one returns
+* results are published per stream to `subscribe(stream_id)` queues and,
+  with `--tracks DIR`, appended to one track file per stream (track_file.py)
+
+Per stream, `PerfStats` records queue wait, inference and capture-to-result
+latency; the service also records batch sizes and model time per batch, so
+throughput and latency can be compared as N grows.
+
+    python stream_service.py rtsp://cam1/stream rtsp://cam2/stream
+    python stream_service.py "videos/*.mp4" --loop --duration 60 --tracks tracks/
+    python stream_service.py VIDEO_FOR_DEMO.MP4 --replicate 16 --loop --duration 30   # scaling test
+"""
+
+import argparse
+import asyncio
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import os
+from pathlib import Path
+import threading
+import time
+import cv2
+
+from detections import box_arrays
+from inference_mp4 import iter_video_paths
+from perf_stats import PerfStats
+from track_file import TrackWriter
+
+# ───────────────────────── Constants ──────────────────────────
+MAX_BATCH       = 8       # frames per model call
+MAX_WAIT_MS     = 10.0    # how long a partial batch waits for more streams
+RESULT_QUEUE    = 4       # results buffered per subscriber; the oldest is dropped when full
+REPORT_EVERY_S  = 5.0     # seconds between throughput reports
+STREAM_STAGES   = ("queue", "inference", "latency")
+CONF_THRESHOLD  = 0.20
+
+# frame_num counts captured frames (monotonic, also across loops); boxes are box_arrays() of the result
+StreamResult = namedtuple("StreamResult", ["stream_id", "frame_num", "captured_at", "boxes", "result"])
+
+# ───────────────────────── Streams ────────────────────────────
+
+def _post(event_loop, fn, *args):
+    """call_soon_threadsafe that tolerates the loop having shut down; returns False if it has."""
+    try:
+        event_loop.call_soon_threadsafe(fn, *args)
+        return True
+    except RuntimeError:
+        return False
+
+
+class Stream:
+    """One input: a capture thread feeding a newest-frame-wins slot, plus its stats and subscribers."""
+
+    def __init__(self, stream_id, source, loop=False, realtime=True):
+        self.id = stream_id
+        self.source = source
+        self.loop = loop
+        self.realtime = realtime  # --- False: never drop, the capture waits for each frame to be taken ---
+        self.stats = PerfStats(STREAM_STAGES)
+        self.pending = None       # (frame_num, frame, captured_at), set on the event loop only
+        self.captured = self.processed = 0
+        self.finished = False
+        self.fps = 0.0
+        self.size = (0, 0)
+        self.subscribers = []
+        self.track = None
+        self._taken = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self, event_loop, on_frame, on_end):
+        self._taken.set()
+        threading.Thread(target=self._capture, args=(event_loop, on_frame, on_end), daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._taken.set()
+
+    def take(self):
+        """Called by the batcher: the pending frame, which frees the slot."""
+        item, self.pending = self.pending, None
+        self._taken.set()
+        return item
+
+    def _capture(self, event_loop, on_frame, on_end):
+        source = int(self.source) if str(self.source).isdigit() else str(self.source)
+        cap = cv2.VideoCapture(source)
+        is_file = isinstance(source, str) and os.path.exists(source)
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        # --- files are paced to their fps in realtime mode, so they behave like a live feed ---
+        interval = 1.0 / self.fps if (is_file and self.realtime and self.fps > 0) else 0.0
+        next_due = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if not self.realtime:
+                    self._taken.wait()
+                    self._taken.clear()
+                ok, frame = cap.read()
+                if not ok:
+                    if self.loop and is_file and self.captured:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    break
+                if interval:
+                    next_due += interval
+                    delay = next_due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_due = time.perf_counter()  # --- fell behind: don't try to catch up in a burst ---
+                captured_at = time.perf_counter()
+                if not _post(event_loop, on_frame, self, (self.captured, frame, captured_at)):
+                    break
+                self.captured += 1
+        finally:
+            cap.release()
+            _post(event_loop, on_end, self)
+
+# ───────────────────────── Service ────────────────────────────
+
+class DetectionService:
+    """Dynamic cross-stream batching around one model (anything with `predict(frames, **kw)` and `names`)."""
+
+    def __init__(self, model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, predict_kwargs=None, track_dir=None):
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait_ms / 1000.0
+        self.predict_kwargs = {"conf": CONF_THRESHOLD, **(predict_kwargs or {})}
+        self.track_dir = Path(track_dir) if track_dir else None
+        self.streams = {}
+        self.batch_sizes = Counter()
+        self.model_stats = PerfStats(("batch",))
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+        self._wakeup = None
+        self._next = 0          # round-robin start, so no stream is always first in a full batch
+        self._started = None
+
+    def add_stream(self, source, stream_id=None, loop=False, realtime=True):
+        stream_id = stream_id or Path(str(source)).stem or str(source)
+        base, k = stream_id, 1
+        while stream_id in self.streams:
+            k += 1
+            stream_id = f"{base}#{k}"
+        self.streams[stream_id] = Stream(stream_id, source, loop, realtime)
+        return stream_id
+
+    def subscribe(self, stream_id):
+        """asyncio.Queue receiving this stream's StreamResults (bounded; old results are dropped)."""
+        q = asyncio.Queue(maxsize=RESULT_QUEUE)
+        self.streams[stream_id].subscribers.append(q)
+        return q
+
+    # --- event-loop callbacks from the capture threads ---
+
+    def _on_frame(self, stream, item):
+        if stream.pending is not None:
+            stream.stats.add_dropped("capture")
+        stream.pending = item
+        self._wakeup.set()
+
+    def _on_end(self, stream):
+        stream.finished = True
+        self._wakeup.set()
+
+    # --- batching ---
+
+    def _ready(self):
+        streams = list(self.streams.values())
+        order = streams[self._next % len(streams):] + streams[:self._next % len(streams)]
+        return [s for s in order if s.pending is not None]
+
+    def _all_done(self):
+        return all(s.finished and s.pending is None for s in self.streams.values())
+
+    async def _collect(self):
+        """Wait for the first pending frame, then up to max_wait for the batch to fill."""
+        while not self._ready():
+            if self._all_done():
+                return []
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        deadline = time.perf_counter() + self.max_wait
+        while len(self._ready()) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self._all_done():
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        batch = [(s, s.take()) for s in self._ready()[:self.max_batch]]
+        self._next += len(batch)
+        return batch
+
+    async def _infer(self, batch):
+        frames = [frame for _, (_, frame, _) in batch]
+        t0 = time.perf_counter()
+        results = await asyncio.get_running_loop().run_in_executor(
+            self._executor, lambda: list(self.model.predict(frames, **self.predict_kwargs)))
+        t1 = time.perf_counter()
+        self.batch_sizes[len(batch)] += 1
+        self.model_stats.record("batch", t0, t1)
+        for (stream, (frame_num, _, captured_at)), result in zip(batch, results):
+            stream.stats.record("queue", captured_at, t0, frame_num)
+            stream.stats.record("inference", t0, t1, frame_num)
+            stream.stats.record("latency", captured_at, t1, frame_num)
+            stream.stats.frame_shown()
+            stream.processed += 1
+            self._publish(stream, StreamResult(stream.id, frame_num, captured_at, box_arrays(result), result))
+
+    def _publish(self, stream, item):
+        if stream.track is not None:
+            stream.track.write(item.frame_num, *item.boxes)
+        for q in stream.subscribers:
+            if q.full():
+                q.get_nowait()  # --- slow subscriber: keep the newest results ---
+            q.put_nowait(item)
+
+    async def run(self, duration=None, report_every=REPORT_EVERY_S):
+        """Process until every stream has ended, or for `duration` seconds. Returns the final report dict."""
+        if not self.streams:
+            raise ValueError("no streams to run; add_stream() first")
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._started = time.perf_counter()
+        for stream in self.streams.values():
+            stream.start(loop, self._on_frame, self._on_end)
+        if self.track_dir is not None:
+            self.track_dir.mkdir(parents=True, exist_ok=True)
+        reporter = asyncio.ensure_future(self._report_loop(report_every)) if report_every else None
+        try:
+            while duration is None or time.perf_counter() - self._started < duration:
+                batch = await (asyncio.wait_for(self._collect(), duration - (time.perf_counter() - self._started))
+                               if duration is not None else self._collect())
+                if not batch:
+                    break
+                self._open_tracks(batch)
+                await self._infer(batch)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if reporter:
+                reporter.cancel()
+            for stream in self.streams.values():
+                stream.stop()
+                if stream.track is not None:
+                    stream.track.close()
+            self._executor.shutdown(wait=True)
+        return self.report()
+
+    def _open_tracks(self, batch):
+        # --- opened on the first frame, once the capture thread knows the stream's fps and size ---
+        if self.track_dir is None:
+            return
+        for stream, _ in batch:
+            if stream.track is None:
+                path = self.track_dir / f"{stream.id.replace('#', '_')}.trk"
+                stream.track = TrackWriter(path, self.model.names, stream.fps, stream.size, stream.source)
+
+    async def _report_loop(self, every):
+        while True:
+            await asyncio.sleep(every)
+            print_report(self.report())
+
+    def report(self):
+        """{"elapsed", "fps", "batches", "mean_batch", "batch_ms", "streams": {id: {...}}}."""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        batches = sum(self.batch_sizes.values())
+        processed = sum(s.processed for s in self.streams.values())
+        model = self.model_stats.snapshot().get("batch", {})
+        streams = {}
+        for s in self.streams.values():
+            snap = s.stats.snapshot()
+            streams[s.id] = {"captured": s.captured, "processed": s.processed, "dropped": s.stats.dropped["capture"],
+                             "fps": s.stats.fps(), "latency_p50": snap.get("latency", {}).get("p50"),
+                             "latency_p95": snap.get("latency", {}).get("p95"),
+                             "queue_p50": snap.get("queue", {}).get("p50")}
+        return {"elapsed": elapsed, "processed": processed, "fps": processed / elapsed if elapsed else 0.0,
+                "batches": batches, "mean_batch": processed / batches if batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "batch_p50": model.get("p50"), "batch_p95": model.get("p95"), "streams": streams}
+
+
+def print_report(report, limit=20):
+    ms = lambda v: f"{v:7.1f}" if v is not None else "      -"
+    print(f"[{report['elapsed']:6.1f}s] {report['processed']} frames, {report['fps']:.1f} FPS total, "
+          f"{report['batches']} batches (mean {report['mean_batch']:.2f}, model p50 {ms(report['batch_p50']).strip()} ms)")
+    for sid, s in list(report["streams"].items())[:limit]:
+        print(f"  {sid:<28} {s['fps']:6.1f} FPS  latency p50 {ms(s['latency_p50'])} p95 {ms(s['latency_p95'])} ms"
+              f"  queue p50 {ms(s['queue_p50'])} ms  dropped {s['dropped']}")
+    if len(report["streams"]) > limit:
+        print(f"  ... and {len(report['streams']) - limit} more streams")
+
+# ───────────────────────── Main ───────────────────────────────
+
+def expand_sources(sources):
+    """URLs and camera indices pass through; directories and glob patterns expand to their videos."""
+    out = []
+    for source in sources:
+        if "://" in source or source.isdigit():
+            out.append(source)
+        elif os.path.isdir(source) or glob.has_magic(source):
+            out.extend(str(p) for p in iter_video_paths(source))
+        else:
+            out.append(source)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one YOLO model over many streams with cross-stream batching.")
+    parser.add_argument("sources", nargs="+", help="RTSP/HTTP URLs, camera indices, video files, dirs or globs")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", default=None, help="torch, onnx or openvino (default: model_loader's)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--loop", action="store_true", help="restart video files at the end (simulated live feeds)")
+    parser.add_argument("--replicate", type=int, default=1, help="open every source N times (scaling tests)")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="don't pace files or drop frames: measure peak throughput instead of live behaviour")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--tracks", default=None, help="write one track file per stream into this directory")
+    args = parser.parse_args(argv)
+    sources = expand_sources(args.sources)
+    if not sources:
+        parser.error(f"no streams: {', '.join(args.sources)} matched no videos")
+
+    from model_loader import DEFAULT_BACKEND, load_model
+    model = load_model(args.weights, args.backend or DEFAULT_BACKEND)
+    service = DetectionService(model, args.max_batch, args.max_wait_ms, track_dir=args.tracks)
+    for source in sources:
+        for _ in range(max(1, args.replicate)):
+            service.add_stream(source, loop=args.loop, realtime=not args.no_realtime)
+    print(f"{len(service.streams)} stream(s), max batch {args.max_batch}, max wait {args.max_wait_ms:g} ms")
+    report = asyncio.run(service.run(args.duration))
+    print("\nFinal:")
+    print_report(report, limit=len(report["streams"]))
+
+
+if __name__ == "__main__":
+    main()
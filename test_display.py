@@ -0,0 +1,29 @@
+"""
+FrameDisplay regression test
+============================
+The PIL image handed to the PhotoImage must follow the render buffers: it
+used to be a one-off copy, so every paste showed a black frame.
+
+    python -m pytest -q test_display.py
+"""
+
+import numpy as np
+
+from display import FrameDisplay, _FakeResult
+
+
+def test_pasted_image_follows_render():
+    display = FrameDisplay(size=(64, 48))
+    frame = np.full((120, 160, 3), (40, 160, 220), dtype=np.uint8)
+    result = _FakeResult(np.array([[10, 10, 80, 60]], dtype=np.float32), np.array([0.9], dtype=np.float32),
+                         np.array([0], dtype=np.float32), {0: "class0"})
+
+    display.render(frame, result)
+    pasted = np.asarray(display.paste())
+    assert pasted.shape == (48, 64, 3)
+    assert pasted.mean() > 100
+    assert np.array_equal(pasted, display.rgb)
+    assert tuple(pasted[-1, -1]) == (220, 160, 40)  # --- BGR frame shows up as RGB ---
+
+    display.render(np.zeros_like(frame))
+    assert np.asarray(display.paste()).max() == 0  # --- a later frame replaces the earlier one ---
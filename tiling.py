@@ -0,0 +1,157 @@
+"""
+Sliced (tiled) inference for high-resolution stills
+===================================================
+At imgsz=640 a 4000 px camera still is downscaled ~6x and small litter
+items vanish. `TiledModel` wraps a model with the same call surface
+(`names`, `predict()`, calling it directly) and instead:
+
+1. runs the usual full-frame pass (keeps the large objects),
+2. slices the image into overlapping tiles and runs *all* tiles of all
+   images in one predict call,
+3. shifts tile boxes back to image coordinates and merges them with the
+   full-frame boxes using one vectorised overlap matrix (cross-tile NMS).
+
+With `adaptive=True` the full-frame pass runs at a low confidence and only
+the tiles containing low-confidence candidates are run, so a still with
+nothing doubtful in it costs little more than the plain pass.
+"""
+
+from pathlib import Path
+import cv2
+import numpy as np
+
+from detections import box_arrays, make_result
+
+TILE_SIZE         = 640    # tile side in pixels; tiles are fed to the model at this imgsz (no downscaling)
+TILE_OVERLAP      = 0.2    # fraction of a tile shared with its neighbour
+MERGE_THRESHOLD   = 0.6    # same-class boxes overlapping more than this are merged (kept: highest conf)
+MERGE_METRIC      = "ios"  # "ios" (intersection over smaller) also catches boxes cut in half by a tile edge
+CONF_THRESHOLD    = 0.25
+ADAPTIVE_LOW_CONF = 0.05   # adaptive mode: full-frame boxes in [this, conf) mark the tiles worth running
+
+
+def tile_origins(height, width, tile=TILE_SIZE, overlap=TILE_OVERLAP):
+    """(N, 2) top-left (x, y) corners of overlapping tiles; the last row/column is flush with the edge."""
+    stride = max(1, int(tile * (1 - overlap)))
+
+    def starts(size):
+        if size <= tile:
+            return [0]
+        return list(range(0, size - tile, stride)) + [size - tile]
+
+    xs, ys = starts(width), starts(height)
+    return np.array([(x, y) for y in ys for x in xs], dtype=np.int64).reshape(-1, 2)
+
+
+def overlap_matrix(a, b, metric=MERGE_METRIC):
+    """Pairwise IoU ("iou") or intersection over the smaller box ("ios") of (N, 4) and (M, 4) xyxy arrays."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]).clip(0) * (a[:, 3] - a[:, 1]).clip(0)
+    area_b = (b[:, 2] - b[:, 0]).clip(0) * (b[:, 3] - b[:, 1]).clip(0)
+    if metric == "ios":
+        denom = np.minimum(area_a[:, None], area_b[None, :])
+    else:
+        denom = area_a[:, None] + area_b[None, :] - inter
+    return np.where(denom > 0, inter / np.maximum(denom, 1e-9), 0.0)
+
+
+def merge_detections(xyxy, conf, cls, threshold=MERGE_THRESHOLD, metric=MERGE_METRIC):
+    """Class-aware NMS over boxes from all tiles; returns the indices to keep, highest confidence first.
+
+    The overlap matrix is computed once; the greedy pass only ORs rows of it.
+    """
+    if len(conf) < 2:
+        return np.arange(len(conf))
+    order = np.argsort(-conf, kind="stable")
+    boxes, classes = xyxy[order], cls[order]
+    suppresses = overlap_matrix(boxes, boxes, metric) > threshold
+    suppresses &= classes[:, None] == classes[None, :]
+    suppresses = np.triu(suppresses, 1)  # --- only a higher-scoring box can suppress a lower one ---
+    suppressed = np.zeros(len(order), dtype=bool)
+    for i in range(len(order)):
+        if not suppressed[i]:
+            suppressed |= suppresses[i]
+    return order[~suppressed]
+
+
+def _tiles_with_candidates(origins, boxes, tile):
+    """Mask of tiles containing the centre of at least one of `boxes`."""
+    if not len(boxes):
+        return np.zeros(len(origins), dtype=bool)
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2
+    inside = ((cx[None, :] >= origins[:, :1]) & (cx[None, :] < origins[:, :1] + tile) &
+              (cy[None, :] >= origins[:, 1:]) & (cy[None, :] < origins[:, 1:] + tile))
+    return inside.any(axis=1)
+
+
+class TiledModel:
+    """Model wrapper running full-frame + tiled inference; `tiles_run` / `tiles_total` track the cost."""
+
+    def __init__(self, model, tile=TILE_SIZE, overlap=TILE_OVERLAP, adaptive=False,
+                 merge_threshold=MERGE_THRESHOLD, low_conf=ADAPTIVE_LOW_CONF):
+        self.model = model
+        self.names = model.names
+        self.backend = getattr(model, "backend", "torch")
+        self.tile = tile
+        self.overlap = overlap
+        self.adaptive = adaptive
+        self.merge_threshold = merge_threshold
+        self.low_conf = low_conf
+        self.tiles_run = 0
+        self.tiles_total = 0
+
+    def predict(self, source, conf=CONF_THRESHOLD, **kwargs):
+        single = not isinstance(source, (list, tuple))
+        images = [cv2.imread(str(s)) if isinstance(s, (str, Path)) else s for s in ([source] if single else source)]
+        kwargs.setdefault("verbose", False)
+
+        # --- coarse full-frame pass over every image in one call ---
+        coarse = self.model.predict(images, conf=self.low_conf if self.adaptive else conf, **kwargs)
+
+        crops, owners, offsets, kept = [], [], [], []
+        for i, (image, result) in enumerate(zip(images, coarse)):
+            xyxy, c, k = box_arrays(result)
+            origins = tile_origins(image.shape[0], image.shape[1], self.tile, self.overlap)
+            self.tiles_total += len(origins)
+            if self.adaptive:
+                origins = origins[_tiles_with_candidates(origins, xyxy[c < conf], self.tile)]
+                xyxy, c, k = xyxy[c >= conf], c[c >= conf], k[c >= conf]
+            kept.append((xyxy, c, k))
+            for x, y in origins.tolist():
+                crops.append(image[y:y + self.tile, x:x + self.tile])
+                owners.append(i)
+                offsets.append((x, y, x, y))
+        self.tiles_run += len(crops)
+
+        # --- every selected tile of every image in a single batch ---
+        tile_kwargs = dict(kwargs, imgsz=self.tile)
+        tiled = self.model.predict(crops, conf=conf, **tile_kwargs) if crops else []
+
+        parts = [[box] for box in kept]
+        speeds = [dict((r.speed or {})) for r in coarse]
+        for owner, offset, result in zip(owners, offsets, tiled):
+            xyxy, c, k = box_arrays(result)
+            parts[owner].append((xyxy + np.asarray(offset, np.float32), c, k))
+            for stage, ms in (result.speed or {}).items():
+                speeds[owner][stage] = (speeds[owner].get(stage) or 0.0) + (ms or 0.0)
+
+        results = []
+        for image, boxes, speed in zip(images, parts, speeds):
+            xyxy = np.concatenate([b[0] for b in boxes]).astype(np.float32)
+            c = np.concatenate([b[1] for b in boxes]).astype(np.float32)
+            k = np.concatenate([b[2] for b in boxes]).astype(np.int64)
+            keep = merge_detections(xyxy, c, k, self.merge_threshold)
+            result = make_result(image, self.names, xyxy[keep], c[keep], k[keep])
+            result.speed = speed
+            results.append(result)
+        return results
+
+    __call__ = predict
+
+    def cost_text(self):
+        if not self.tiles_total:
+            return "tiles run 0"
+        return f"tiles run {self.tiles_run}/{self.tiles_total} ({100 * self.tiles_run / self.tiles_total:.0f}%)"
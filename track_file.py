@@ -0,0 +1,255 @@
+"""
+Compact per-frame detection track files
+=======================================
+A detections-only run of a video writes `<name>.trk` instead of an
+annotated MP4: a small JSON header (class names, fps, frame size, source)
+followed by fixed-size 24-byte records, one per detection, in frame order:
+
+    frame u32 | cls u16 | conf f16 | x1 y1 x2 y2 f32 (pixels)
+
+Records are appended as frames are processed and flushed every
+FLUSH_EVERY frames, so a reader can open the file while it is still being
+written. On close the writer saves `<name>.trk.idx.npz`: the number of
+frames processed and, per class, the sorted frames that contain it (CSR
+offsets + frames). `TrackReader` memory-maps the records and answers
+frame-range and class queries without touching the video; when the index
+is missing or stale (the file is still growing) it is rebuilt in memory.
+
+    python track_file.py test.trk                        # summary
+    python track_file.py test.trk --class person --frames 100 500
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import time
+import numpy as np
+
+from detections import box_arrays
+
+# ───────────────────────── Constants ──────────────────────────
+MAGIC = b"YTRK\x01\x00"
+TRACK_DTYPE = np.dtype([("frame", "<u4"), ("cls", "<u2"), ("conf", "<f2"),
+                        ("x1", "<f4"), ("y1", "<f4"), ("x2", "<f4"), ("y2", "<f4")])
+FLUSH_EVERY = 30        # frames between flushes, i.e. how far behind a concurrent reader can be
+
+# ───────────────────────── Format ─────────────────────────────
+
+def index_path(path):
+    return Path(str(path) + ".idx.npz")
+
+
+def _read_header(f):
+    """Header dict of an open track file; leaves `f` at the first record."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{getattr(f, 'name', 'file')} is not a track file")
+    size = int.from_bytes(f.read(4), "little")
+    header = json.loads(f.read(size))
+    header["data_offset"] = len(MAGIC) + 4 + size
+    header["names"] = {int(k): v for k, v in header["names"].items()}
+    return header
+
+
+def records_from(frame_idx, xyxy, conf, cls):
+    """TRACK_DTYPE rows for one frame's detections."""
+    rows = np.empty(len(conf), dtype=TRACK_DTYPE)
+    rows["frame"] = frame_idx
+    rows["cls"] = cls
+    rows["conf"] = conf
+    for j, field in enumerate(("x1", "y1", "x2", "y2")):
+        rows[field] = xyxy[:, j]
+    return rows
+
+
+def build_index(records, frames=None):
+    """{"frames", "class_ids", "offsets", "class_frames"}: frames containing class_ids[i] are
+    class_frames[offsets[i]:offsets[i + 1]], sorted."""
+    pairs = np.unique(records["cls"].astype(np.int64) << 32 | records["frame"].astype(np.int64))
+    cls, frame = pairs >> 32, pairs & 0xFFFFFFFF
+    class_ids, starts = np.unique(cls, return_index=True)
+    if frames is None:
+        frames = int(records["frame"][-1]) + 1 if len(records) else 0
+    return {"records": np.int64(len(records)), "frames": np.int64(frames), "class_ids": class_ids,
+            "offsets": np.append(starts, len(pairs)).astype(np.int64), "class_frames": frame.astype(np.uint32)}
+
+# ───────────────────────── Write ──────────────────────────────
+
+class TrackWriter:
+    """Appends detections frame by frame. Use as a context manager; `close()` writes the class index.
+
+    With append=True an existing track file is continued (e.g. a restarted
+    stream) instead of replaced; frame numbers must keep increasing.
+    """
+
+    def __init__(self, path, names=None, fps=0.0, size=(0, 0), source="", append=False):
+        self.path = Path(path)
+        self.frames = 0
+        self._since_flush = 0
+        if append and self.path.exists():
+            with open(self.path, "rb") as f:
+                self.header = _read_header(f)
+            data_size = self.path.stat().st_size - self.header["data_offset"]
+            self.f = open(self.path, "r+b")
+            # --- drop a half-written trailing record left by a crash ---
+            self.f.truncate(self.header["data_offset"] + data_size // TRACK_DTYPE.itemsize * TRACK_DTYPE.itemsize)
+            self.f.seek(0, os.SEEK_END)
+            index = _load_index(self.path, data_size // TRACK_DTYPE.itemsize)
+            self.frames = int(index["frames"]) if index else TrackReader(self.path, use_index=False).n_frames
+            return
+        names = dict(enumerate(names)) if isinstance(names, (list, tuple)) else dict(names or {})
+        meta = {"names": {str(k): v for k, v in names.items()}, "fps": fps, "width": size[0], "height": size[1],
+                "source": str(source), "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        blob = json.dumps(meta).encode()
+        self.header = {**meta, "names": names, "data_offset": len(MAGIC) + 4 + len(blob)}
+        index_path(self.path).unlink(missing_ok=True)
+        self.f = open(self.path, "wb")
+        self.f.write(MAGIC + len(blob).to_bytes(4, "little") + blob)
+
+    def write(self, frame_idx, xyxy, conf, cls):
+        """Append one frame's detections (numpy arrays; empty frames only advance the frame count)."""
+        if len(conf):
+            self.f.write(records_from(frame_idx, xyxy, conf, cls).tobytes())
+        self.frames = max(self.frames, frame_idx + 1)
+        self._since_flush += 1
+        if self._since_flush >= FLUSH_EVERY:
+            self.f.flush()
+            self._since_flush = 0
+
+    def append(self, frame_idx, result):
+        """Append one ultralytics result."""
+        self.write(frame_idx, *box_arrays(result))
+
+    def close(self):
+        if self.f.closed:
+            return
+        self.f.close()
+        reader = TrackReader(self.path, use_index=False)
+        index = build_index(reader.records, self.frames)
+        tmp = index_path(self.path).with_suffix(".tmp.npz")
+        np.savez(tmp, **index)
+        os.replace(tmp, index_path(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ───────────────────────── Read ───────────────────────────────
+
+def _load_index(path, n_records):
+    """Saved index if it matches the current number of records, else None."""
+    try:
+        with np.load(index_path(path)) as data:
+            index = {k: data[k] for k in data.files}
+    except (FileNotFoundError, ValueError, OSError):
+        return None
+    return index if int(index["records"]) == n_records else None
+
+
+class TrackReader:
+    """Memory-mapped view of a track file with frame-range and class queries."""
+
+    def __init__(self, path, use_index=True):
+        self.path = Path(path)
+        self._use_index = use_index
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the records (picks up detections appended since the file was opened)."""
+        with open(self.path, "rb") as f:
+            self.header = _read_header(f)
+        self.names = self.header["names"]
+        offset = self.header["data_offset"]
+        count = (self.path.stat().st_size - offset) // TRACK_DTYPE.itemsize
+        self.records = (np.memmap(self.path, dtype=TRACK_DTYPE, mode="r", offset=offset, shape=(count,))
+                        if count else np.zeros(0, TRACK_DTYPE))
+        self._index = _load_index(self.path, count) if self._use_index else None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = build_index(self.records)
+        return self._index
+
+    @property
+    def n_frames(self):
+        return int(self.index["frames"])
+
+    def class_id(self, cls):
+        """Class id for a name or id; a digit string that isn't a class name counts as an id (as from the CLI)."""
+        if isinstance(cls, str):
+            ids = [k for k, v in self.names.items() if v == cls]
+            if ids:
+                return ids[0]
+            if not cls.strip().isdigit():
+                raise KeyError(f"unknown class {cls!r}; known: {sorted(self.names.values())}")
+        return int(cls)
+
+    def _span(self, start, stop):
+        frames = self.records["frame"]
+        lo = np.searchsorted(frames, start, side="left") if start else 0
+        hi = np.searchsorted(frames, stop, side="left") if stop is not None else len(frames)
+        return lo, hi
+
+    def query(self, start=0, stop=None, classes=None, min_conf=None):
+        """Records with start <= frame < stop, optionally only `classes` (names or ids) and conf >= min_conf."""
+        lo, hi = self._span(start, stop)
+        rows = self.records[lo:hi]
+        keep = None
+        if classes is not None:
+            keep = np.isin(rows["cls"], [self.class_id(c) for c in classes])
+        if min_conf is not None:
+            conf_ok = rows["conf"] >= min_conf
+            keep = conf_ok if keep is None else keep & conf_ok
+        return rows if keep is None else rows[keep]
+
+    def frame(self, frame_idx):
+        """(xyxy, conf, cls) arrays of one frame, in box_arrays' layout."""
+        rows = self.query(frame_idx, frame_idx + 1)
+        xyxy = np.stack([rows[f] for f in ("x1", "y1", "x2", "y2")], axis=1).astype(np.float32)
+        return xyxy, rows["conf"].astype(np.float32), rows["cls"].astype(np.int64)
+
+    def frames_with(self, cls, start=0, stop=None):
+        """Sorted frame numbers that contain at least one `cls` (name or id), from the class index."""
+        index = self.index
+        i = np.searchsorted(index["class_ids"], self.class_id(cls))
+        if i >= len(index["class_ids"]) or index["class_ids"][i] != self.class_id(cls):
+            return np.zeros(0, np.uint32)
+        frames = index["class_frames"][index["offsets"][i]:index["offsets"][i + 1]]
+        lo = np.searchsorted(frames, start) if start else 0
+        hi = np.searchsorted(frames, stop) if stop is not None else len(frames)
+        return frames[lo:hi]
+
+    def summary(self):
+        """{class name: (detections, frames)} over the whole file."""
+        index = self.index
+        counts = np.bincount(self.records["cls"], minlength=int(index["class_ids"].max(initial=-1)) + 1)
+        return {self.names.get(int(c), str(int(c))): (int(counts[c]), int(index["offsets"][i + 1] - index["offsets"][i]))
+                for i, c in enumerate(index["class_ids"])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query a detection track file.")
+    parser.add_argument("track")
+    parser.add_argument("--class", dest="cls", default=None, help="list the frames that contain this class")
+    parser.add_argument("--frames", nargs=2, type=int, metavar=("START", "STOP"), default=(0, None))
+    args = parser.parse_args(argv)
+
+    reader = TrackReader(args.track)
+    h = reader.header
+    print(f"{args.track}: {len(reader.records)} detections over {reader.n_frames} frames "
+          f"({h['width']}x{h['height']} @ {h['fps']:.2f} fps, source {h['source'] or '?'})")
+    start, stop = args.frames
+    if args.cls is not None:
+        frames = reader.frames_with(args.cls, start, stop)
+        shown = ", ".join(map(str, frames[:50].tolist())) + (" ..." if len(frames) > 50 else "")
+        print(f"{len(frames)} frame(s) with {args.cls}: {shown}")
+        return
+    for name, (boxes, frames) in sorted(reader.summary().items(), key=lambda kv: -kv[1][0]):
+        print(f"  {name:<20}{boxes:>8} detections{frames:>8} frames")
+
+
+if __name__ == "__main__":
+    main()
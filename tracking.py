@@ -0,0 +1,140 @@
+"""
+Detect-every-k-frames with optical-flow tracking in between
+===========================================================
+`SparseDetector` runs the real detector only on every k-th frame. On the
+frames in between it moves the last boxes with pyramidal Lucas-Kanade
+optical flow on a small grid of points per box (forward-backward checked),
+which costs a fraction of a YOLO pass. When too few points survive the
+flow check, the tracking confidence drops and the next frame is detected
+again instead of waiting for the k-th frame. Tracked boxes keep the
+confidence of their last detection, so they are drawn (and thresholded)
+like detected ones; a box that loses all its points is dropped.
+
+On every detection frame the propagated boxes are matched to the fresh
+detections by IoU; `last_drift_iou` is the mean IoU of that match, i.e. how
+far tracking had drifted by the time it was corrected.
+"""
+
+import cv2
+import numpy as np
+
+from detections import box_arrays, iou_matrix, make_result
+
+DETECT_EVERY   = 5     # run the detector on every k-th frame
+GRID_POINTS    = 4     # flow points per box side (GRID_POINTS ** 2 per box)
+FB_MAX_ERROR   = 1.0   # forward-backward flow error (px) for a point to count as tracked
+MIN_TRACK_CONF = 0.5   # re-detect as soon as the mean tracked-point ratio drops below this
+MIN_BOX_SIDE   = 4     # boxes smaller than this (px) are not worth tracking
+LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+def _grid_points(xyxy, n=GRID_POINTS):
+    """n*n points inset inside each box -> (points (B*n*n, 1, 2) float32, owner (B*n*n,) box index)."""
+    if not len(xyxy):
+        return np.zeros((0, 1, 2), np.float32), np.zeros(0, np.int64)
+    steps = (np.arange(n, dtype=np.float32) + 0.5) / n  # cell centres in [0, 1]
+    gx, gy = np.meshgrid(steps, steps)
+    gx, gy = gx.ravel(), gy.ravel()
+    w = (xyxy[:, 2] - xyxy[:, 0])[:, None]
+    h = (xyxy[:, 3] - xyxy[:, 1])[:, None]
+    px = xyxy[:, 0:1] + w * gx[None, :]
+    py = xyxy[:, 1:2] + h * gy[None, :]
+    points = np.stack([px, py], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+    owner = np.repeat(np.arange(len(xyxy)), n * n)
+    return points, owner
+
+
+class SparseDetector:
+    """Callable frame -> Results that only runs `detect_fn` every `every` frames."""
+
+    def __init__(self, detect_fn, names, every=DETECT_EVERY, min_track_conf=MIN_TRACK_CONF):
+        self.detect_fn = detect_fn
+        self.names = names
+        self.every = max(1, int(every))
+        self.min_track_conf = min_track_conf
+        self.reset()
+
+    def reset(self):
+        self.prev_gray = None
+        self.xyxy = np.zeros((0, 4), np.float32)
+        self.conf = np.zeros(0, np.float32)
+        self.cls = np.zeros(0, np.float32)
+        self.since_detect = 0
+        self.track_conf = 1.0
+        self.redetect_needed = True
+        self.detections = 0
+        self.tracked = 0
+        self.last_drift_iou = None
+
+    def __call__(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.redetect_needed or self.since_detect >= self.every - 1 or self.prev_gray is None:
+            result = self._detect(frame)
+        else:
+            result = self._track(frame, gray)
+        self.prev_gray = gray
+        return result
+
+    def _detect(self, frame):
+        result = self.detect_fn(frame)
+        xyxy, conf, cls = box_arrays(result)
+        if len(self.xyxy) and len(xyxy):
+            # --- IoU association of propagated vs fresh boxes (same class) = drift measure ---
+            ious = iou_matrix(self.xyxy, xyxy) * (self.cls[:, None] == cls[None, :])
+            self.last_drift_iou = float(ious.max(axis=0).mean())
+        self.xyxy, self.conf, self.cls = xyxy.astype(np.float32), conf.astype(np.float32), cls.astype(np.float32)
+        self.since_detect = 0
+        self.track_conf = 1.0
+        self.redetect_needed = False
+        self.detections += 1
+        return result
+
+    def _track(self, frame, gray):
+        self.since_detect += 1
+        self.tracked += 1
+        sides = np.minimum(self.xyxy[:, 2] - self.xyxy[:, 0], self.xyxy[:, 3] - self.xyxy[:, 1])
+        live = sides >= MIN_BOX_SIDE
+        self.xyxy, self.conf, self.cls = self.xyxy[live], self.conf[live], self.cls[live]
+
+        p0, owner = _grid_points(self.xyxy)
+        if len(p0):
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, p0, None, **LK_PARAMS)
+            p0r, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, p1, None, **LK_PARAMS)
+            fb_error = np.linalg.norm((p0 - p0r).reshape(-1, 2), axis=1)
+            good = (status.ravel() == 1) & (status_back.ravel() == 1) & (fb_error < FB_MAX_ERROR)
+
+            # --- per-box mean displacement of its good points, all boxes at once ---
+            n_boxes = len(self.xyxy)
+            disp = (p1 - p0).reshape(-1, 2)
+            n_good = np.bincount(owner[good], minlength=n_boxes)
+            dx = np.bincount(owner[good], weights=disp[good, 0], minlength=n_boxes)
+            dy = np.bincount(owner[good], weights=disp[good, 1], minlength=n_boxes)
+            moved = n_good > 0
+            shift = np.zeros((n_boxes, 2), np.float32)
+            shift[moved] = np.stack([dx[moved], dy[moved]], axis=1) / n_good[moved, None]
+            self.xyxy = self.xyxy + np.tile(shift, 2)
+
+            # --- boxes keep their detector confidence for display; the tracked-point ratio only decides re-detection ---
+            self.track_conf = float((n_good / float(GRID_POINTS * GRID_POINTS)).mean())
+            if self.track_conf < self.min_track_conf:
+                self.redetect_needed = True
+            self.xyxy, self.conf, self.cls = self.xyxy[moved], self.conf[moved], self.cls[moved]  # --- lost all points ---
+
+        h, w = gray.shape[:2]
+        self.xyxy[:, [0, 2]] = self.xyxy[:, [0, 2]].clip(0, w)
+        self.xyxy[:, [1, 3]] = self.xyxy[:, [1, 3]].clip(0, h)
+        return make_result(frame, self.names, self.xyxy, self.conf, self.cls)
+
+
+def match_quality(reference, predicted, iou_threshold=0.5):
+    """(mean best IoU, recall@iou_threshold) of `predicted` boxes against `reference` boxes, same class only."""
+    ref_xyxy, _, ref_cls = box_arrays(reference)
+    if not len(ref_xyxy):
+        return 1.0, 1.0
+    pred_xyxy, _, pred_cls = box_arrays(predicted)
+    if not len(pred_xyxy):
+        return 0.0, 0.0
+    ious = iou_matrix(ref_xyxy, pred_xyxy) * (ref_cls[:, None] == pred_cls[None, :])
+    best = ious.max(axis=1)
+    return float(best.mean()), float((best >= iou_threshold).mean())
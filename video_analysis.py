@@ -0,0 +1,153 @@
+"""
+Background pre-analysis of a loaded video
+=========================================
+When the GUI loads a video, a `VideoAnalyzer` thread decodes it with its own
+`cv2.VideoCapture` and runs the detector over it in batches, starting at
+the play head and working forwards (then wrapping round to anything still
+missing). The boxes land in a `FrameDetections` cache keyed by frame number,
+so playback, seeking and filter changes only draw from the cache; the model
+runs on the GUI side only for frames the analyzer hasn't reached yet, and
+those results go into the same cache.
+
+Only the (xyxy, conf, cls) arrays are kept per frame (a few hundred bytes),
+never the frame itself; `detections.make_result` rebuilds a Results for display.
+"""
+
+import threading
+import cv2
+import numpy as np
+
+from detections import box_arrays
+
+ANALYSIS_BATCH = 4      # frames per predict call in the background pass
+MAX_GRAB_AHEAD = 60     # gaps up to this many frames are skipped with grab() instead of a seek
+
+
+class FrameDetections:
+    """Frame number -> (xyxy, conf, cls) for one video, plus a mask of the frames analysed so far."""
+
+    def __init__(self, total_frames):
+        self.done = np.zeros(max(int(total_frames), 0), dtype=bool)
+        self._boxes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.done)
+
+    def _grow(self, n):
+        # --- the keyframe index can correct CAP_PROP_FRAME_COUNT after loading ---
+        if n > len(self.done):
+            self.done = np.concatenate([self.done, np.zeros(n - len(self.done), dtype=bool)])
+
+    def get(self, frame_num):
+        with self._lock:
+            return self._boxes.get(frame_num)
+
+    def put(self, frame_num, boxes):
+        with self._lock:
+            self._grow(frame_num + 1)
+            self._boxes[frame_num] = boxes
+            self.done[frame_num] = True
+
+    def put_result(self, frame_num, result):
+        boxes = box_arrays(result)
+        self.put(frame_num, boxes)
+        return boxes
+
+    def complete(self):
+        with self._lock:
+            return bool(self.done.all())
+
+    def fraction(self):
+        with self._lock:
+            return float(self.done.mean()) if len(self.done) else 1.0
+
+    def next_missing(self, start):
+        """First frame >= start that hasn't been analysed, wrapping round to 0; None when all are done."""
+        with self._lock:
+            missing = np.flatnonzero(~self.done)
+        if not len(missing):
+            return None
+        i = np.searchsorted(missing, start)
+        return int(missing[i] if i < len(missing) else missing[0])
+
+    def coverage_runs(self, width):
+        """(x0, x1) pixel runs, over a bar `width` px wide, whose frames are all analysed."""
+        with self._lock:
+            done = self.done.copy()
+        if not len(done) or width <= 0:
+            return []
+        edges = np.linspace(0, len(done), width + 1).astype(np.int64)
+        starts = np.minimum(edges[:-1], len(done) - 1)
+        # --- a pixel is filled when every frame it covers is done (reduceat on the frame counts) ---
+        counts = np.maximum(edges[1:] - edges[:-1], 1)
+        filled = np.add.reduceat(done.astype(np.int64), starts) >= counts
+        change = np.flatnonzero(np.diff(np.concatenate([[0], filled.astype(np.int8), [0]])))
+        return list(zip(change[::2].tolist(), change[1::2].tolist()))
+
+
+class VideoAnalyzer:
+    """Background detection pass over a video file, steered towards the play head by `focus()`."""
+
+    def __init__(self, path, detections, detect_fn, batch_size=ANALYSIS_BATCH, start=0):
+        self.path = str(path)
+        self.detections = detections
+        self.detect_fn = detect_fn  # --- list of frames -> list of results, in order ---
+        self.batch_size = max(1, int(batch_size))
+        self._focus = start
+        self._stop = threading.Event()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def focus(self, frame_num):
+        """Play head moved: continue the pass from the first unanalysed frame at or after it."""
+        self._focus = int(frame_num)
+
+    def running(self):
+        return self._thread.is_alive()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _position(self, cap, pos, target):
+        """Make `cap` return frame `target` next; returns the new position."""
+        if 0 < target - pos <= MAX_GRAB_AHEAD:
+            while pos < target and cap.grab():
+                pos += 1
+            return pos
+        if target != pos:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        return target
+
+    def _run(self):
+        cap = cv2.VideoCapture(self.path)
+        pos = 0
+        try:
+            while not self._stop.is_set():
+                target = self.detections.next_missing(self._focus)
+                if target is None:
+                    break
+                pos = self._position(cap, pos, target)
+                frames, nums = [], []
+                while len(frames) < self.batch_size:
+                    if nums and self.detections.done[min(pos, len(self.detections) - 1)]:
+                        break  # --- ran into a range playback already analysed ---
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    frames.append(frame)
+                    nums.append(pos)
+                    pos += 1
+                if not frames:
+                    # --- nothing decodable from here (past the real end): mark it so the pass can finish ---
+                    self.detections.put(target, box_arrays(None))
+                    continue
+                for frame_num, result in zip(nums, self.detect_fn(frames)):
+                    self.detections.put_result(frame_num, result)
+        except Exception as exc:  # --- reported by the GUI; playback falls back to live inference ---
+            self.error = exc
+        finally:
+            cap.release()
@@ -0,0 +1,202 @@
+"""
+Video playback engine for the GUI
+=================================
+`VideoReader` owns the `cv2.VideoCapture` for a loaded video. A decoder
+thread reads frames *sequentially* into a bounded prefetch buffer ahead of
+the play head, so normal playback never seeks.
+
+Random access (the seek slider) goes through a `KeyframeIndex` built on
+load: short forward jumps that do not cross a keyframe are served by
+`grab()`-ing forward, and anything else seeks to the nearest keyframe at or
+before the target and grabs the remainder, instead of letting the codec seek
+on every frame.
+
+The keyframe index needs PyAV (`av` in requirements.txt) to read packet
+flags without decoding. Without it, a warning is printed, the index falls
+back to timestamps derived from the FPS and seeks use a fixed grab-ahead
+distance.
+"""
+
+from bisect import bisect_right
+from collections import deque
+import threading
+import cv2
+
+PREFETCH_FRAMES = 32  # decoded frames kept ahead of the play head
+MAX_GRAB_AHEAD  = 60  # forward jump served by grab() when keyframes are unknown
+
+_warned_no_av = False  # --- the missing-PyAV warning is printed once per process ---
+
+
+class KeyframeIndex:
+    """Per-frame presentation timestamps (seconds) and the keyframe frame numbers."""
+
+    def __init__(self, timestamps, keyframes=None):
+        self.timestamps = timestamps
+        self.keyframes = keyframes  # sorted frame numbers, or None when unknown
+
+    @classmethod
+    def uniform(cls, total_frames, fps):
+        fps = fps if fps and fps > 0 else 30.0
+        return cls([n / fps for n in range(max(total_frames, 0))])
+
+    @classmethod
+    def build(cls, path, total_frames, fps):
+        """Scan packet headers with PyAV (no decoding); falls back to `uniform`."""
+        global _warned_no_av
+        try:
+            import av
+        except ImportError:
+            if not _warned_no_av:
+                print("Warning: PyAV is not installed (pip install av); seeking uses estimated "
+                      "timestamps and a fixed grab-ahead instead of the keyframe index")
+                _warned_no_av = True
+            return cls.uniform(total_frames, fps)
+
+        try:
+            with av.open(str(path)) as container:
+                stream = container.streams.video[0]
+                time_base = float(stream.time_base)
+                packets = [(p.pts, p.is_keyframe) for p in container.demux(stream) if p.pts is not None]
+        except Exception as exc:  # unreadable container: no keyframe info, not fatal
+            print(f"Warning: could not index keyframes of {path} ({exc}); seeking uses estimated timestamps")
+            return cls.uniform(total_frames, fps)
+        if not packets:
+            return cls.uniform(total_frames, fps)
+
+        # --- packets arrive in decode order; frame numbers follow presentation (pts) order ---
+        packets.sort(key=lambda p: p[0])
+        first_pts = packets[0][0]
+        timestamps = [(pts - first_pts) * time_base for pts, _ in packets]
+        keyframes = [n for n, (_, is_key) in enumerate(packets) if is_key]
+        return cls(timestamps, keyframes or [0])
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def timestamp(self, frame_num):
+        if not self.timestamps:
+            return 0.0
+        return self.timestamps[min(max(frame_num, 0), len(self.timestamps) - 1)]
+
+    def keyframe_at_or_before(self, frame_num):
+        """Nearest keyframe <= frame_num, or None when keyframes are unknown."""
+        if not self.keyframes:
+            return None
+        i = bisect_right(self.keyframes, frame_num) - 1
+        return self.keyframes[max(i, 0)]
+
+
+class VideoReader:
+    """Sequential, prefetching frame source with index-assisted seeking."""
+
+    def __init__(self, path, prefetch=PREFETCH_FRAMES):
+        self.path = str(path)
+        self.cap = cv2.VideoCapture(self.path)
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.index = KeyframeIndex.uniform(self.total_frames, self.fps)
+        self.prefetch = prefetch
+
+        self._cond = threading.Condition()
+        self._buffer = deque()
+        self._generation = 0   # bumped by every seek; stale decodes are discarded
+        self._seek_target = 0  # pending reposition for the decoder thread
+        self._decode_pos = 0   # frame number the capture will return next
+        self._eof = False
+        self._closed = False
+
+        threading.Thread(target=self._build_index, daemon=True).start()
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _build_index(self):
+        index = KeyframeIndex.build(self.path, self.total_frames, self.fps)
+        with self._cond:
+            self.index = index
+            if len(index) > 0:
+                self.total_frames = len(index)
+
+    def seek(self, frame_num):
+        """Drop prefetched frames and continue decoding from `frame_num`."""
+        frame_num = min(max(int(frame_num), 0), max(self.total_frames - 1, 0))
+        with self._cond:
+            self._generation += 1
+            self._seek_target = frame_num
+            self._buffer.clear()
+            self._eof = False
+            self._cond.notify_all()
+
+    def read(self, timeout=None):
+        """Next (frame_num, frame) in playback order, or None at end of video / timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._buffer or self._eof or self._closed, timeout):
+                return None
+            if not self._buffer:
+                return None
+            item = self._buffer.popleft()
+            self._cond.notify_all()  # room for the decoder again
+            return item
+
+    def finished(self):
+        """True once every frame up to the end of the video has been read."""
+        with self._cond:
+            return self._eof and not self._buffer
+
+    def release(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        self.cap.release()
+
+    def _reposition(self, target):
+        # --- cheapest way to make the capture return `target` next ---
+        if target == self._decode_pos:
+            return
+        keyframe = self.index.keyframe_at_or_before(target)
+        if keyframe is None:
+            forward_ok = 0 < target - self._decode_pos <= MAX_GRAB_AHEAD
+        else:
+            forward_ok = keyframe <= self._decode_pos < target
+        if not forward_ok:
+            start = keyframe if keyframe is not None else target
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            self._decode_pos = start
+        while self._decode_pos < target and self.cap.grab():
+            self._decode_pos += 1
+
+    def _decode_loop(self):
+        generation = -1
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._generation != generation
+                                    or (not self._eof and len(self._buffer) < self.prefetch))
+                if self._closed:
+                    return
+                if self._generation != generation:
+                    generation = self._generation
+                    target = self._seek_target
+                else:
+                    target = None
+
+            if target is not None:
+                self._reposition(target)
+            ok, frame = self.cap.read()
+
+            with self._cond:
+                if not ok:
+                    # --- capture position is unknown past the end; force a real seek next time ---
+                    self._decode_pos = max(self._decode_pos + 1, self.total_frames)
+                    self._eof = self._generation == generation
+                    self._cond.notify_all()
+                    continue
+                frame_num = self._decode_pos
+                self._decode_pos += 1
+                if self._generation != generation:
+                    continue  # a seek arrived mid-decode; drop the stale frame
+                self._buffer.append((frame_num, frame))
+                self._cond.notify_all()